@@ -0,0 +1,53 @@
+import secrets
+
+from fastapi import APIRouter, Depends, Header, HTTPException
+from fastapi.responses import FileResponse
+from loguru import logger
+
+from app.core.config import settings
+from app.core.locks import list_leases
+from app.core.profiling import list_profiles, profile_path
+
+
+async def require_admin_token(x_admin_token: str | None = Header(default=None)) -> None:
+    """Доступ к служебным ручкам только с ADMIN_API_TOKEN; без него ручки закрыты"""
+    if not settings.admin_api_token:
+        raise HTTPException(status_code=403, detail="Admin API is disabled")
+    if x_admin_token is None or not secrets.compare_digest(
+        x_admin_token.encode(), settings.admin_api_token.encode()
+    ):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
+
+router = APIRouter(prefix="/api/admin", tags=["admin"], dependencies=[Depends(require_admin_token)])
+
+
+@router.get("/locks")
+async def get_locks():
+    """Занятые аренды периодических задач и их держатели"""
+    try:
+        leases = list_leases()
+        return {"locks": leases, "total": len(leases)}
+    except Exception:
+        logger.exception("Error getting locks")
+        raise HTTPException(status_code=500, detail="Error getting locks") from None
+
+
+@router.get("/profiles")
+async def get_profiles(limit: int = 20):
+    """Последние сохранённые профили задач и ручек"""
+    try:
+        profiles = list_profiles()
+        return {"profiles": profiles[:limit], "total": len(profiles)}
+    except Exception:
+        logger.exception("Error listing profiles")
+        raise HTTPException(status_code=500, detail="Error listing profiles") from None
+
+
+@router.get("/profiles/{name}")
+async def download_profile(name: str):
+    """Файл профиля"""
+    path = profile_path(name)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, filename=name)
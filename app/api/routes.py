@@ -5,11 +5,12 @@ from loguru import logger
 from sqlalchemy import text
 from sqlalchemy.orm import Session
 
+from app.core.profiling import profile_route
 from app.database.database import get_db
 from app.database.models import Article, ParsingLog, Subscription, Topic, User
 from app.services.database_service import DatabaseService
 
-router = APIRouter(prefix="/api/database", tags=["database"])
+router = APIRouter(prefix="/api/database", tags=["database"], dependencies=[Depends(profile_route)])
 
 
 @router.get("/health")
@@ -214,6 +215,13 @@ async def get_parsing_logs(
                     "articles_processed": log.articles_processed,
                     "status": log.status,
                     "errors": log.errors,
+                    "task": log.task,
+                    "stage_seconds": {
+                        "fetch": log.fetch_seconds,
+                        "parse": log.parse_seconds,
+                        "db": log.db_seconds,
+                        "summarize": log.summarize_seconds,
+                    },
                 }
                 for log in logs
             ],
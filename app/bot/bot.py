@@ -1,10 +1,14 @@
+import time
+
 from loguru import logger
 from telegram import Bot
 from telegram.constants import ParseMode
 from telegram.ext import Application
 
+from app.bot.concurrency import ChatOrderedUpdateProcessor
 from app.bot.handlers import setup_handlers
 from app.core.config import settings
+from app.core.metrics import TELEGRAM_SEND_SECONDS
 
 
 class HabrDigestBot:
@@ -12,7 +16,12 @@ class HabrDigestBot:
 
     def __init__(self):
         self.bot = Bot(token=settings.telegram_bot_token)
-        self.application = Application.builder().token(settings.telegram_bot_token).build()
+        self.application = (
+            Application.builder()
+            .token(settings.telegram_bot_token)
+            .concurrent_updates(ChatOrderedUpdateProcessor(settings.bot_max_concurrent_updates))
+            .build()
+        )
 
         setup_handlers(self.application)
 
@@ -27,6 +36,14 @@ class HabrDigestBot:
             logger.exception("Error starting bot")
             raise
 
+    async def send_message(self, chat_id: int, text: str, **kwargs):
+        """Отправка сообщения с замером времени ответа Telegram"""
+        started = time.perf_counter()
+        try:
+            return await self.bot.send_message(chat_id=chat_id, text=text, **kwargs)
+        finally:
+            TELEGRAM_SEND_SECONDS.observe(time.perf_counter() - started)
+
     async def stop(self):
         """Остановка бота"""
         try:
@@ -60,7 +77,7 @@ async def send_digest_to_user(telegram_id: int, articles: list, topic_name: str
                 message_text += f"   📝 {article['summary']}\n"
             message_text += f"   🔗 <a href='{article['url']}'>Читать на Хабре</a>\n\n"
 
-        await bot_instance.bot.send_message(
+        await bot_instance.send_message(
             chat_id=telegram_id,
             text=message_text,
             parse_mode=ParseMode.HTML,
@@ -76,7 +93,7 @@ async def send_digest_to_user(telegram_id: int, articles: list, topic_name: str
 async def send_error_notification(telegram_id: int, error_message: str):
     """Отправка уведомления об ошибке"""
     try:
-        await bot_instance.bot.send_message(
+        await bot_instance.send_message(
             chat_id=telegram_id,
             text=f"❌ Произошла ошибка: {error_message}",
             parse_mode=ParseMode.HTML,
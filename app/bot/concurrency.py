@@ -0,0 +1,92 @@
+"""Параллельная обработка апдейтов с сохранением порядка внутри чата.
+
+По умолчанию Application обрабатывает апдейты по одному, и медленная
+диагностическая команда одного пользователя задерживает кнопки всех
+остальных. Здесь апдейты разных чатов идут параллельно, а апдейты одного
+чата — строго по очереди: на этом держится ConversationHandler с вводом
+своей темы.
+
+Слот параллельности берётся уже под блокировкой чата. Семафор PTB
+берётся раньше do_process_update, и если бы он ограничивал обработку,
+чат, приславший подряд больше апдейтов, чем слотов, занял бы их все
+ожидающими своей же блокировки, и остальные чаты встали бы. Поэтому
+семафор PTB здесь не ограничивает, а лимит держит собственный.
+"""
+
+import asyncio
+import sys
+from collections.abc import Awaitable
+from typing import Any
+
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+
+class ChatOrderedUpdateProcessor(BaseUpdateProcessor):
+    """Ограниченная параллельность между чатами, последовательность внутри чата"""
+
+    def __init__(self, max_concurrent_updates: int):
+        if max_concurrent_updates < 1:
+            raise ValueError("`max_concurrent_updates` must be a positive integer!")
+        super().__init__(sys.maxsize)
+        self._max_concurrent_updates = max_concurrent_updates
+        self._slots = asyncio.Semaphore(max_concurrent_updates)
+        self._running = 0
+        self._locks: dict[int, asyncio.Lock] = {}
+        self._waiters: dict[int, int] = {}
+
+    async def do_process_update(self, update: object, coroutine: Awaitable[Any]) -> None:
+        """Выполняет обработку апдейта под блокировкой его чата"""
+        key = self._ordering_key(update)
+        if key is None:
+            await self._run(coroutine)
+            return
+
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        self._waiters[key] = self._waiters.get(key, 0) + 1
+        try:
+            async with lock:
+                await self._run(coroutine)
+        finally:
+            # Блокировки живут, пока у чата есть апдейты в работе, иначе словарь
+            # разрастался бы на каждого пользователя, написавшего боту хоть раз
+            self._waiters[key] -= 1
+            if not self._waiters[key]:
+                del self._waiters[key]
+                del self._locks[key]
+
+    async def _run(self, coroutine: Awaitable[Any]) -> None:
+        """Выполняет апдейт в одном из слотов параллельности"""
+        async with self._slots:
+            self._running += 1
+            try:
+                await coroutine
+            finally:
+                self._running -= 1
+
+    async def initialize(self) -> None:
+        """Ресурсы не требуются"""
+
+    async def shutdown(self) -> None:
+        """Ресурсы не требуются"""
+
+    @property
+    def current_concurrent_updates(self) -> int:
+        """Количество апдейтов, которые выполняются сейчас, без ожидающих очереди"""
+        return self._running
+
+    @property
+    def active_chats(self) -> int:
+        """Количество чатов, у которых есть апдейты в работе"""
+        return len(self._locks)
+
+    @staticmethod
+    def _ordering_key(update: object) -> int | None:
+        """Ключ упорядочивания: чат, а при его отсутствии — пользователь"""
+        if not isinstance(update, Update):
+            return None
+        if update.effective_chat:
+            return update.effective_chat.id
+        if update.effective_user:
+            return update.effective_user.id
+        return None
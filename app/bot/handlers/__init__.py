@@ -20,7 +20,12 @@ from app.bot.handlers.commands import (
     cmd_subscriptions,
     cmd_topics,
 )
-from app.bot.handlers.diagnostics import cmd_test_ai, cmd_test_digest, cmd_test_parsing
+from app.bot.handlers.diagnostics import (
+    cmd_diag_stats,
+    cmd_test_ai,
+    cmd_test_digest,
+    cmd_test_parsing,
+)
 from app.bot.handlers.states import WAITING_FOR_CUSTOM_TOPIC
 from app.bot.handlers.subscriptions import (
     callback_set_frequency,
@@ -33,6 +38,7 @@ from app.bot.handlers.topics import (
     callback_topic_select,
     handle_custom_topic,
 )
+from app.bot.metrics import timed
 
 COMMANDS = (
     ("start", cmd_start),
@@ -43,6 +49,7 @@ COMMANDS = (
     ("test_parsing", cmd_test_parsing),
     ("test_ai", cmd_test_ai),
     ("test_digest", cmd_test_digest),
+    ("diag_stats", cmd_diag_stats),
 )
 
 CALLBACKS = (
@@ -58,19 +65,19 @@ CALLBACKS = (
 def setup_handlers(application: Application) -> None:
     """Регистрирует команды, callback-кнопки и диалог добавления своей темы."""
     for command, handler in COMMANDS:
-        application.add_handler(CommandHandler(command, handler))
+        application.add_handler(CommandHandler(command, timed(handler)))
 
     for handler, pattern in CALLBACKS:
-        application.add_handler(CallbackQueryHandler(handler, pattern=pattern))
+        application.add_handler(CallbackQueryHandler(timed(handler), pattern=pattern))
 
     application.add_handler(
         ConversationHandler(
             entry_points=[
-                CallbackQueryHandler(callback_add_custom_topic, pattern="^add_custom_topic$")
+                CallbackQueryHandler(timed(callback_add_custom_topic), pattern="^add_custom_topic$")
             ],
             states={
                 WAITING_FOR_CUSTOM_TOPIC: [
-                    MessageHandler(filters.TEXT & ~filters.COMMAND, handle_custom_topic)
+                    MessageHandler(filters.TEXT & ~filters.COMMAND, timed(handle_custom_topic))
                 ]
             },
             fallbacks=[CommandHandler("cancel", lambda _update, _context: ConversationHandler.END)],
@@ -2,35 +2,44 @@ from loguru import logger
 from telegram import Update
 from telegram.ext import ContextTypes
 
+from app.bot.metrics import handler_latency
+from app.bot.throttling import diagnostics_cache, diagnostics_limiter, is_admin, rate_limited
 from app.services.parser_service import HabrParser
 
 
+async def _fetch_latest_articles() -> list[dict]:
+    """Загрузка последних статей для диагностики"""
+    async with HabrParser() as parser:
+        return await parser.get_latest_articles(max_articles=5)
+
+
+@rate_limited("test_parsing")
 async def cmd_test_parsing(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Тестовая команда для проверки парсинга"""
     try:
         await update.message.reply_text("🔍 Начинаю тестовый парсинг...")
 
-        async with HabrParser() as parser:
-            articles = await parser.get_latest_articles(max_articles=5)
+        articles = await diagnostics_cache.get_or_fetch("latest_articles", _fetch_latest_articles)
 
-            if not articles:
-                await update.message.reply_text("❌ Не удалось получить статьи")
-                return
+        if not articles:
+            await update.message.reply_text("❌ Не удалось получить статьи")
+            return
 
-            result_text = "📰 Последние статьи с Хабра:\n\n"
+        result_text = "📰 Последние статьи с Хабра:\n\n"
 
-            for i, article in enumerate(articles[:3], 1):
-                result_text += f"{i}. {article['title']}\n"
-                result_text += f"   Автор: {article['author'] or 'Неизвестно'}\n"
-                result_text += f"   Ссылка: {article['url']}\n\n"
+        for i, article in enumerate(articles[:3], 1):
+            result_text += f"{i}. {article['title']}\n"
+            result_text += f"   Автор: {article['author'] or 'Неизвестно'}\n"
+            result_text += f"   Ссылка: {article['url']}\n\n"
 
-            await update.message.reply_text(result_text)
+        await update.message.reply_text(result_text)
 
     except Exception:
         logger.exception("Error in test parsing")
         await update.message.reply_text("Произошла ошибка при тестовом парсинге")
 
 
+@rate_limited("test_ai")
 async def cmd_test_ai(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Тестовая команда для проверки Yandex GPT"""
     try:
@@ -38,7 +47,9 @@ async def cmd_test_ai(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
         await update.message.reply_text("🤖 Тестирую подключение к Yandex GPT...")
 
-        is_connected = await yandex_service.test_connection()
+        is_connected = await diagnostics_cache.get_or_fetch(
+            "yandex_connection", yandex_service.test_connection
+        )
 
         if is_connected:
             model_info = yandex_service.get_model_info()
@@ -68,6 +79,7 @@ async def cmd_test_ai(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text("Произошла ошибка при тестировании AI")
 
 
+@rate_limited("test_digest")
 async def cmd_test_digest(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Тестовая команда для проверки дайджеста"""
     try:
@@ -85,3 +97,37 @@ async def cmd_test_digest(update: Update, context: ContextTypes.DEFAULT_TYPE):
     except Exception:
         logger.exception("Error in digest test")
         await update.message.reply_text("Произошла ошибка при тестировании дайджеста")
+
+
+async def cmd_diag_stats(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Счётчики лимитера, кэша диагностики и длительности обработчиков (для администраторов)"""
+    if not is_admin(update.effective_user.id):
+        await update.message.reply_text("Команда доступна только администраторам")
+        return
+
+    limiter = diagnostics_limiter.snapshot()
+    cache = diagnostics_cache.snapshot()
+
+    result_text = "📊 Диагностика бота\n\n"
+    result_text += f"Пользователей под лимитом: {limiter['tracked_users']}\n"
+    for command in sorted(set(limiter["allowed"]) | set(limiter["rejected"])):
+        result_text += (
+            f"   /{command}: разрешено {limiter['allowed'].get(command, 0)}, "
+            f"отклонено {limiter['rejected'].get(command, 0)}\n"
+        )
+
+    result_text += "\nКэш результатов:\n"
+    for key in sorted(set(cache["hits"]) | set(cache["misses"])):
+        result_text += (
+            f"   {key}: попаданий {cache['hits'].get(key, 0)}, "
+            f"промахов {cache['misses'].get(key, 0)}\n"
+        )
+
+    result_text += "\nОбработчики (p50 / p95 / max, с):\n"
+    for name, stats in sorted(handler_latency.snapshot().items()):
+        result_text += (
+            f"   {name}: {stats['calls']} выз., "
+            f"{stats['p50_seconds']:.2f} / {stats['p95_seconds']:.2f} / {stats['max_seconds']:.2f}\n"
+        )
+
+    await update.message.reply_text(result_text)
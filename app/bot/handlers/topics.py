@@ -4,6 +4,7 @@ from telegram.ext import ContextTypes, ConversationHandler
 
 from app.bot.handlers.states import WAITING_FOR_CUSTOM_TOPIC
 from app.services.database_service import DatabaseService
+from app.services.hub_directory import hub_directory
 
 
 async def callback_topic_select(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -79,9 +80,21 @@ async def handle_custom_topic(update: Update, context: ContextTypes.DEFAULT_TYPE
                 return WAITING_FOR_CUSTOM_TOPIC
 
             topic = db_service.create_topic(
-                name=topic_name, slug=slug, description=f"Пользовательская тема: {topic_name}"
+                name=topic_name,
+                slug=slug,
+                description=f"Пользовательская тема: {topic_name}",
+                is_custom=True,
+                hub_slug=hub_directory.lookup(topic_name, slug),
             )
 
+            try:
+                from celery_app.tasks import match_custom_topic
+
+                match_custom_topic.delay(topic.id)
+            except Exception:
+                # Новые статьи всё равно получат тему при парсинге
+                logger.exception(f"Error queuing article matching for topic {topic.id}")
+
             user = db_service.get_user_by_telegram_id(update.effective_user.id)
             if user:
                 subscription = db_service.create_subscription(
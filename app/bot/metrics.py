@@ -0,0 +1,102 @@
+"""Замеры длительности обработчиков бота.
+
+Каждый обработчик оборачивается в timed при регистрации, поэтому сами
+обработчики ничего не знают о замерах.
+"""
+
+import time
+from collections import deque
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+from functools import wraps
+from typing import Any
+
+from loguru import logger
+
+from app.core.config import settings
+from app.core.metrics import BOT_HANDLER_SECONDS
+from app.database.instrumentation import query_scope
+
+# Сколько последних замеров хранить на обработчик для расчёта перцентилей
+SAMPLE_SIZE = 512
+
+
+@dataclass
+class HandlerStats:
+    """Накопленная статистика одного обработчика"""
+
+    calls: int = 0
+    errors: int = 0
+    total_seconds: float = 0.0
+    max_seconds: float = 0.0
+    samples: deque = field(default_factory=lambda: deque(maxlen=SAMPLE_SIZE))
+
+    def percentile(self, fraction: float) -> float:
+        """Перцентиль по последним замерам"""
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        index = min(len(ordered) - 1, int(fraction * len(ordered)))
+        return ordered[index]
+
+
+class HandlerLatency:
+    """Реестр длительностей обработчиков"""
+
+    def __init__(self, slow_threshold: float = 2.0):
+        self.slow_threshold = slow_threshold
+        self._stats: dict[str, HandlerStats] = {}
+
+    def observe(self, name: str, seconds: float, failed: bool = False) -> None:
+        """Учитывает один вызов обработчика"""
+        stats = self._stats.setdefault(name, HandlerStats())
+        stats.calls += 1
+        stats.errors += int(failed)
+        stats.total_seconds += seconds
+        stats.max_seconds = max(stats.max_seconds, seconds)
+        stats.samples.append(seconds)
+        BOT_HANDLER_SECONDS.labels(name).observe(seconds)
+
+        if seconds >= self.slow_threshold:
+            logger.warning(f"Slow bot handler {name}: {seconds:.2f}s")
+
+    def snapshot(self) -> dict[str, dict]:
+        """Сводка по всем обработчикам"""
+        return {
+            name: {
+                "calls": stats.calls,
+                "errors": stats.errors,
+                "avg_seconds": stats.total_seconds / stats.calls,
+                "p50_seconds": stats.percentile(0.5),
+                "p95_seconds": stats.percentile(0.95),
+                "max_seconds": stats.max_seconds,
+            }
+            for name, stats in self._stats.items()
+        }
+
+    def reset(self) -> None:
+        """Сброс накопленной статистики"""
+        self._stats.clear()
+
+
+handler_latency = HandlerLatency(settings.bot_slow_handler_seconds)
+
+
+def timed(callback: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]:
+    """Оборачивает обработчик замером длительности"""
+    name = callback.__name__
+
+    @wraps(callback)
+    async def wrapper(update, context):
+        started = time.perf_counter()
+        failed = False
+        try:
+            with query_scope("bot", name):
+                return await callback(update, context)
+        except Exception:
+            failed = True
+            raise
+        finally:
+            handler_latency.observe(name, time.perf_counter() - started, failed)
+
+    return wrapper
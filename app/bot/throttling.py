@@ -0,0 +1,124 @@
+"""Ограничение частоты и кэш результатов диагностических команд.
+
+Диагностика ходит во внешние системы: /test_parsing скачивает главную
+Хабра, /test_ai делает платный запрос к YandexGPT. Лимитер не даёт одному
+пользователю размножить эти запросы, а кэш отдаёт всем пользователям один
+и тот же свежий результат вместо нового запроса.
+"""
+
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+from functools import wraps
+from typing import Any
+
+from loguru import logger
+from telegram import Update
+from telegram.ext import ContextTypes
+
+from app.core.cache import ResultCache
+from app.core.config import settings
+
+# Порог, после которого из лимитера выбрасываются полностью восстановившиеся корзины
+MAX_TRACKED_BUCKETS = 10_000
+
+
+@dataclass
+class TokenBucket:
+    """Корзина токенов одного пользователя для одной команды"""
+
+    capacity: float
+    refill_per_second: float
+    tokens: float
+    updated_at: float
+
+    def refill(self, now: float) -> None:
+        """Пополнение корзины за прошедшее время"""
+        elapsed = max(0.0, now - self.updated_at)
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.refill_per_second)
+        self.updated_at = now
+
+    def try_acquire(self, now: float) -> float:
+        """Забирает токен; возвращает 0 или сколько секунд ждать до следующего"""
+        self.refill(now)
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.refill_per_second
+
+
+class RateLimiter:
+    """Лимитер по паре (пользователь, команда)"""
+
+    def __init__(self, capacity: int, refill_seconds: float, clock=time.monotonic):
+        self.capacity = capacity
+        self.refill_per_second = 1 / refill_seconds
+        self.clock = clock
+        self._buckets: dict[tuple[int, str], TokenBucket] = {}
+        self.allowed: dict[str, int] = {}
+        self.rejected: dict[str, int] = {}
+
+    def check(self, user_id: int, command: str) -> float:
+        """Возвращает 0, если вызов разрешён, иначе время ожидания в секундах"""
+        now = self.clock()
+        key = (user_id, command)
+
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            self._prune(now)
+            bucket = TokenBucket(self.capacity, self.refill_per_second, self.capacity, now)
+            self._buckets[key] = bucket
+
+        retry_after = bucket.try_acquire(now)
+        counters = self.rejected if retry_after else self.allowed
+        counters[command] = counters.get(command, 0) + 1
+        return retry_after
+
+    def _prune(self, now: float) -> None:
+        """Забывает пользователей, чьи корзины уже полностью восстановились"""
+        if len(self._buckets) < MAX_TRACKED_BUCKETS:
+            return
+        for key, bucket in list(self._buckets.items()):
+            bucket.refill(now)
+            if bucket.tokens >= bucket.capacity:
+                del self._buckets[key]
+
+    def snapshot(self) -> dict[str, Any]:
+        """Счётчики разрешённых и отклонённых вызовов"""
+        return {
+            "tracked_users": len({user_id for user_id, _ in self._buckets}),
+            "allowed": dict(self.allowed),
+            "rejected": dict(self.rejected),
+        }
+
+
+diagnostics_limiter = RateLimiter(
+    capacity=settings.diagnostics_rate_limit_capacity,
+    refill_seconds=settings.diagnostics_rate_limit_refill_seconds,
+)
+diagnostics_cache = ResultCache(ttl_seconds=settings.diagnostics_cache_ttl_seconds)
+
+
+def rate_limited(command: str):
+    """Декоратор обработчика: отклоняет вызовы сверх лимита пользователя"""
+
+    def decorator(callback: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]:
+        @wraps(callback)
+        async def wrapper(update: Update, context: ContextTypes.DEFAULT_TYPE):
+            retry_after = diagnostics_limiter.check(update.effective_user.id, command)
+            if retry_after:
+                logger.info(f"Rate limited /{command} for user {update.effective_user.id}")
+                await update.message.reply_text(
+                    f"⏳ Слишком частые запросы. Повторите через {int(retry_after) + 1} с."
+                )
+                return None
+            return await callback(update, context)
+
+        return wrapper
+
+    return decorator
+
+
+def is_admin(telegram_id: int) -> bool:
+    """Проверка, что пользователь указан в списке администраторов"""
+    return telegram_id in settings.admin_telegram_ids
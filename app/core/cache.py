@@ -0,0 +1,56 @@
+"""Кэш результатов обращений к внешним системам с коротким сроком жизни.
+
+Используется диагностическими командами бота (app/bot/throttling.py) и
+пробами здоровья (app/services/health_service.py).
+"""
+
+import asyncio
+import time
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+
+class ResultCache:
+    """Кэш результатов с коротким сроком жизни.
+
+    Одновременные промахи по одному ключу ждут единственный запрос,
+    а не идут во внешнюю систему каждый сам по себе.
+    """
+
+    def __init__(self, ttl_seconds: float, clock=time.monotonic):
+        self.ttl_seconds = ttl_seconds
+        self.clock = clock
+        self._values: dict[str, tuple[float, Any]] = {}
+        self._locks: dict[str, asyncio.Lock] = {}
+        self.hits: dict[str, int] = {}
+        self.misses: dict[str, int] = {}
+
+    async def get_or_fetch(self, key: str, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        """Значение из кэша или результат fetch, сохранённый на ttl_seconds"""
+        cached = self._fresh(key)
+        if cached is not None:
+            self.hits[key] = self.hits.get(key, 0) + 1
+            return cached[1]
+
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            cached = self._fresh(key)
+            if cached is not None:
+                self.hits[key] = self.hits.get(key, 0) + 1
+                return cached[1]
+
+            self.misses[key] = self.misses.get(key, 0) + 1
+            value = await fetch()
+            self._values[key] = (self.clock(), value)
+            return value
+
+    def _fresh(self, key: str) -> tuple[float, Any] | None:
+        """Запись кэша, если она ещё не устарела"""
+        cached = self._values.get(key)
+        if cached and self.clock() - cached[0] < self.ttl_seconds:
+            return cached
+        return None
+
+    def snapshot(self) -> dict[str, Any]:
+        """Счётчики попаданий и промахов"""
+        return {"hits": dict(self.hits), "misses": dict(self.misses)}
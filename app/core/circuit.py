@@ -0,0 +1,84 @@
+"""Размыкатель цепи (circuit breaker) для внешних API.
+
+Когда API лежит или упирается в лимиты, каждая задача генерации резюме
+ждёт таймаутов и повторов по всем статьям подряд. После
+failure_threshold сбоев подряд размыкатель открывается, и вызовы
+отклоняются сразу, не доходя до сети. Через reset_seconds пропускается
+один пробный вызов: успех закрывает цепь, сбой снова открывает её.
+Отменённый пробный вызов (проигравший дублирующему запросу или прерванный
+лимитом времени задачи) тоже снова открывает цепь, иначе она навсегда
+осталась бы в ожидании пробы.
+
+Состояние хранится в памяти процесса: у каждого воркера свой размыкатель.
+"""
+
+import time
+from collections.abc import Callable
+
+from loguru import logger
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """Размыкатель с пробным вызовом после паузы"""
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int,
+        reset_seconds: float,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.clock = clock
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+
+    @property
+    def retry_in(self) -> float:
+        """Секунд до пробного вызова; 0, если цепь не открыта"""
+        if self.state != OPEN:
+            return 0.0
+        return max(0.0, self.opened_at + self.reset_seconds - self.clock())
+
+    def allow(self) -> bool:
+        """Можно ли выполнять вызов; после паузы пропускается один пробный"""
+        if self.state == CLOSED:
+            return True
+        if self.state == OPEN and self.retry_in == 0:
+            self.state = HALF_OPEN
+            logger.info(f"Circuit {self.name} half-open, sending a probe")
+            return True
+        # Открыта или пробный вызов ещё не вернулся
+        return False
+
+    def record_success(self) -> None:
+        if self.state != CLOSED:
+            logger.info(f"Circuit {self.name} closed")
+        self.state = CLOSED
+        self.failures = 0
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != OPEN:
+                logger.warning(
+                    f"Circuit {self.name} opened after {self.failures} failures "
+                    f"for {self.reset_seconds}s"
+                )
+            self.state = OPEN
+            self.opened_at = self.clock()
+
+    def release_probe(self) -> None:
+        """Пробный вызов отменён, исхода нет: цепь снова открыта до следующей паузы"""
+        if self.state != HALF_OPEN:
+            return
+        logger.info(f"Circuit {self.name} probe cancelled, reopening")
+        self.state = OPEN
+        self.opened_at = self.clock()
@@ -12,14 +12,118 @@ class Settings(BaseSettings):
     yandex_api_key: str
     yandex_folder_id: str
     yandex_model: str = "yandexgpt-lite"  # yandexgpt-lite или yandexgpt
+    # Бюджет токенов на текст статьи в промпте по моделям
+    yandex_prompt_budgets: dict[str, int] = {"yandexgpt-lite": 1000, "yandexgpt": 1500}
+    yandex_prompt_lead_sentences: int = 2
+    yandex_max_retries: int = 3
+    yandex_retry_base_seconds: float = 1.0
+    yandex_retry_max_seconds: float = 30.0
+    yandex_circuit_failures: int = 5
+    yandex_circuit_reset_seconds: float = 60.0
+    llm_router_providers: list[str] = ["yandexgpt-lite", "yandexgpt", "extractive"]
+    llm_router_latency_budget_seconds: float = 10.0
+    llm_router_max_error_rate: float = 0.5
+    llm_router_max_in_flight: int = 4
+    llm_router_probe_seconds: float = 300.0
+    llm_router_alpha: float = 0.2
+    llm_router_hedge_factor: float = 2.0
+    llm_router_hedge_min_seconds: float = 3.0
+    summary_local_max_chars: int = 500
+    summary_low_priority_local: bool = True
+    textrank_sentences: int = 3
+    summary_max_attempts: int = 5
+    summary_retry_base_minutes: int = 30
+    summary_retry_max_hours: int = 24
+    yandex_batch_size: int = 200
+    yandex_batch_concurrency: int = 10
+    yandex_batch_poll_seconds: float = 5.0
+    yandex_batch_timeout_seconds: float = 3600.0
+    yandex_batch_hour: int = 3
+    pipeline_enabled: bool = True
+    pipeline_fetch_body: bool = True
+    pipeline_delivery_debounce_seconds: int = 60
+    pipeline_stall_minutes: int = 30
+    pipeline_metrics_interval_seconds: int = 60
 
     habr_base_url: str = "https://habr.com"
     parsing_interval_hours: int = 6
+    hub_directory_refresh_hours: int = 24
+    hub_directory_max_pages: int = 100
+    hub_backoff_max_hours: int = 720
     max_articles_per_parsing: int = 50
+    parsing_fanout: bool = False
+    parsing_fanout_batch_size: int = 1
+    parsing_topic_max_retries: int = 3
+    parsing_topic_retry_delay_seconds: int = 60
+    crawl_queue: str = "crawl"
+    parsing_fanout_lease_seconds: int = 3600
+
+    lease_ttl_seconds: int = 120
+
+    dedup_max_distance: int = 6
+    dedup_min_shingles: int = 8
+    dedup_lookback_days: int = 30
+
+    cleanup_interval_hours: int = 24
+    cleanup_articles_days: int = 30
+    cleanup_logs_days: int = 7
+    cleanup_batch_size: int = 1000
+    sent_articles_retention_days: int = 90
+    partition_premake_days: int = 7
+
+    digest_lookback_days: int = 14
+    sent_history_capacity: int = 2000
+    sent_history_error_rate: float = 0.01
+
+    ranking_half_life_hours: float = 48.0
+    ranking_weight_match: float = 1.0
+    ranking_weight_history: float = 0.5
+    ranking_weight_quality: float = 0.5
+    ranking_batch_rows: int = 1024
+    ranking_max_candidates: int = 500  # на тему подписки
+    ranking_oversample: int = 4
+
+    semantic_dimensions: int = 512
+    semantic_probes: int = 4
+    semantic_min_train_rows: int = 256
+    semantic_min_similarity: float = 0.2
+    semantic_max_articles: int = 5000
+    semantic_rebuild_hours: int = 24
+    semantic_backfill_limit: int = 100
+
+    db_slow_query_seconds: float = 0.5
+    db_explain_slow_queries: bool = False
+    db_scope_statements_warning: int = 100
+
+    metrics_worker_port: int = 0
+    metrics_pushgateway_url: str = ""
+
+    health_cache_ttl_seconds: float = 5.0
+    health_probe_timeout_seconds: float = 2.0
+    health_critical_probes: list[str] = ["database", "redis", "broker"]
+
+    profiling_tasks: list[str] = []
+    profiling_routes: list[str] = []
+    profiling_sample_rate: float = 1.0
+    profiling_engine: str = "sampling"  # sampling, cprofile или pyinstrument
+    profiling_interval_ms: float = 5.0
+    profiling_dir: str = "profiles"
+    profiling_max_files: int = 50
+
+    bot_max_concurrent_updates: int = 16
+    bot_slow_handler_seconds: float = 2.0
+    admin_telegram_ids: list[int] = []
+    admin_api_token: str = ""
+
+    diagnostics_rate_limit_capacity: int = 3
+    diagnostics_rate_limit_refill_seconds: float = 60.0
+    diagnostics_cache_ttl_seconds: float = 60.0
 
     debug: bool = True
     log_level: str = "INFO"
     log_file: str = ""
+    tracing_file: str = ""
+    tracing_service_name: str = "habrdigest"
     secret_key: str = "your-secret-key-change-in-production"
 
     celery_broker_url: str = "redis://localhost:6379/1"
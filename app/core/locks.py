@@ -0,0 +1,191 @@
+"""Распределённые аренды (leases) в Redis для периодических задач.
+
+Если запуск задачи по расписанию длится дольше интервала, следующий
+запуск начнётся поверх него: двойная нагрузка на Хабр, двойные траты на
+модель и, хуже всего, повторная рассылка дайджестов. Аренда гарантирует,
+что задача с данным именем выполняется в одном экземпляре; второй
+экземпляр видит занятую аренду и пропускает запуск.
+
+Аренда выдаётся на короткий срок и продлевается фоновым потоком, пока
+задача жива. Если воркер умер, аренда истечёт сама.
+"""
+
+import json
+import os
+import socket
+import threading
+import time
+import uuid
+from contextvars import ContextVar
+from functools import wraps
+
+import redis
+from celery import current_task
+from loguru import logger
+
+from app.core.config import settings
+from app.core.redis import get_redis
+
+KEY_PREFIX = "lease:"
+
+# Продление и снятие только своей аренды: значение сверяется по токену
+_RENEW_SCRIPT = """
+local current = redis.call('get', KEYS[1])
+if not current or cjson.decode(current)['token'] ~= ARGV[1] then
+    return 0
+end
+redis.call('set', KEYS[1], ARGV[2], 'PX', ARGV[3])
+return 1
+"""
+
+_RELEASE_SCRIPT = """
+local current = redis.call('get', KEYS[1])
+if not current or cjson.decode(current)['token'] ~= ARGV[1] then
+    return 0
+end
+return redis.call('del', KEYS[1])
+"""
+
+current_lease: ContextVar["RedisLease | None"] = ContextVar("current_lease", default=None)
+
+
+class RedisLease:
+    """Аренда с именем, владельцем и продлением по heartbeat"""
+
+    def __init__(self, name: str, ttl_seconds: int | None = None, task_id: str | None = None):
+        self.name = name
+        self.key = f"{KEY_PREFIX}{name}"
+        self.ttl_seconds = ttl_seconds or settings.lease_ttl_seconds
+        self.token = uuid.uuid4().hex
+        self.info = {
+            "token": self.token,
+            "holder": f"{socket.gethostname()}:{os.getpid()}",
+            "task_id": task_id,
+            "acquired_at": None,
+            "renewed_at": None,
+        }
+        self.lost = False
+        self._handed_off = False
+        self._stop = threading.Event()
+        self._heartbeat: threading.Thread | None = None
+
+    def acquire(self) -> bool:
+        """Попытка занять аренду; False, если её держит кто-то другой"""
+        now = time.time()
+        self.info["acquired_at"] = self.info["renewed_at"] = now
+        acquired = get_redis().set(
+            self.key, json.dumps(self.info), nx=True, px=self.ttl_seconds * 1000
+        )
+        if acquired:
+            self._start_heartbeat()
+        return bool(acquired)
+
+    def renew(self, ttl_seconds: int | None = None) -> bool:
+        """Продление аренды, если она всё ещё наша"""
+        self.info["renewed_at"] = time.time()
+        ttl_ms = (ttl_seconds or self.ttl_seconds) * 1000
+        renewed = get_redis().eval(
+            _RENEW_SCRIPT, 1, self.key, self.token, json.dumps(self.info), ttl_ms
+        )
+        return bool(renewed)
+
+    def release(self) -> None:
+        """Снятие аренды; чужую аренду не трогает"""
+        self._stop_heartbeat()
+        if self._handed_off:
+            return
+        release_token(self.name, self.token)
+
+    def hand_off(self, ttl_seconds: int) -> str:
+        """Передача аренды другим задачам без heartbeat.
+
+        Нужна, когда работа продолжается в подзадачах после выхода из задачи:
+        аренда живёт ttl_seconds или до release_token с возвращённым токеном.
+        """
+        self._stop_heartbeat()
+        self._handed_off = True
+        self.renew(ttl_seconds)
+        return self.token
+
+    def current_holder(self) -> dict | None:
+        """Сведения о текущем держателе аренды"""
+        value = get_redis().get(self.key)
+        return json.loads(value) if value else None
+
+    def _start_heartbeat(self) -> None:
+        self._heartbeat = threading.Thread(
+            target=self._heartbeat_loop, name=f"lease-heartbeat-{self.name}", daemon=True
+        )
+        self._heartbeat.start()
+
+    def _stop_heartbeat(self) -> None:
+        self._stop.set()
+        if self._heartbeat is not None:
+            self._heartbeat.join(timeout=5)
+            self._heartbeat = None
+
+    def _heartbeat_loop(self) -> None:
+        interval = max(1.0, self.ttl_seconds / 3)
+        while not self._stop.wait(interval):
+            try:
+                if not self.renew():
+                    self.lost = True
+                    logger.error(f"Lease {self.name} was lost, another run may start")
+                    return
+            except redis.RedisError:
+                logger.exception(f"Error renewing lease {self.name}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.release()
+
+
+def release_token(name: str, token: str) -> bool:
+    """Снятие аренды по токену, например из callback-задачи"""
+    return bool(get_redis().eval(_RELEASE_SCRIPT, 1, f"{KEY_PREFIX}{name}", token))
+
+
+def list_leases() -> list[dict]:
+    """Все занятые аренды с владельцами и оставшимся сроком"""
+    client = get_redis()
+    leases = []
+    for key in client.scan_iter(match=f"{KEY_PREFIX}*"):
+        value = client.get(key)
+        if not value:
+            continue
+        info = json.loads(value)
+        info.pop("token", None)
+        info["name"] = key.removeprefix(KEY_PREFIX)
+        info["expires_in_seconds"] = max(0, client.pttl(key)) / 1000
+        leases.append(info)
+    return sorted(leases, key=lambda lease: lease["name"])
+
+
+def exclusive(name: str, ttl_seconds: int | None = None):
+    """Декоратор задачи: выполнить, только если аренда свободна, иначе пропустить"""
+
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            task_id = current_task.request.id if current_task else None
+            lease = RedisLease(name, ttl_seconds, task_id=task_id)
+            if not lease.acquire():
+                holder = lease.current_holder() or {}
+                logger.warning(
+                    f"Skipping {name}: already running on {holder.get('holder')} "
+                    f"(task {holder.get('task_id')})"
+                )
+                return None
+
+            token = current_lease.set(lease)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                current_lease.reset(token)
+                lease.release()
+
+        return wrapper
+
+    return decorator
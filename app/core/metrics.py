@@ -0,0 +1,209 @@
+"""Метрики Prometheus для всех частей сервиса.
+
+Метрики объявлены в одном месте, чтобы имена и метки не расходились между
+парсером, моделью, рассылкой и базой. API отдаёт их на /metrics. Воркеры
+Celery работают в нескольких процессах, поэтому при заданной переменной
+PROMETHEUS_MULTIPROC_DIR значения пишутся в общий каталог и собираются
+MultiProcessCollector (см. celery_app/monitoring.py).
+"""
+
+import os
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+# Хабр: загрузка и разбор страниц
+HABR_FETCH_SECONDS = Histogram(
+    "habrdigest_habr_fetch_seconds",
+    "Время загрузки страницы Хабра",
+    ["page"],
+)
+HABR_FETCH_BYTES = Counter(
+    "habrdigest_habr_fetch_bytes_total",
+    "Объём загруженных страниц Хабра",
+    ["page"],
+)
+HABR_FETCH_ERRORS = Counter(
+    "habrdigest_habr_fetch_errors_total",
+    "Неудачные загрузки страниц Хабра",
+    ["page", "reason"],
+)
+HABR_PARSE_SECONDS = Histogram(
+    "habrdigest_habr_parse_seconds",
+    "Время разбора страницы со списком статей",
+)
+DUPLICATE_ARTICLES = Counter(
+    "habrdigest_duplicate_articles_total",
+    "Новые статьи, признанные копиями уже сохранённых",
+)
+
+# YandexGPT
+YANDEX_REQUEST_SECONDS = Histogram(
+    "habrdigest_yandex_request_seconds",
+    "Время запроса к YandexGPT",
+    ["model"],
+    buckets=(0.25, 0.5, 1, 2, 3, 5, 8, 13, 21, 30),
+)
+YANDEX_TOKENS = Counter(
+    "habrdigest_yandex_tokens_total",
+    "Токены, потраченные на запросы к YandexGPT",
+    ["model", "kind"],
+)
+YANDEX_ERRORS = Counter(
+    "habrdigest_yandex_errors_total",
+    "Ошибки запросов к YandexGPT по статусу",
+    ["model", "status"],
+)
+YANDEX_RETRIES = Counter(
+    "habrdigest_yandex_retries_total",
+    "Повторы запросов к YandexGPT после временных сбоев",
+    ["model"],
+)
+YANDEX_CIRCUIT_OPEN = Gauge(
+    "habrdigest_yandex_circuit_open",
+    "Размыкатель запросов к YandexGPT открыт (1) или закрыт (0)",
+    ["model"],
+)
+YANDEX_BATCH_OPERATIONS = Counter(
+    "habrdigest_yandex_batch_operations_total",
+    "Отложенные операции YandexGPT по исходу",
+    ["model", "result"],  # done, failed, rejected, expired
+)
+
+# Выбор поставщика резюме
+SUMMARY_ROUTED = Counter(
+    "habrdigest_summary_provider_calls_total",
+    "Вызовы поставщиков резюме по исходу",
+    ["provider", "outcome"],  # ok, error, hedged
+)
+SUMMARY_HEDGES = Counter(
+    "habrdigest_summary_hedges_total",
+    "Запросы резюме, продублированные другому поставщику из-за медленного ответа",
+    ["provider"],
+)
+SUMMARY_PROVIDER_LATENCY = Gauge(
+    "habrdigest_summary_provider_latency_seconds",
+    "Скользящая средняя задержки поставщика резюме",
+    ["provider"],
+)
+SUMMARY_PROVIDER_ERROR_RATE = Gauge(
+    "habrdigest_summary_provider_error_rate",
+    "Скользящая средняя доли ошибок поставщика резюме",
+    ["provider"],
+)
+
+# Конвейер статей (app/services/pipeline.py)
+PIPELINE_QUEUE_DEPTH = Gauge(
+    "habrdigest_pipeline_queue_depth",
+    "Статьи, ждущие перехода с этапа",
+    ["stage"],
+    multiprocess_mode="mostrecent",
+)
+PIPELINE_STAGE_SECONDS = Histogram(
+    "habrdigest_pipeline_stage_seconds",
+    "Время от предыдущего этапа статьи до перехода на этот",
+    ["stage"],
+    buckets=(1, 5, 15, 30, 60, 120, 300, 900, 1800, 3600, 4 * 3600, 24 * 3600),
+)
+PIPELINE_TOTAL_SECONDS = Histogram(
+    "habrdigest_pipeline_total_seconds",
+    "Время от сохранения статьи до готовности к рассылке",
+    buckets=(5, 15, 30, 60, 120, 300, 900, 1800, 3600, 4 * 3600, 24 * 3600),
+)
+
+# Рассылка
+DIGESTS_SENT = Counter("habrdigest_digests_sent_total", "Отправленные дайджесты")
+DIGEST_ERRORS = Counter("habrdigest_digest_errors_total", "Ошибки отправки дайджестов")
+SENT_HISTORY_CHECKS = Counter(
+    "habrdigest_sent_history_checks_total",
+    "Проверки «статья уже отправлена» по фильтру в Redis",
+    ["result"],  # miss, hit, false_positive, fallback
+)
+TELEGRAM_SEND_SECONDS = Histogram(
+    "habrdigest_telegram_send_seconds",
+    "Время отправки сообщения в Telegram",
+)
+
+# Бот
+BOT_HANDLER_SECONDS = Histogram(
+    "habrdigest_bot_handler_seconds",
+    "Время обработки апдейта обработчиком бота",
+    ["handler"],
+)
+
+# База данных
+DB_QUERY_SECONDS = Histogram(
+    "habrdigest_db_query_seconds",
+    "Время выполнения SQL-запроса",
+    ["operation"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+)
+DB_POOL_WAIT_SECONDS = Histogram(
+    "habrdigest_db_pool_wait_seconds",
+    "Ожидание свободного соединения в пуле",
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 30),
+)
+DB_POOL_CHECKED_OUT = Gauge(
+    "habrdigest_db_pool_checked_out",
+    "Соединения, взятые из пула",
+    multiprocess_mode="livesum",
+)
+DB_SLOW_QUERIES = Counter(
+    "habrdigest_db_slow_queries_total",
+    "SQL-запросы дольше DB_SLOW_QUERY_SECONDS",
+    ["operation"],
+)
+DB_SCOPE_STATEMENTS = Histogram(
+    "habrdigest_db_scope_statements",
+    "Число SQL-запросов на HTTP-запрос, апдейт бота или задачу",
+    ["scope"],
+    buckets=(0, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 5000),
+)
+DB_SCOPE_SECONDS = Histogram(
+    "habrdigest_db_scope_seconds",
+    "Суммарное время в базе на HTTP-запрос, апдейт бота или задачу",
+    ["scope"],
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 15, 60),
+)
+
+# HTTP API
+HTTP_REQUEST_SECONDS = Histogram(
+    "habrdigest_http_request_seconds",
+    "Время обработки HTTP-запроса",
+    ["method", "route", "status"],
+)
+
+# Celery
+TASK_SECONDS = Histogram(
+    "habrdigest_task_seconds",
+    "Время выполнения задачи Celery",
+    ["task"],
+    buckets=(0.1, 0.5, 1, 5, 15, 30, 60, 120, 300, 600, 1800),
+)
+TASK_RESULTS = Counter(
+    "habrdigest_task_results_total",
+    "Завершённые задачи Celery по состоянию",
+    ["task", "state"],
+)
+
+
+def collector_registry() -> CollectorRegistry:
+    """Реестр для выдачи метрик: общий каталог процессов или реестр процесса"""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return registry
+    return REGISTRY
+
+
+def render_latest() -> tuple[bytes, str]:
+    """Текущие значения метрик в формате Prometheus"""
+    return generate_latest(collector_registry()), CONTENT_TYPE_LATEST
@@ -0,0 +1,245 @@
+"""Профилирование задач Celery и ручек API по настройкам.
+
+Профилирование включается без изменения кода: PROFILING_TASKS задаёт имена
+задач, PROFILING_ROUTES — шаблоны путей ручек ("*" — все), а
+PROFILING_SAMPLE_RATE — долю профилируемых вызовов. Профили пишутся в
+PROFILING_DIR, старые файлы сверх PROFILING_MAX_FILES удаляются.
+
+Движки (PROFILING_ENGINE):
+
+* sampling — встроенный сэмплер стеков всех потоков процесса. Видит и
+  поток задачи, и event loop воркера, в котором выполняются корутины.
+  Пишет .folded (свёрнутые стеки для speedscope или flamegraph.pl).
+* cprofile — детерминированный cProfile, только вызывающий поток; .prof
+  открывается snakeviz или pstats.
+* pyinstrument — если пакет установлен; понимает async, только вызывающий
+  поток; пишет .html.
+
+cProfile и pyinstrument ставят на поток единственный хук профилирования, а
+ручки работают конкурентно в одном event loop. Поэтому такой профиль в
+процессе одновременно только один: вызов, пришедший во время чужого
+профиля, выполняется без профилирования.
+"""
+
+import cProfile
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from collections.abc import AsyncIterator, Iterator
+from contextlib import ExitStack, contextmanager
+from dataclasses import dataclass
+from datetime import UTC, datetime
+from pathlib import Path
+
+from fastapi import Request
+from loguru import logger
+
+from app.core.config import settings
+
+try:
+    import pyinstrument
+except ImportError:  # необязательная зависимость
+    pyinstrument = None
+
+EXTENSIONS = {"sampling": "folded", "cprofile": "prof", "pyinstrument": "html"}
+
+# Занят, пока работает cProfile или pyinstrument
+_hook_profiler = threading.Lock()
+
+
+class StackSampler:
+    """Периодический снимок стеков всех потоков, кроме собственного"""
+
+    def __init__(self, interval_seconds: float):
+        self.interval_seconds = interval_seconds
+        self.samples: Counter[str] = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval_seconds):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(
+                        f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+                    )
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                self.samples[";".join(reversed(stack))] += 1
+
+    def folded(self) -> str:
+        """Свёрнутые стеки: «поток;функция;…;функция число»"""
+        return "".join(f"{stack} {count}\n" for stack, count in self.samples.most_common())
+
+
+@dataclass
+class ProfileInfo:
+    """Сохранённый профиль"""
+
+    name: str
+    size: int
+    created_at: datetime
+
+
+def _matches(target: str, patterns: list[str]) -> bool:
+    """Совпадение с "*", полным именем или коротким именем задачи"""
+    return "*" in patterns or target in patterns or target.rsplit(".", 1)[-1] in patterns
+
+
+def should_profile(kind: str, target: str) -> bool:
+    """Профилировать ли вызов: задача или ручка в списке и выпал жребий"""
+    patterns = settings.profiling_tasks if kind == "task" else settings.profiling_routes
+    if not patterns or not _matches(target, patterns):
+        return False
+    return random.random() < settings.profiling_sample_rate
+
+
+def _engine() -> str:
+    engine = settings.profiling_engine
+    if engine == "pyinstrument" and pyinstrument is None:
+        logger.warning("pyinstrument is not installed, falling back to the sampling profiler")
+        return "sampling"
+    return engine if engine in EXTENSIONS else "sampling"
+
+
+def _profile_path(kind: str, target: str, engine: str) -> Path:
+    directory = Path(settings.profiling_dir)
+    directory.mkdir(parents=True, exist_ok=True)
+    slug = re.sub(r"[^A-Za-z0-9_.-]+", "_", target).strip("_") or "root"
+    stamp = datetime.now(UTC).strftime("%Y%m%dT%H%M%S%f")
+    return directory / f"{stamp}_{kind}_{slug}_{os.getpid()}.{EXTENSIONS[engine]}"
+
+
+@contextmanager
+def profile(kind: str, target: str) -> Iterator[None]:
+    """Профиль блока кода с сохранением в каталог профилей"""
+    engine = _engine()
+    if engine != "sampling" and not _hook_profiler.acquire(blocking=False):
+        logger.debug(f"Skipping profile of {kind} {target}: another {engine} profile is active")
+        yield
+        return
+
+    started = time.perf_counter()
+    try:
+        if engine == "sampling":
+            profiler = StackSampler(settings.profiling_interval_ms / 1000)
+            profiler.start()
+        elif engine == "cprofile":
+            profiler = cProfile.Profile()
+            profiler.enable()
+        else:
+            profiler = pyinstrument.Profiler(async_mode="enabled")
+            profiler.start()
+    except (RuntimeError, ValueError):
+        # Хук уже занят профилировщиком вне этого модуля, например coverage
+        logger.warning(f"Skipping profile of {kind} {target}: another profiler is active")
+        if engine != "sampling":
+            _hook_profiler.release()
+        yield
+        return
+
+    try:
+        yield
+    finally:
+        path = _profile_path(kind, target, engine)
+        try:
+            if engine == "sampling":
+                profiler.stop()
+                path.write_text(profiler.folded(), encoding="utf-8")
+            elif engine == "cprofile":
+                profiler.disable()
+                profiler.dump_stats(path)
+            else:
+                profiler.stop()
+                path.write_text(profiler.output_html(), encoding="utf-8")
+            logger.info(
+                f"Profile of {kind} {target} ({time.perf_counter() - started:.2f}s) saved to {path}"
+            )
+            rotate_profiles()
+        except OSError:
+            logger.exception(f"Error saving profile of {kind} {target}")
+        finally:
+            if engine != "sampling":
+                _hook_profiler.release()
+
+
+class TaskProfiles:
+    """Профили задач между сигналами task_prerun и task_postrun"""
+
+    def __init__(self):
+        self._active: dict[str, ExitStack] = {}
+
+    def start(self, task_id: str, task_name: str) -> None:
+        """Начало профиля, если задача выбрана для профилирования"""
+        if should_profile("task", task_name):
+            stack = ExitStack()
+            stack.enter_context(profile("task", task_name))
+            self._active[task_id] = stack
+
+    def stop(self, task_id: str) -> None:
+        """Сохранение профиля задачи"""
+        stack = self._active.pop(task_id, None)
+        if stack is not None:
+            stack.close()
+
+
+task_profiles = TaskProfiles()
+
+
+async def profile_route(request: Request) -> AsyncIterator[None]:
+    """Зависимость роутера: профиль ручки, если её шаблон пути выбран"""
+    route = request.scope.get("route")
+    path = route.path if route else request.url.path
+    if not should_profile("route", path):
+        yield
+        return
+    with profile("route", f"{request.method} {path}"):
+        yield
+
+
+def rotate_profiles() -> None:
+    """Удаление старых профилей сверх PROFILING_MAX_FILES"""
+    for info in list_profiles()[settings.profiling_max_files :]:
+        (Path(settings.profiling_dir) / info.name).unlink(missing_ok=True)
+
+
+def list_profiles() -> list[ProfileInfo]:
+    """Сохранённые профили, новые первыми"""
+    directory = Path(settings.profiling_dir)
+    if not directory.is_dir():
+        return []
+    profiles = []
+    for path in directory.iterdir():
+        if path.suffix.lstrip(".") not in EXTENSIONS.values():
+            continue
+        stat = path.stat()
+        profiles.append(
+            ProfileInfo(path.name, stat.st_size, datetime.fromtimestamp(stat.st_mtime, UTC))
+        )
+    # Имя начинается с отметки времени, поэтому сортировка по имени — по времени
+    return sorted(profiles, key=lambda info: info.name, reverse=True)
+
+
+def profile_path(name: str) -> Path | None:
+    """Путь к профилю по имени; None, если такого профиля нет"""
+    if name != os.path.basename(name):
+        return None
+    path = Path(settings.profiling_dir) / name
+    return path if path.is_file() and path.suffix.lstrip(".") in EXTENSIONS.values() else None
@@ -0,0 +1,11 @@
+from functools import lru_cache
+
+import redis
+
+from app.core.config import settings
+
+
+@lru_cache
+def get_redis() -> redis.Redis:
+    """Общий клиент Redis приложения (не брокер Celery)"""
+    return redis.Redis.from_url(settings.redis_url, decode_responses=True)
@@ -0,0 +1,199 @@
+"""Трассировка этапов конвейера.
+
+Спаны совместимы с OpenTelemetry: идентификаторы трасс и спанов в формате
+W3C, контекст передаётся между процессами строкой traceparent, а готовая
+трасса записывается в TRACING_FILE одной строкой OTLP/JSON — такой файл
+читает приёмник otlpjsonfile в OpenTelemetry Collector.
+
+Спан с параметром stage добавляет свою длительность к сумме этого этапа
+в корневом спане процесса. Из этих сумм задачи заполняют колонки
+fetch_seconds, parse_seconds, db_seconds и summarize_seconds в ParsingLog.
+"""
+
+import json
+import os
+import secrets
+import threading
+import time
+from collections import defaultdict
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any
+
+from loguru import logger
+
+from app.core.config import settings
+
+STAGES = ("fetch", "parse", "db", "summarize")
+
+_STATUS_OK = 1
+_STATUS_ERROR = 2
+_SPAN_KIND_INTERNAL = 1
+
+_current_span: ContextVar["Span | None"] = ContextVar("current_span", default=None)
+_export_lock = threading.Lock()
+
+
+@dataclass
+class Span:
+    """Один замеренный участок работы"""
+
+    name: str
+    trace_id: str
+    span_id: str
+    parent_span_id: str | None
+    attributes: dict[str, Any]
+    stage: str | None = None
+    start_ns: int = field(default_factory=time.time_ns)
+    end_ns: int | None = None
+    error: str | None = None
+    root: "Span | None" = None
+    # Заполняются только у корневого спана процесса
+    stages: dict[str, float] = field(default_factory=lambda: defaultdict(float))
+    finished: list["Span"] = field(default_factory=list)
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+    @property
+    def duration(self) -> float:
+        """Длительность в секундах"""
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e9
+
+    @property
+    def traceparent(self) -> str:
+        """Контекст для продолжения трассы в другом процессе"""
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def fail(self, message: str) -> None:
+        """Пометка спана ошибкой без исключения"""
+        self.error = message
+
+    def stage_seconds(self) -> dict[str, float]:
+        """Суммарное время по этапам для колонок ParsingLog"""
+        return {stage: round(self.stages.get(stage, 0.0), 3) for stage in STAGES}
+
+
+def current_span() -> Span | None:
+    """Активный спан текущего контекста"""
+    return _current_span.get()
+
+
+def _parse_traceparent(traceparent: str | None) -> tuple[str, str] | None:
+    """Идентификаторы трассы и родителя из traceparent"""
+    if not traceparent:
+        return None
+    parts = traceparent.split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    return parts[1], parts[2]
+
+
+@contextmanager
+def span(
+    name: str, stage: str | None = None, traceparent: str | None = None, **attributes: Any
+) -> Iterator[Span]:
+    """Спан вокруг блока кода; вложенные спаны становятся его потомками.
+
+    traceparent продолжает трассу из другого процесса, если в текущем
+    контексте спана нет.
+    """
+    parent = _current_span.get()
+    if parent is not None:
+        trace_id, parent_id = parent.trace_id, parent.span_id
+    elif remote := _parse_traceparent(traceparent):
+        trace_id, parent_id = remote
+    else:
+        trace_id, parent_id = secrets.token_hex(16), None
+
+    current = Span(name, trace_id, secrets.token_hex(8), parent_id, attributes, stage)
+    current.root = parent.root if parent is not None else current
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.fail(f"{type(e).__name__}: {e}")
+        raise
+    finally:
+        _current_span.reset(token)
+        _finish(current)
+
+
+def _finish(current: Span) -> None:
+    """Учёт завершённого спана в корне и выгрузка трассы по завершении корня"""
+    current.end_ns = time.time_ns()
+    root = current.root
+    with root.lock:
+        if current.stage:
+            root.stages[current.stage] += current.duration
+        root.finished.append(current)
+
+    if current is root and settings.tracing_file:
+        _export(root.finished)
+
+
+def _attribute(key: str, value: Any) -> dict:
+    if isinstance(value, bool):
+        typed = {"boolValue": value}
+    elif isinstance(value, int):
+        typed = {"intValue": str(value)}
+    elif isinstance(value, float):
+        typed = {"doubleValue": value}
+    else:
+        typed = {"stringValue": str(value)}
+    return {"key": key, "value": typed}
+
+
+def _otlp_span(item: Span) -> dict:
+    attributes = dict(item.attributes)
+    if item.stage:
+        attributes["habrdigest.stage"] = item.stage
+    payload = {
+        "traceId": item.trace_id,
+        "spanId": item.span_id,
+        "name": item.name,
+        "kind": _SPAN_KIND_INTERNAL,
+        "startTimeUnixNano": str(item.start_ns),
+        "endTimeUnixNano": str(item.end_ns),
+        "attributes": [_attribute(key, value) for key, value in attributes.items()],
+        "status": (
+            {"code": _STATUS_ERROR, "message": item.error} if item.error else {"code": _STATUS_OK}
+        ),
+    }
+    if item.parent_span_id:
+        payload["parentSpanId"] = item.parent_span_id
+    return payload
+
+
+def otlp_json(spans: list[Span]) -> dict:
+    """Трасса в формате OTLP/JSON (ExportTraceServiceRequest)"""
+    resource = [
+        _attribute("service.name", settings.tracing_service_name),
+        _attribute("process.pid", os.getpid()),
+    ]
+    return {
+        "resourceSpans": [
+            {
+                "resource": {"attributes": resource},
+                "scopeSpans": [
+                    {
+                        "scope": {"name": "app.core.tracing"},
+                        "spans": [_otlp_span(item) for item in spans],
+                    }
+                ],
+            }
+        ]
+    }
+
+
+def _export(spans: list[Span]) -> None:
+    """Дозапись трассы в файл одной строкой"""
+    line = json.dumps(otlp_json(spans), ensure_ascii=False)
+    try:
+        with _export_lock, open(settings.tracing_file, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+    except OSError:
+        logger.exception(f"Error writing trace to {settings.tracing_file}")
@@ -1,14 +1,26 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, make_url
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
 from app.core.config import settings
+from app.database.instrumentation import TimedQueuePool, instrument_engine
 
-engine = create_engine(settings.database_url)
+
+def _pool_options(url: str) -> dict:
+    """Пул с замером ожидания соединения; у SQLite остаётся собственный пул"""
+    if make_url(url).get_backend_name() == "sqlite":
+        return {}
+    return {"poolclass": TimedQueuePool}
+
+
+engine = instrument_engine(
+    create_engine(settings.database_url, **_pool_options(settings.database_url))
+)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 async_engine = create_async_engine(settings.async_database_url, echo=False)
+instrument_engine(async_engine.sync_engine)
 AsyncSessionLocal = sessionmaker(async_engine, class_=AsyncSession, expire_on_commit=False)
 
 Base = declarative_base()
@@ -0,0 +1,213 @@
+"""Инструментирование движков SQLAlchemy.
+
+Время каждого запроса измеряется через события курсора, число взятых
+соединений — через события пула, а ожидание свободного соединения —
+в пуле TimedQueuePool, который подставляется вместо стандартного.
+
+Запросы также учитываются в области (query_scope) — HTTP-запросе, апдейте
+бота или задаче Celery: число запросов, суммарное время в базе и запросы
+дольше DB_SLOW_QUERY_SECONDS. Медленные запросы пишутся в лог текстом без
+значений параметров, на PostgreSQL — с планом из EXPLAIN, если включён
+DB_EXPLAIN_SLOW_QUERIES.
+"""
+
+import re
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from dataclasses import dataclass, field
+
+from loguru import logger
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import QueuePool
+
+from app.core.config import settings
+from app.core.metrics import (
+    DB_POOL_CHECKED_OUT,
+    DB_POOL_WAIT_SECONDS,
+    DB_QUERY_SECONDS,
+    DB_SCOPE_SECONDS,
+    DB_SCOPE_STATEMENTS,
+    DB_SLOW_QUERIES,
+)
+
+_QUERY_START = "habrdigest_query_start"
+_MAX_STATEMENT_LENGTH = 2000
+_EXPLAIN_SAVEPOINT = "habrdigest_explain"
+
+
+@dataclass
+class SlowQuery:
+    """Запрос дольше порога"""
+
+    statement: str
+    seconds: float
+    plan: str | None = None
+
+
+@dataclass
+class QueryStats:
+    """Учёт SQL-запросов в одной области"""
+
+    kind: str
+    name: str
+    statements: int = 0
+    db_seconds: float = 0.0
+    slow: list[SlowQuery] = field(default_factory=list)
+    started: float = field(default_factory=time.perf_counter)
+
+
+_query_stats: ContextVar[QueryStats | None] = ContextVar("query_stats", default=None)
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool, который замеряет ожидание свободного соединения"""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            DB_POOL_WAIT_SECONDS.observe(time.perf_counter() - started)
+
+
+def statement_operation(statement: str) -> str:
+    """Тип запроса для метки метрики: select, insert, update, delete или other"""
+    operation = statement.lstrip().split(None, 1)[0].lower() if statement.strip() else ""
+    return operation if operation in {"select", "insert", "update", "delete"} else "other"
+
+
+def normalize_statement(statement: str) -> str:
+    """Текст запроса в одну строку с ограничением длины"""
+    text = re.sub(r"\s+", " ", statement).strip()
+    if len(text) > _MAX_STATEMENT_LENGTH:
+        return text[:_MAX_STATEMENT_LENGTH] + "…"
+    return text
+
+
+def current_query_stats() -> QueryStats | None:
+    """Учёт запросов активной области"""
+    return _query_stats.get()
+
+
+def begin_query_scope(kind: str, name: str) -> Token:
+    """Начало области учёта запросов; токен передаётся в end_query_scope"""
+    return _query_stats.set(QueryStats(kind, name))
+
+
+def end_query_scope(token: Token) -> QueryStats | None:
+    """Завершение области: метрики и сводка в лог"""
+    stats = _query_stats.get()
+    _query_stats.reset(token)
+    if stats is None:
+        return None
+
+    DB_SCOPE_STATEMENTS.labels(stats.kind).observe(stats.statements)
+    DB_SCOPE_SECONDS.labels(stats.kind).observe(stats.db_seconds)
+    summary = (
+        f"{stats.kind} {stats.name}: {stats.statements} SQL statements, "
+        f"{stats.db_seconds:.3f}s in database, {len(stats.slow)} slow, "
+        f"{time.perf_counter() - stats.started:.3f}s total"
+    )
+    if stats.slow or stats.statements >= settings.db_scope_statements_warning:
+        logger.warning(summary)
+    else:
+        logger.debug(summary)
+    return stats
+
+
+@contextmanager
+def query_scope(kind: str, name: str) -> Iterator[QueryStats]:
+    """Учёт SQL-запросов блока кода"""
+    token = begin_query_scope(kind, name)
+    try:
+        yield _query_stats.get()
+    finally:
+        end_query_scope(token)
+
+
+def _explain(conn, statement: str, parameters) -> str | None:
+    """План медленного SELECT на PostgreSQL в точке сохранения транзакции"""
+    dialect = conn.dialect
+    if dialect.name != "postgresql" or dialect.is_async:
+        return None
+    cursor = conn.connection.dbapi_connection.cursor()
+    try:
+        cursor.execute(f"SAVEPOINT {_EXPLAIN_SAVEPOINT}")
+        try:
+            cursor.execute(f"EXPLAIN {statement}", parameters)
+            plan = "\n".join(row[0] for row in cursor.fetchall())
+        except dialect.dbapi.Error:
+            cursor.execute(f"ROLLBACK TO SAVEPOINT {_EXPLAIN_SAVEPOINT}")
+            logger.exception("Error explaining slow query")
+            return None
+        cursor.execute(f"RELEASE SAVEPOINT {_EXPLAIN_SAVEPOINT}")
+        return plan
+    except dialect.dbapi.Error:
+        logger.exception("Error explaining slow query")
+        return None
+    finally:
+        cursor.close()
+
+
+def _record_slow_query(conn, statement, parameters, executemany, seconds, operation) -> None:
+    DB_SLOW_QUERIES.labels(operation).inc()
+    slow = SlowQuery(normalize_statement(statement), seconds)
+    if settings.db_explain_slow_queries and operation == "select" and not executemany:
+        slow.plan = _explain(conn, statement, parameters)
+
+    stats = _query_stats.get()
+    scope = f" in {stats.kind} {stats.name}" if stats else ""
+    if stats is not None:
+        stats.slow.append(slow)
+    message = f"Slow query {seconds:.3f}s{scope}: {slow.statement}"
+    if slow.plan:
+        message += f"\n{slow.plan}"
+    logger.warning(message)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault(_QUERY_START, []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    seconds = time.perf_counter() - conn.info[_QUERY_START].pop()
+    operation = statement_operation(statement)
+    DB_QUERY_SECONDS.labels(operation).observe(seconds)
+
+    stats = _query_stats.get()
+    if stats is not None:
+        stats.statements += 1
+        stats.db_seconds += seconds
+    if seconds >= settings.db_slow_query_seconds:
+        _record_slow_query(conn, statement, parameters, executemany, seconds, operation)
+
+
+def _on_error(exception_context):
+    starts = (
+        exception_context.connection.info.get(_QUERY_START)
+        if exception_context.connection
+        else None
+    )
+    if starts:
+        starts.pop()
+
+
+def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+    DB_POOL_CHECKED_OUT.inc()
+
+
+def _on_checkin(dbapi_connection, connection_record):
+    DB_POOL_CHECKED_OUT.dec()
+
+
+def instrument_engine(engine: Engine) -> Engine:
+    """Подключение замеров к синхронному движку (или sync_engine асинхронного)"""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _on_error)
+    event.listen(engine.pool, "checkout", _on_checkout)
+    event.listen(engine.pool, "checkin", _on_checkin)
+    return engine
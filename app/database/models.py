@@ -1,4 +1,17 @@
-from sqlalchemy import JSON, Boolean, Column, DateTime, ForeignKey, Integer, String, Text
+from sqlalchemy import (
+    JSON,
+    BigInteger,
+    Boolean,
+    Column,
+    DateTime,
+    Float,
+    ForeignKey,
+    Index,
+    Integer,
+    SmallInteger,
+    String,
+    Text,
+)
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -34,6 +47,13 @@ class Topic(Base):
     slug = Column(String(255), unique=True, nullable=False)
     description = Column(Text, nullable=True)
     is_active = Column(Boolean, default=True)
+    # Тема пользователя, а не хаб Хабра: не парсится, статьи подбираются по тексту
+    is_custom = Column(Boolean, default=False, nullable=False)
+    # Хаб на Хабре по каталогу хабов; без него тема не обходится
+    hub_slug = Column(String(255), nullable=True)
+    # Подряд полученные 404 и время, раньше которого хаб не запрашивается
+    crawl_failures = Column(Integer, default=0, nullable=False)
+    next_crawl_at = Column(DateTime(timezone=True), nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
     subscriptions = relationship("Subscription", back_populates="topic")
@@ -71,20 +91,55 @@ class Article(Base):
     summary = Column(Text, nullable=True)
     topics = Column(JSON, nullable=True)  # Список тем статьи
     is_processed = Column(Boolean, default=False)
+    # Очередь повторов генерации резюме: число неудачных попыток, время следующей и причина
+    summary_attempts = Column(Integer, default=0, nullable=False)
+    summary_next_attempt_at = Column(DateTime(timezone=True), nullable=True)
+    summary_error = Column(String(500), nullable=True)
+    # Поставщик резюме: модель YandexGPT или локальная выжимка (extractive)
+    summary_model = Column(String(50), nullable=True)
+    # Этап жизненного цикла (app/services/pipeline.py) и время перехода на него
+    status = Column(
+        String(20), default="ingested", server_default="ingested", nullable=False, index=True
+    )
+    status_changed_at = Column(DateTime(timezone=True), server_default=func.now())
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Рейтинг и просмотры из карточки статьи на момент парсинга
+    rating = Column(Integer, nullable=True)
+    views = Column(Integer, nullable=True)
+    # Отпечаток SimHash для поиска дублей (app/services/dedup.py)
+    simhash = Column(BigInteger, nullable=True)
+    # Исходная статья, если эта — её почти точная копия
+    canonical_id = Column(
+        Integer, ForeignKey("articles.id", ondelete="SET NULL"), nullable=True, index=True
+    )
 
     sent_articles = relationship("SentArticle", back_populates="article")
+    simhash_bands = relationship("SimhashBand", cascade="all, delete-orphan", passive_deletes=True)
+
+
+class SimhashBand(Base):
+    """Полоса SimHash статьи — индекс для поиска кандидатов в дубли"""
+
+    __tablename__ = "simhash_bands"
+    __table_args__ = (Index("ix_simhash_bands_band_value", "band", "value"),)
+
+    article_id = Column(Integer, ForeignKey("articles.id", ondelete="CASCADE"), primary_key=True)
+    band = Column(SmallInteger, primary_key=True)
+    value = Column(Integer, nullable=False)
 
 
 class SentArticle(Base):
     """Модель отправленных статей пользователям"""
 
     __tablename__ = "sent_articles"
+    __table_args__ = (Index("ix_sent_articles_user_id_article_id", "user_id", "article_id"),)
 
+    # На PostgreSQL таблица секционирована по sent_at и первичный ключ в базе —
+    # (id, sent_at), см. app/database/partitions.py; id по-прежнему уникален
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     article_id = Column(Integer, ForeignKey("articles.id"), nullable=False)
-    sent_at = Column(DateTime(timezone=True), server_default=func.now())
+    sent_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
 
     user = relationship("User", back_populates="sent_articles")
     article = relationship("Article", back_populates="sent_articles")
@@ -95,10 +150,19 @@ class ParsingLog(Base):
 
     __tablename__ = "parsing_logs"
 
+    # Секционирована по started_at так же, как sent_articles
     id = Column(Integer, primary_key=True, index=True)
-    started_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     finished_at = Column(DateTime(timezone=True), nullable=True)
     articles_found = Column(Integer, default=0)
     articles_processed = Column(Integer, default=0)
     errors = Column(Text, nullable=True)
     status = Column(String(50), default="running")  # running, completed, failed
+    task = Column(String(100), default="parse_habr_articles", server_default="parse_habr_articles")
+    # Суммарное время этапов по спанам трассировки, секунды
+    fetch_seconds = Column(Float, default=0.0)
+    parse_seconds = Column(Float, default=0.0)
+    db_seconds = Column(Float, default=0.0)
+    summarize_seconds = Column(Float, default=0.0)
+    # Запросы к хабам, которые не делались: хаба нет или обход отложен
+    requests_saved = Column(Integer, default=0)
@@ -0,0 +1,185 @@
+"""Секционирование таблиц по времени на PostgreSQL.
+
+sent_articles секционируется по неделям (sent_at), parsing_logs — по дням
+(started_at), см. миграцию 0004. Секции создаются заранее на
+PARTITION_PREMAKE_DAYS вперёд задачей maintain_partitions, а хранение
+ограничивается удалением целых секций вместо построчного DELETE. Строки,
+не попавшие ни в одну секцию, лежат в секции по умолчанию <таблица>_default.
+
+Если задача не работала дольше PARTITION_PREMAKE_DAYS, строки нового
+диапазона уже лежат в секции по умолчанию, и PostgreSQL не даст создать
+секцию поверх них. Тогда секция создаётся отдельной таблицей, строки
+переносятся в неё из секции по умолчанию, и она присоединяется к родителю.
+Каждая секция создаётся в своей точке сохранения: ошибка на одной не
+откатывает остальные.
+
+На других СУБД (SQLite в тестах и при разработке) таблицы обычные, и
+функции этого модуля ничего не делают.
+"""
+
+import re
+from dataclasses import dataclass
+from datetime import UTC, date, datetime, time, timedelta
+
+from loguru import logger
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+from sqlalchemy.exc import SQLAlchemyError
+
+
+@dataclass(frozen=True)
+class PartitionedTable:
+    """Таблица, секционированная по диапазону времени"""
+
+    name: str
+    column: str
+    interval_days: int
+
+    @property
+    def default_partition(self) -> str:
+        return f"{self.name}_default"
+
+
+SENT_ARTICLES = PartitionedTable("sent_articles", "sent_at", 7)
+PARSING_LOGS = PartitionedTable("parsing_logs", "started_at", 1)
+PARTITIONED_TABLES = (SENT_ARTICLES, PARSING_LOGS)
+
+_PARTITION_SUFFIX = re.compile(r"_p(\d{8})$")
+
+
+def partition_start(table: PartitionedTable, moment: datetime) -> datetime:
+    """Начало секции, в которую попадает момент (недели — с понедельника)"""
+    day = moment.astimezone(UTC).date()
+    # Порядковый номер 1 — понедельник, поэтому недельные секции выровнены по понедельникам
+    ordinal = day.toordinal()
+    start = date.fromordinal(ordinal - (ordinal - 1) % table.interval_days)
+    return datetime.combine(start, time.min, UTC)
+
+
+def partition_name(table: PartitionedTable, start: datetime) -> str:
+    return f"{table.name}_p{start:%Y%m%d}"
+
+
+def is_partitioned(conn: Connection, table: PartitionedTable) -> bool:
+    """Секционирована ли таблица (только PostgreSQL)"""
+    if conn.dialect.name != "postgresql":
+        return False
+    return bool(
+        conn.scalar(
+            text(
+                "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table pt "
+                "JOIN pg_class c ON c.oid = pt.partrelid "
+                "WHERE c.relname = :name AND pg_table_is_visible(c.oid))"
+            ),
+            {"name": table.name},
+        )
+    )
+
+
+def list_partitions(conn: Connection, table: PartitionedTable) -> dict[str, datetime]:
+    """Секции по диапазону: имя и начало диапазона, без секции по умолчанию"""
+    names = conn.scalars(
+        text(
+            "SELECT child.relname FROM pg_inherits i "
+            "JOIN pg_class child ON child.oid = i.inhrelid "
+            "JOIN pg_class parent ON parent.oid = i.inhparent "
+            "WHERE parent.relname = :name AND pg_table_is_visible(parent.oid)"
+        ),
+        {"name": table.name},
+    ).all()
+    partitions = {}
+    for name in names:
+        if match := _PARTITION_SUFFIX.search(name):
+            partitions[name] = datetime.strptime(match.group(1), "%Y%m%d").replace(tzinfo=UTC)
+    return partitions
+
+
+def _has_default_rows(
+    conn: Connection, table: PartitionedTable, start: datetime, end: datetime
+) -> bool:
+    """Есть ли в секции по умолчанию строки диапазона [start, end)"""
+    if conn.scalar(text("SELECT to_regclass(:name)"), {"name": table.default_partition}) is None:
+        return False
+    return bool(
+        conn.scalar(
+            text(
+                f"SELECT EXISTS (SELECT 1 FROM {table.default_partition} "
+                f"WHERE {table.column} >= :start AND {table.column} < :end)"
+            ),
+            {"start": start, "end": end},
+        )
+    )
+
+
+def _create_partition(
+    conn: Connection, table: PartitionedTable, name: str, start: datetime, end: datetime
+) -> None:
+    bounds = f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+    if not _has_default_rows(conn, table, start, end):
+        conn.execute(text(f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {table.name} {bounds}"))
+        return
+
+    # Новые строки диапазона ждут, пока он не переедет из секции по умолчанию
+    conn.execute(text(f"LOCK TABLE {table.default_partition} IN ACCESS EXCLUSIVE MODE"))
+    in_range = f"WHERE {table.column} >= :start AND {table.column} < :end"
+    conn.execute(text(f"CREATE TABLE {name} (LIKE {table.name} INCLUDING DEFAULTS)"))
+    moved = conn.execute(
+        text(f"INSERT INTO {name} SELECT * FROM {table.default_partition} {in_range}"),
+        {"start": start, "end": end},
+    ).rowcount
+    conn.execute(
+        text(f"DELETE FROM {table.default_partition} {in_range}"), {"start": start, "end": end}
+    )
+    conn.execute(text(f"ALTER TABLE {table.name} ATTACH PARTITION {name} {bounds}"))
+    logger.warning(f"Moved {moved} rows from {table.default_partition} to new partition {name}")
+
+
+def create_partitions(
+    conn: Connection, table: PartitionedTable, since: datetime, until: datetime
+) -> list[str]:
+    """Создание недостающих секций, покрывающих промежуток [since, until]"""
+    existing = list_partitions(conn, table)
+    step = timedelta(days=table.interval_days)
+    created = []
+    start = partition_start(table, since)
+    while start <= until:
+        name = partition_name(table, start)
+        if name not in existing:
+            try:
+                with conn.begin_nested():
+                    _create_partition(conn, table, name, start, start + step)
+            except SQLAlchemyError:
+                logger.exception(f"Error creating partition {name}")
+            else:
+                created.append(name)
+        start += step
+    return created
+
+
+def drop_partitions_before(conn: Connection, table: PartitionedTable, cutoff: datetime) -> int:
+    """Удаление секций, целиком лежащих раньше cutoff; возвращает число удалённых строк"""
+    step = timedelta(days=table.interval_days)
+    deleted = 0
+    for name, start in sorted(list_partitions(conn, table).items(), key=lambda item: item[1]):
+        if start + step > cutoff:
+            continue
+        deleted += conn.scalar(text(f"SELECT count(*) FROM {name}"))
+        conn.execute(text(f"DROP TABLE {name}"))
+        logger.info(f"Dropped partition {name}")
+
+    # В секцию по умолчанию строки попадают, только если секции не успели создать
+    deleted += conn.execute(
+        text(f"DELETE FROM {table.default_partition} WHERE {table.column} < :cutoff"),
+        {"cutoff": cutoff},
+    ).rowcount
+    return deleted
+
+
+def maintain_partitions(conn: Connection, premake_days: int) -> list[str]:
+    """Создание секций от текущей до premake_days вперёд для всех таблиц"""
+    now = datetime.now(UTC)
+    created = []
+    for table in PARTITIONED_TABLES:
+        if is_partitioned(conn, table):
+            created += create_partitions(conn, table, now, now + timedelta(days=premake_days))
+    return created
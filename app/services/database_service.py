@@ -1,10 +1,39 @@
+import json
+from collections import Counter, defaultdict
+from collections.abc import Callable, Iterable
 from datetime import UTC, datetime, timedelta
 
-from sqlalchemy import and_
-from sqlalchemy.orm import Session
+from loguru import logger
+from sqlalchemy import String, and_, cast, delete, exists, insert, or_, select
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import Session, contains_eager, joinedload
 
+from app.core.config import settings
 from app.database.database import SessionLocal
 from app.database.models import Article, ParsingLog, SentArticle, Subscription, Topic, User
+from app.database.partitions import (
+    PARSING_LOGS,
+    SENT_ARTICLES,
+    PartitionedTable,
+    drop_partitions_before,
+    is_partitioned,
+)
+from app.services import pipeline
+
+
+def summary_due(now: datetime):
+    """Условие очереди резюме: статья не обработана, попытки не исчерпаны, отсрочка прошла"""
+    conditions = [
+        Article.is_processed.is_(False),
+        Article.summary_attempts < settings.summary_max_attempts,
+        or_(Article.summary_next_attempt_at.is_(None), Article.summary_next_attempt_at <= now),
+    ]
+    if settings.pipeline_enabled:
+        # Только что сохранённые статьи сначала проходят загрузку полного текста
+        conditions.append(Article.status.notin_((pipeline.INGESTED, pipeline.SUMMARIZING)))
+    else:
+        conditions.append(Article.status != pipeline.SUMMARIZING)
+    return and_(*conditions)
 
 
 class DatabaseService:
@@ -62,6 +91,31 @@ class DatabaseService:
         """Получение активных тем"""
         return self.db.query(Topic).filter(Topic.is_active).all()
 
+    def get_text_matched_topics(self) -> list[Topic]:
+        """Активные пользовательские темы и темы без хаба — статьи к ним подбираются по тексту"""
+        return (
+            self.db.query(Topic)
+            .filter(Topic.is_active, or_(Topic.is_custom, Topic.hub_slug.is_(None)))
+            .all()
+        )
+
+    def record_hub_crawl(self, topic: Topic, found: bool) -> None:
+        """Учёт обхода хаба темы: после 404 следующий обход откладывается экспоненциально"""
+        if found:
+            if topic.crawl_failures or topic.next_crawl_at:
+                topic.crawl_failures = 0
+                topic.next_crawl_at = None
+                self.db.commit()
+            return
+
+        topic.crawl_failures = (topic.crawl_failures or 0) + 1
+        delay_hours = min(
+            settings.parsing_interval_hours * 2**topic.crawl_failures,
+            settings.hub_backoff_max_hours,
+        )
+        topic.next_crawl_at = datetime.now(UTC) + timedelta(hours=delay_hours)
+        self.db.commit()
+
     def get_topic_by_slug(self, slug: str) -> Topic | None:
         """Получение темы по slug"""
         return self.db.query(Topic).filter(Topic.slug == slug).first()
@@ -70,14 +124,51 @@ class DatabaseService:
         """Получение темы по ID"""
         return self.db.query(Topic).filter(Topic.id == topic_id).first()
 
-    def create_topic(self, name: str, slug: str, description: str | None = None) -> Topic:
+    def create_topic(
+        self,
+        name: str,
+        slug: str,
+        description: str | None = None,
+        is_custom: bool = False,
+        hub_slug: str | None = None,
+    ) -> Topic:
         """Создание новой темы"""
-        topic = Topic(name=name, slug=slug, description=description, is_active=True)
+        topic = Topic(
+            name=name,
+            slug=slug,
+            description=description,
+            is_active=True,
+            is_custom=is_custom,
+            hub_slug=hub_slug,
+        )
         self.db.add(topic)
         self.db.commit()
         self.db.refresh(topic)
         return topic
 
+    def get_active_subscriptions(self) -> list[Subscription]:
+        """Активные подписки активных пользователей вместе с пользователем и темой"""
+        return (
+            self.db.query(Subscription)
+            .join(Subscription.user)
+            .options(contains_eager(Subscription.user), joinedload(Subscription.topic))
+            .filter(User.is_active, Subscription.is_active)
+            .order_by(Subscription.user_id, Subscription.id)
+            .all()
+        )
+
+    def get_subscribed_topic_names(self) -> set[str]:
+        """Названия тем, на которые подписан хотя бы один активный пользователь"""
+        rows = (
+            self.db.query(Topic.name)
+            .join(Subscription, Subscription.topic_id == Topic.id)
+            .join(User, User.id == Subscription.user_id)
+            .filter(User.is_active, Subscription.is_active)
+            .distinct()
+            .all()
+        )
+        return {name for (name,) in rows}
+
     def get_user_subscriptions(self, user_id: int) -> list[Subscription]:
         """Получение подписок пользователя"""
         return (
@@ -144,7 +235,7 @@ class DatabaseService:
         """Получение необработанных статей"""
         return (
             self.db.query(Article)
-            .filter(not Article.is_processed)
+            .filter(summary_due(datetime.now(UTC)))
             .order_by(Article.created_at.desc())
             .limit(limit)
             .all()
@@ -163,12 +254,47 @@ class DatabaseService:
         """Обновление резюме статьи"""
         article = self.db.query(Article).filter(Article.id == article_id).first()
         if article:
-            article.summary = summary
-            article.is_processed = True
-            self.db.commit()
+            self.save_summary(article, summary)
             return True
         return False
 
+    def save_summary(
+        self,
+        article: Article,
+        summary: str,
+        model: str | None = None,
+        retry_reason: str | None = None,
+    ) -> None:
+        """Запись резюме; с retry_reason оно временное и статья остаётся в очереди повторов"""
+        article.summary = summary
+        article.summary_model = model
+        if retry_reason is not None:
+            self.record_summary_failure(article, retry_reason)
+            return
+        article.is_processed = True
+        article.summary_next_attempt_at = None
+        article.summary_error = None
+        if article.status in (*pipeline.CLAIMABLE, pipeline.SUMMARIZING):
+            pipeline.advance(article, pipeline.SUMMARIZED)
+        self.db.commit()
+
+    def record_summary_failure(self, article: Article, error: str) -> None:
+        """Учёт неудачной генерации резюме: следующая попытка откладывается экспоненциально"""
+        article.summary_attempts = (article.summary_attempts or 0) + 1
+        article.summary_error = error[:500]
+        delay_minutes = min(
+            settings.summary_retry_base_minutes * 2 ** (article.summary_attempts - 1),
+            settings.summary_retry_max_hours * 60,
+        )
+        article.summary_next_attempt_at = datetime.now(UTC) + timedelta(minutes=delay_minutes)
+        pipeline.release(article)
+        if article.summary_attempts >= settings.summary_max_attempts:
+            logger.warning(
+                f"Giving up on summary for article {article.id} "
+                f"after {article.summary_attempts} attempts: {error}"
+            )
+        self.db.commit()
+
     def mark_article_sent(self, user_id: int, article_id: int) -> SentArticle:
         """Отметка статьи как отправленной пользователю"""
         sent_article = SentArticle(user_id=user_id, article_id=article_id)
@@ -177,6 +303,107 @@ class DatabaseService:
         self.db.refresh(sent_article)
         return sent_article
 
+    def mark_articles_sent(self, user_id: int, article_ids: list[int]) -> None:
+        """Отметка нескольких статей как отправленных пользователю одним запросом"""
+        if not article_ids:
+            return
+        self.db.execute(
+            insert(SentArticle),
+            [{"user_id": user_id, "article_id": article_id} for article_id in article_ids],
+        )
+        self.db.commit()
+
+    def get_sent_article_ids(
+        self, user_id: int, since: datetime, article_ids: Iterable[int] | None = None
+    ) -> set[int]:
+        """Статьи, отправленные пользователю после since (из заданных, если указаны)"""
+        query = select(SentArticle.article_id).where(
+            SentArticle.user_id == user_id, SentArticle.sent_at >= since
+        )
+        if article_ids is not None:
+            query = query.where(SentArticle.article_id.in_(list(article_ids)))
+        return set(self.db.scalars(query).all())
+
+    def _has_topic(self, topic_name: str):
+        """Условие «в списке тем статьи есть тема» для JSON-колонки topics"""
+        if self.db.get_bind().dialect.name == "postgresql":
+            return cast(Article.topics, JSONB).contains([topic_name])
+        # На остальных СУБД — поиск элемента в сериализованном списке
+        return cast(Article.topics, String).contains(json.dumps(topic_name), autoescape=True)
+
+    def _recent_articles(self, since: datetime, status: str | None = None):
+        """Запрос свежих статей без дублей, новые первыми"""
+        query = self.db.query(Article).filter(
+            Article.created_at >= since, Article.canonical_id.is_(None)
+        )
+        if status is not None:
+            query = query.filter(Article.status == status)
+        return query.order_by(Article.created_at.desc())
+
+    def get_recent_articles(
+        self, since: datetime, limit: int = 2000, status: str | None = None
+    ) -> list[Article]:
+        """Свежие статьи без дублей, новые первыми"""
+        return self._recent_articles(since, status).limit(limit).all()
+
+    def get_recent_articles_by_topics(
+        self,
+        since: datetime,
+        topic_names: Iterable[str],
+        limit_per_topic: int,
+        status: str | None = None,
+    ) -> list[Article]:
+        """Кандидаты для дайджестов: свежие статьи каждой темы, не больше limit_per_topic на тему"""
+        articles: dict[int, Article] = {}
+        for topic_name in sorted(set(topic_names)):
+            query = self._recent_articles(since, status).filter(self._has_topic(topic_name))
+            for article in query.limit(limit_per_topic):
+                articles.setdefault(article.id, article)
+        return list(articles.values())
+
+    def get_articles_after(self, after_id: int, since: datetime, limit: int) -> list[Article]:
+        """Страница свежих статей без дублей с id больше after_id по возрастанию id"""
+        return (
+            self.db.query(Article)
+            .filter(
+                Article.id > after_id,
+                Article.created_at >= since,
+                Article.canonical_id.is_(None),
+            )
+            .order_by(Article.id)
+            .limit(limit)
+            .all()
+        )
+
+    def add_topic_to_articles(self, topic_name: str, article_ids: Iterable[int]) -> int:
+        """Добавление темы к статьям, у которых её ещё нет"""
+        tagged = 0
+        for article in self.db.query(Article).filter(Article.id.in_(list(article_ids))):
+            if topic_name not in (article.topics or []):
+                article.topics = [*(article.topics or []), topic_name]
+                tagged += 1
+        self.db.commit()
+        return tagged
+
+    def get_user_topic_history(
+        self, user_ids: Iterable[int], since: datetime, chunk_size: int = 1000
+    ) -> dict[int, Counter[str]]:
+        """Темы статей, отправленных пользователям после since"""
+        history: dict[int, Counter[str]] = defaultdict(Counter)
+        user_ids = list(user_ids)
+        for start in range(0, len(user_ids), chunk_size):
+            rows = self.db.execute(
+                select(SentArticle.user_id, Article.topics)
+                .join(Article, Article.id == SentArticle.article_id)
+                .where(
+                    SentArticle.user_id.in_(user_ids[start : start + chunk_size]),
+                    SentArticle.sent_at >= since,
+                )
+            )
+            for user_id, topics in rows:
+                history[user_id].update(topics or [])
+        return history
+
     def get_new_articles_for_user(
         self, user_id: int, topic_id: int, limit: int = 5
     ) -> list[Article]:
@@ -185,6 +412,10 @@ class DatabaseService:
         if not topic:
             return []
 
+        # Статья не может быть отправлена раньше, чем появилась, поэтому для статей
+        # за последние DIGEST_LOOKBACK_DAYS хватает отметок за тот же срок:
+        # на PostgreSQL анти-джойн читает только свежие секции sent_articles
+        since = datetime.now(UTC) - timedelta(days=settings.digest_lookback_days)
         articles = (
             self.db.query(Article)
             .outerjoin(
@@ -192,10 +423,13 @@ class DatabaseService:
                 and_(
                     SentArticle.article_id == Article.id,
                     SentArticle.user_id == user_id,
+                    SentArticle.sent_at >= since,
                 ),
             )
             .filter(
-                Article.topics.contains([topic.name]),
+                Article.created_at >= since,
+                Article.canonical_id.is_(None),
+                self._has_topic(topic.name),
                 SentArticle.id.is_(None),
             )
             .order_by(Article.created_at.desc())
@@ -221,8 +455,9 @@ class DatabaseService:
         articles_processed: int | None = None,
         errors: str | None = None,
         status: str | None = None,
+        stage_seconds: dict[str, float] | None = None,
     ) -> bool:
-        """Обновление лога парсинга"""
+        """Обновление лога парсинга; stage_seconds — время по этапам (fetch, parse, db, summarize)"""
         log = self.db.query(ParsingLog).filter(ParsingLog.id == log_id).first()
         if log:
             if finished_at:
@@ -235,6 +470,8 @@ class DatabaseService:
                 log.errors = errors
             if status:
                 log.status = status
+            for stage, seconds in (stage_seconds or {}).items():
+                setattr(log, f"{stage}_seconds", seconds)
 
             self.db.commit()
             return True
@@ -253,7 +490,7 @@ class DatabaseService:
         stats["total_articles"] = self.db.query(Article).count()
         stats["processed_articles"] = self.db.query(Article).filter(Article.is_processed).count()
         stats["unprocessed_articles"] = (
-            self.db.query(Article).filter(not Article.is_processed).count()
+            self.db.query(Article).filter(Article.is_processed.is_(False)).count()
         )
 
         stats["total_subscriptions"] = self.db.query(Subscription).count()
@@ -287,28 +524,58 @@ class DatabaseService:
 
         return activity
 
-    def cleanup_old_articles(self, days: int = 30) -> int:
-        """Очистка старых статей"""
+    def cleanup_old_articles(
+        self,
+        days: int = 30,
+        batch_size: int = 1000,
+        on_batch: Callable[[int], None] | None = None,
+    ) -> int:
+        """Очистка старых отправленных статей пакетами вместе с отметками об отправке"""
         cutoff_date = datetime.now(UTC) - timedelta(days=days)
-
-        old_articles = self.db.query(Article).filter(Article.created_at < cutoff_date).all()
+        batch_ids = (
+            select(Article.id)
+            .where(
+                Article.created_at < cutoff_date,
+                exists().where(SentArticle.article_id == Article.id),
+            )
+            .order_by(Article.id)
+            .limit(batch_size)
+        )
 
         deleted_count = 0
-        for article in old_articles:
-            sent_count = (
-                self.db.query(SentArticle).filter(SentArticle.article_id == article.id).count()
+        while True:
+            article_ids = self.db.scalars(batch_ids).all()
+            if not article_ids:
+                break
+
+            # Каждый пакет — отдельная короткая транзакция
+            self.db.execute(
+                delete(SentArticle)
+                .where(SentArticle.article_id.in_(article_ids))
+                .execution_options(synchronize_session=False)
+            )
+            self.db.execute(
+                delete(Article)
+                .where(Article.id.in_(article_ids))
+                .execution_options(synchronize_session=False)
             )
+            self.db.commit()
 
-            if sent_count > 0:  # Если статья была отправлена хотя бы одному пользователю
-                self.db.delete(article)
-                deleted_count += 1
+            deleted_count += len(article_ids)
+            logger.info(f"Cleanup: deleted {deleted_count} old articles so far")
+            if on_batch is not None:
+                on_batch(deleted_count)
+            if len(article_ids) < batch_size:
+                break
 
-        self.db.commit()
         return deleted_count
 
     def cleanup_old_logs(self, days: int = 7) -> int:
         """Очистка старых логов"""
         cutoff_date = datetime.now(UTC) - timedelta(days=days)
+        deleted_count = self._drop_old_partitions(PARSING_LOGS, cutoff_date)
+        if deleted_count is not None:
+            return deleted_count
 
         deleted_count = (
             self.db.query(ParsingLog).filter(ParsingLog.started_at < cutoff_date).delete()
@@ -317,6 +584,32 @@ class DatabaseService:
         self.db.commit()
         return deleted_count
 
+    def cleanup_old_sent_articles(self, days: int = 90) -> int:
+        """Очистка старых отметок об отправке"""
+        # Более свежие отметки нужны дайджесту, чтобы не отправить статью повторно
+        days = max(days, settings.digest_lookback_days)
+        cutoff_date = datetime.now(UTC) - timedelta(days=days)
+        deleted_count = self._drop_old_partitions(SENT_ARTICLES, cutoff_date)
+        if deleted_count is not None:
+            return deleted_count
+
+        deleted_count = (
+            self.db.query(SentArticle).filter(SentArticle.sent_at < cutoff_date).delete()
+        )
+
+        self.db.commit()
+        return deleted_count
+
+    def _drop_old_partitions(self, table: PartitionedTable, cutoff_date: datetime) -> int | None:
+        """Удаление старых секций; None, если таблица не секционирована"""
+        conn = self.db.connection()
+        if not is_partitioned(conn, table):
+            return None
+
+        deleted_count = drop_partitions_before(conn, table, cutoff_date)
+        self.db.commit()
+        return deleted_count
+
 
 def get_database_service() -> DatabaseService:
     """Получение экземпляра сервиса базы данных"""
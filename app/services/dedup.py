@@ -0,0 +1,85 @@
+"""Поиск почти одинаковых статей по SimHash.
+
+Кросс-посты и перепубликации на Хабре приходят под разными habr_id с почти
+тем же текстом. Для заголовка и текста статьи считается 64-битный SimHash
+по словесным шинглам: у почти одинаковых текстов отличается лишь несколько
+бит. Отпечаток делится на восемь полос по 8 бит, полосы хранятся в таблице
+simhash_bands с индексом по (band, value). Если два отпечатка расходятся
+не больше чем в семи битах, хотя бы одна полоса у них совпадает, поэтому
+кандидатов даёт поиск по равенству полос, а точное расстояние
+(DEDUP_MAX_DISTANCE, не больше семи) проверяется уже на них.
+"""
+
+import hashlib
+import re
+from collections import Counter
+from dataclasses import dataclass
+
+from app.core.config import settings
+
+BITS = 64
+BANDS = 8
+BAND_BITS = BITS // BANDS
+SHINGLE_SIZE = 3
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+
+@dataclass(frozen=True)
+class Fingerprint:
+    """Отпечаток статьи: SimHash и его полосы"""
+
+    simhash: int
+    bands: tuple[int, ...]
+
+    @property
+    def signed(self) -> int:
+        """SimHash для колонки BIGINT со знаком"""
+        return self.simhash - (1 << BITS) if self.simhash >= 1 << (BITS - 1) else self.simhash
+
+
+def _hash(feature: str) -> int:
+    return int.from_bytes(hashlib.blake2b(feature.encode(), digest_size=8).digest(), "big")
+
+
+def shingles(text: str) -> Counter[str]:
+    """Словесные шинглы текста в нижнем регистре"""
+    tokens = _TOKEN.findall(text.lower())
+    if len(tokens) < SHINGLE_SIZE:
+        return Counter(tokens)
+    return Counter(
+        " ".join(tokens[i : i + SHINGLE_SIZE]) for i in range(len(tokens) - SHINGLE_SIZE + 1)
+    )
+
+
+def simhash(features: Counter[str]) -> int:
+    """64-битный SimHash взвешенных признаков"""
+    weights = [0] * BITS
+    for feature, count in features.items():
+        value = _hash(feature)
+        for bit in range(BITS):
+            weights[bit] += count if value >> bit & 1 else -count
+    return sum(1 << bit for bit, weight in enumerate(weights) if weight > 0)
+
+
+def split_bands(value: int) -> tuple[int, ...]:
+    mask = (1 << BAND_BITS) - 1
+    return tuple(value >> (band * BAND_BITS) & mask for band in range(BANDS))
+
+
+def hamming(first: int, second: int) -> int:
+    return (first ^ second).bit_count()
+
+
+def from_signed(value: int) -> int:
+    """SimHash из колонки BIGINT со знаком"""
+    return value + (1 << BITS) if value < 0 else value
+
+
+def fingerprint(title: str, content: str | None) -> Fingerprint | None:
+    """Отпечаток статьи; None, если текста слишком мало для надёжного сравнения"""
+    features = shingles(f"{title} {content or ''}")
+    if sum(features.values()) < settings.dedup_min_shingles:
+        return None
+    value = simhash(features)
+    return Fingerprint(value, split_bands(value))
@@ -1,10 +1,17 @@
-from datetime import UTC, datetime
+from collections import defaultdict
+from datetime import UTC, datetime, timedelta
 
 from loguru import logger
 
 from app.bot.bot import bot_instance
+from app.core.config import settings
+from app.core.metrics import DIGEST_ERRORS, DIGESTS_SENT
+from app.database.models import Article, Topic, User
+from app.services import pipeline
 from app.services.database_service import DatabaseService
-from app.services.yandex_service import yandex_service
+from app.services.llm_router import SummaryUnavailableError, summary_router
+from app.services.ranking import RankingRow, article_ranker
+from app.services.sent_history import sent_history
 
 
 class DigestService:
@@ -13,80 +20,147 @@ class DigestService:
     def __init__(self):
         self.db_service = DatabaseService()
 
-    async def send_digest_to_user(self, user_id: int, topic_id: int, limit: int = 3) -> bool:
-        """Отправка дайджеста пользователю по конкретной теме"""
-        try:
-            articles = self.db_service.get_new_articles_for_user(user_id, topic_id, limit)
+    def _rank(
+        self,
+        pairs: list[tuple[User, Topic]],
+        user_topics: dict[int, set[str]],
+        limit: int,
+    ) -> tuple[list[list[int]], dict[int, Article]]:
+        """Ранжирование кандидатов сразу для всех пар «пользователь × тема»"""
+        since = datetime.now(UTC) - timedelta(days=settings.digest_lookback_days)
+        # Предел на тему: статьи нишевой темы не вытесняются свежими статьями популярных.
+        # В конвейере статья попадает в дайджест только после этапа публикации
+        articles = self.db_service.get_recent_articles_by_topics(
+            since,
+            {topic.name for _, topic in pairs},
+            limit_per_topic=settings.ranking_max_candidates,
+            status=pipeline.DELIVERABLE if settings.pipeline_enabled else None,
+        )
+        history = self.db_service.get_user_topic_history({user.id for user, _ in pairs}, since)
+        ranked = article_ranker.rank(
+            [RankingRow(user.id, topic.name) for user, topic in pairs],
+            articles,
+            user_topics,
+            history,
+            # С запасом: часть лучших статей могла уже уйти пользователю
+            top_k=limit * settings.ranking_oversample,
+        )
+        return ranked, {article.id: article for article in articles}
+
+    async def _deliver(self, user: User, topic: Topic, articles: list[Article]) -> bool:
+        """Сборка и отправка дайджеста, затем отметка статей отправленными"""
+        # Статью без резюме, которую уже резюмирует задача, оставляем до следующего дайджеста
+        articles = [
+            article
+            for article in articles
+            if article.summary or pipeline.claim(self.db_service.db, article)
+        ]
+        if not articles:
+            logger.info(f"No new articles for user {user.id} on topic {topic.id}")
+            return True
 
-            if not articles:
-                logger.info(f"No new articles for user {user_id} on topic {topic_id}")
-                return True
+        digest_text = f"📰 Дайджест по теме: {topic.name}\n\n"
 
+        for i, article in enumerate(articles, 1):
+            if not article.summary:
+                try:
+                    routed = await summary_router.summarize(article.content or "", article.title)
+                    self.db_service.save_summary(
+                        article, routed.text, routed.provider, routed.retry_reason
+                    )
+                    summary = routed.text
+                except SummaryUnavailableError as e:
+                    logger.error(f"Error generating summary for article {article.id}: {e}")
+                    self.db_service.record_summary_failure(article, str(e))
+                    summary = "Краткое резюме недоступно"
+            else:
+                summary = article.summary
+
+            digest_text += f"📄 {i}. {article.title}\n"
+            if article.author:
+                digest_text += f"👤 Автор: {article.author}\n"
+            digest_text += f"📝 {summary}\n"
+            digest_text += f"🔗 {article.url}\n\n"
+
+        await bot_instance.send_message(user.telegram_id, digest_text)
+
+        article_ids = [article.id for article in articles]
+        self.db_service.mark_articles_sent(user.id, article_ids)
+        sent_history.record_sent(user.id, article_ids)
+        logger.info(f"Digest sent to user {user.id} for topic {topic.name}")
+        return True
+
+    def _unsent(
+        self, user: User, ranked_ids: list[int], articles: dict[int, Article], limit: int
+    ) -> list[Article]:
+        """Лучшие ещё не отправленные пользователю статьи"""
+        unsent_ids = sent_history.filter_unsent(self.db_service, user.id, ranked_ids)
+        return [articles[article_id] for article_id in unsent_ids[:limit]]
+
+    async def send_digest_to_user(self, user: User, topic_id: int, limit: int = 3) -> bool:
+        """Отправка дайджеста пользователю по конкретной теме"""
+        try:
             topic = self.db_service.get_topic_by_id(topic_id)
             if not topic:
                 logger.error(f"Topic {topic_id} not found")
                 return False
 
-            digest_text = f"📰 Дайджест по теме: {topic.name}\n\n"
-
-            for i, article in enumerate(articles, 1):
-                if not article.summary:
-                    try:
-                        summary = await yandex_service.generate_summary(
-                            content=article.content or "", title=article.title
-                        )
-                        self.db_service.update_article_summary(article.id, summary)
-                    except Exception:
-                        logger.exception(f"Error generating summary for article {article.id}")
-                        summary = "Краткое резюме недоступно"
-                else:
-                    summary = article.summary
-
-                digest_text += f"📄 {i}. {article.title}\n"
-                if article.author:
-                    digest_text += f"👤 Автор: {article.author}\n"
-                digest_text += f"📝 {summary}\n"
-                digest_text += f"🔗 {article.url}\n\n"
-
-                self.db_service.mark_article_sent(user_id, article.id)
-
-            await bot_instance.send_message(user_id, digest_text)
-            logger.info(f"Digest sent to user {user_id} for topic {topic.name}")
-
-            return True
+            user_topics = {
+                user.id: {
+                    subscription.topic.name
+                    for subscription in self.db_service.get_user_subscriptions(user.id)
+                }
+            }
+            (ranked_ids,), articles = self._rank([(user, topic)], user_topics, limit)
+            return await self._deliver(user, topic, self._unsent(user, ranked_ids, articles, limit))
 
         except Exception:
-            logger.exception(f"Error sending digest to user {user_id}")
+            logger.exception(f"Error sending digest to user {user.id}")
             return False
 
-    async def send_digest_to_all_users(self) -> dict[str, int]:
+    async def send_digest_to_all_users(self, limit: int = 3) -> dict[str, int]:
         """Отправка дайджестов всем пользователям с активными подписками"""
         try:
-            stats = {"users_processed": 0, "digests_sent": 0, "errors": 0}
-
-            users = self.db_service.get_users_with_subscriptions()
-
-            for user in users:
+            subscriptions = self.db_service.get_active_subscriptions()
+            stats = {
+                "users_processed": len({subscription.user_id for subscription in subscriptions}),
+                "digests_sent": 0,
+                "errors": 0,
+            }
+
+            user_topics: dict[int, set[str]] = defaultdict(set)
+            for subscription in subscriptions:
+                user_topics[subscription.user_id].add(subscription.topic.name)
+            due = [
+                subscription
+                for subscription in subscriptions
+                if self._should_send_digest(subscription)
+            ]
+            ranked, articles = self._rank(
+                [(subscription.user, subscription.topic) for subscription in due],
+                user_topics,
+                limit,
+            )
+
+            for subscription, ranked_ids in zip(due, ranked, strict=True):
+                user = subscription.user
                 try:
-                    stats["users_processed"] += 1
-
-                    subscriptions = self.db_service.get_user_subscriptions(user.id)
-
-                    for subscription in subscriptions:
-                        if self._should_send_digest(subscription):
-                            success = await self.send_digest_to_user(
-                                user.telegram_id, subscription.topic_id
-                            )
-
-                            if success:
-                                stats["digests_sent"] += 1
-                                subscription.updated_at = datetime.now(UTC)
-                                self.db_service.db.commit()
-                            else:
-                                stats["errors"] += 1
+                    success = await self._deliver(
+                        user, subscription.topic, self._unsent(user, ranked_ids, articles, limit)
+                    )
+                    if success:
+                        DIGESTS_SENT.inc()
+                        stats["digests_sent"] += 1
+                        subscription.updated_at = datetime.now(UTC)
+                        self.db_service.db.commit()
+                    else:
+                        DIGEST_ERRORS.inc()
+                        stats["errors"] += 1
 
                 except Exception:
-                    logger.exception(f"Error processing user {user.id}")
+                    logger.exception(f"Error sending digest to user {user.id}")
+                    self.db_service.db.rollback()
+                    DIGEST_ERRORS.inc()
                     stats["errors"] += 1
 
             logger.info(f"Digest sending completed: {stats}")
@@ -164,10 +238,10 @@ class DigestService:
             article = articles[0]
 
             try:
-                summary = await yandex_service.generate_summary(
-                    content=article.content or "", title=article.title
-                )
-            except Exception:
+                summary = (
+                    await summary_router.summarize(article.content or "", article.title)
+                ).text
+            except SummaryUnavailableError:
                 logger.exception("Error generating test summary")
                 summary = "Тестовое резюме"
 
@@ -0,0 +1,178 @@
+"""Проверки живости и готовности сервиса.
+
+Каждая зависимость проверяется отдельной пробой с таймаутом, а результат
+пробы кэшируется на HEALTH_CACHE_TTL_SECONDS: балансировщик может опрашивать
+/health/ready хоть каждую секунду, в базу и Redis уйдёт не больше одного
+запроса за период кэша. Готовность определяют только пробы из
+HEALTH_CRITICAL_PROBES, остальные (бот, YandexGPT) лишь понижают статус
+до degraded.
+"""
+
+import asyncio
+import math
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import asdict, dataclass
+from functools import lru_cache
+
+import httpx
+import redis
+from sqlalchemy import Engine, create_engine, make_url, text
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.pool import NullPool
+
+from app.bot.bot import bot_instance
+from app.core.cache import ResultCache
+from app.core.config import settings
+from app.database.database import engine
+from app.services.yandex_service import yandex_service
+
+
+@dataclass
+class ProbeResult:
+    """Результат одной пробы"""
+
+    name: str
+    ok: bool
+    critical: bool
+    latency_ms: float
+    detail: str = ""
+
+
+class HealthService:
+    """Набор проб зависимостей с кэшированием результатов"""
+
+    def __init__(
+        self,
+        ttl_seconds: float,
+        timeout_seconds: float,
+        critical: list[str],
+        clock=time.monotonic,
+    ):
+        self.timeout_seconds = timeout_seconds
+        self.critical = set(critical)
+        self.cache = ResultCache(ttl_seconds, clock=clock)
+        self.probes: dict[str, Callable[[], Awaitable[str]]] = {}
+
+    def register(self, name: str, probe: Callable[[], Awaitable[str]]) -> None:
+        """Регистрация пробы: корутина возвращает описание или поднимает исключение"""
+        self.probes[name] = probe
+
+    async def check(self, name: str) -> ProbeResult:
+        """Результат пробы из кэша или новый замер"""
+        return await self.cache.get_or_fetch(name, lambda: self._run_probe(name))
+
+    async def check_all(self) -> list[ProbeResult]:
+        """Все пробы параллельно"""
+        return list(await asyncio.gather(*(self.check(name) for name in self.probes)))
+
+    async def readiness(self) -> dict:
+        """Сводка для /health/ready и /health"""
+        results = await self.check_all()
+        if not all(r.ok for r in results if r.critical):
+            status = "unhealthy"
+        elif not all(r.ok for r in results):
+            status = "degraded"
+        else:
+            status = "healthy"
+        return {"status": status, "checks": {r.name: asdict(r) for r in results}}
+
+    async def _run_probe(self, name: str) -> ProbeResult:
+        """Выполнение пробы с таймаутом; любая ошибка зависимости — неуспех"""
+        started = time.perf_counter()
+        try:
+            detail = await asyncio.wait_for(self.probes[name](), self.timeout_seconds)
+            ok = True
+        except TimeoutError:
+            ok, detail = False, f"timeout after {self.timeout_seconds}s"
+        except (SQLAlchemyError, redis.RedisError, httpx.HTTPError, OSError, RuntimeError) as e:
+            ok, detail = False, f"{type(e).__name__}: {str(e).splitlines()[0] if str(e) else ''}"
+        latency_ms = round((time.perf_counter() - started) * 1000, 1)
+        return ProbeResult(name, ok, name in self.critical, latency_ms, detail)
+
+
+@lru_cache
+def _probe_engine() -> Engine:
+    """Отдельное подключение для пробы с таймаутами подключения и запроса.
+
+    asyncio.wait_for прекращает только ожидание, а поток с зависшим
+    запросом остаётся. Таймауты на самом соединении завершают и его, так
+    что частый опрос не копит зависшие потоки.
+    """
+    url = make_url(settings.database_url)
+    if url.get_backend_name() != "postgresql":
+        return engine
+    timeout = settings.health_probe_timeout_seconds
+    return create_engine(
+        url,
+        poolclass=NullPool,
+        connect_args={
+            "connect_timeout": max(1, math.ceil(timeout)),
+            "options": f"-c statement_timeout={int(timeout * 1000)}",
+        },
+    )
+
+
+def _select_one() -> None:
+    """SELECT 1 отдельным соединением с таймаутами"""
+    with _probe_engine().connect() as conn:
+        conn.execute(text("SELECT 1"))
+
+
+async def probe_database() -> str:
+    """Проба базы данных"""
+    await asyncio.to_thread(_select_one)
+    return "connected"
+
+
+def _ping(url: str) -> None:
+    """PING Redis отдельным соединением с таймаутами"""
+    client = redis.Redis.from_url(
+        url,
+        socket_timeout=settings.health_probe_timeout_seconds,
+        socket_connect_timeout=settings.health_probe_timeout_seconds,
+    )
+    try:
+        client.ping()
+    finally:
+        client.close()
+
+
+async def probe_redis() -> str:
+    """Проба Redis приложения"""
+    await asyncio.to_thread(_ping, settings.redis_url)
+    return "connected"
+
+
+async def probe_broker() -> str:
+    """Проба брокера Celery"""
+    await asyncio.to_thread(_ping, settings.celery_broker_url)
+    return "connected"
+
+
+async def probe_bot() -> str:
+    """Состояние опроса обновлений Telegram"""
+    updater = bot_instance.application.updater
+    if updater is None or not updater.running:
+        raise RuntimeError("updater is not running")
+    return "running"
+
+
+async def probe_yandex() -> str:
+    """Доступность API YandexGPT без запроса к модели"""
+    status = await yandex_service.ping(timeout=settings.health_probe_timeout_seconds)
+    if status >= 500:
+        raise RuntimeError(f"HTTP {status}")
+    return f"reachable (HTTP {status})"
+
+
+health_service = HealthService(
+    settings.health_cache_ttl_seconds,
+    settings.health_probe_timeout_seconds,
+    settings.health_critical_probes,
+)
+health_service.register("database", probe_database)
+health_service.register("redis", probe_redis)
+health_service.register("broker", probe_broker)
+health_service.register("bot", probe_bot)
+health_service.register("yandex", probe_yandex)
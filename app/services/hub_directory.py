@@ -0,0 +1,99 @@
+"""Каталог хабов Хабра для проверки тем перед обходом.
+
+Slug пользовательской темы — транслитерация названия, и такого хаба на
+Хабре обычно нет: обход раз за разом получал бы 404. Раз в
+HUB_DIRECTORY_REFRESH_HOURS задача refresh_hub_directory обходит список
+хабов (/ru/hubs/pageN/) и кладёт его в Redis (hub directory), после чего
+каждой теме записывается найденный хаб (Topic.hub_slug) — по slug или по
+названию без учёта регистра, пробелов и знаков. Тема без хаба не
+обходится, статьи к ней подбираются по тексту (app/services/semantic.py).
+"""
+
+import re
+from collections.abc import Callable
+
+import redis
+from bs4 import BeautifulSoup
+from loguru import logger
+from redis.exceptions import RedisError
+
+from app.core.config import settings
+from app.core.redis import get_redis
+from app.database.models import Topic
+
+KEY = "habr:hubs"
+
+HUB_HREF = re.compile(r"/ru/hubs?/([\w-]+)/?$")
+
+
+def normalize(name: str) -> str:
+    """Название без регистра, «ё» и знаков: «Machine-Learning» == «machine_learning»"""
+    return "".join(c for c in name.lower().replace("ё", "е") if c.isalnum())
+
+
+def parse_hubs(html: str) -> dict[str, str]:
+    """Хабы со страницы списка: slug → название"""
+    soup = BeautifulSoup(html, "html.parser")
+    hubs = {}
+    for link in soup.find_all("a", class_="tm-hub__title"):
+        match = HUB_HREF.search(link.get("href", ""))
+        title = link.get_text(strip=True)
+        if match and title:
+            hubs[match.group(1)] = title
+    return hubs
+
+
+def resolve(hubs: dict[str, str], name: str, slug: str) -> str | None:
+    """Хаб для темы: совпадение slug, затем названия; None, если хаба нет"""
+    if slug in hubs:
+        return slug
+    wanted = {normalize(name), normalize(slug)}
+    for hub_slug, title in hubs.items():
+        if normalize(title) in wanted or normalize(hub_slug) in wanted:
+            return hub_slug
+    return None
+
+
+class HubDirectory:
+    """Список хабов в Redis"""
+
+    def __init__(self, client_factory: Callable[[], redis.Redis] = get_redis):
+        self.client_factory = client_factory
+
+    def store(self, hubs: dict[str, str]) -> None:
+        client = self.client_factory()
+        with client.pipeline() as pipe:
+            pipe.delete(KEY)
+            pipe.hset(KEY, mapping=hubs)
+            # Переживает один пропущенный обновляющий запуск
+            pipe.expire(KEY, 2 * settings.hub_directory_refresh_hours * 3600)
+            pipe.execute()
+
+    def load(self) -> dict[str, str]:
+        return self.client_factory().hgetall(KEY)
+
+    def lookup(self, name: str, slug: str) -> str | None:
+        """Хаб для новой темы по закешированному списку; None без списка или Redis"""
+        try:
+            hubs = self.load()
+        except RedisError:
+            logger.exception("Error loading hub directory")
+            return None
+        return resolve(hubs, name, slug) if hubs else None
+
+
+def apply_to_topics(topics: list[Topic], hubs: dict[str, str]) -> int:
+    """Запись найденных хабов в темы; сменившим хаб сбрасывается отсрочка обхода"""
+    changed = 0
+    for topic in topics:
+        hub_slug = resolve(hubs, topic.name, topic.slug)
+        if hub_slug != topic.hub_slug:
+            logger.info(f"Topic {topic.name}: hub {topic.hub_slug} -> {hub_slug}")
+            topic.hub_slug = hub_slug
+            topic.crawl_failures = 0
+            topic.next_crawl_at = None
+            changed += 1
+    return changed
+
+
+hub_directory = HubDirectory()
@@ -0,0 +1,291 @@
+"""Выбор поставщика резюме: yandexgpt-lite, yandexgpt или локальная выжимка.
+
+Сервис YandexGPT привязан к одной модели, и её сбой или рост задержек
+останавливал всю генерацию резюме. Маршрутизатор ведёт по каждому
+поставщику скользящие средние (EWMA) задержки и доли ошибок и число
+запросов в работе. Он выбирает первого здорового поставщика в порядке
+LLM_ROUTER_PROVIDERS. Здоров тот, у кого не открыт размыкатель, задержка
+не выше LLM_ROUTER_LATENCY_BUDGET_SECONDS, доля ошибок не выше
+LLM_ROUTER_MAX_ERROR_RATE и в работе меньше LLM_ROUTER_MAX_IN_FLIGHT
+запросов. Поставщик, о котором LLM_ROUTER_PROBE_SECONDS не было
+сведений, снова считается здоровым, чтобы можно было заметить, что он
+восстановился.
+
+Если модель отвечает дольше своей обычной задержки × LLM_ROUTER_HEDGE_FACTOR,
+тот же запрос параллельно отправляется следующей модели, и берётся первый
+ответ. При ошибке сразу пробуется следующий поставщик. Локальная выжимка
+идёт последней: она всегда доступна, но такое резюме временное, и статья
+остаётся в очереди повторов, пока не ответит модель. Короткий анонс
+(SUMMARY_LOCAL_MAX_CHARS) и статья без подписчиков сразу резюмируются
+локально, и такое резюме окончательное.
+"""
+
+import asyncio
+import time
+from abc import ABC, abstractmethod
+from collections.abc import Callable
+from dataclasses import dataclass, field
+
+from loguru import logger
+
+from app.core.circuit import CLOSED, OPEN
+from app.core.config import settings
+from app.core.metrics import (
+    SUMMARY_HEDGES,
+    SUMMARY_PROVIDER_ERROR_RATE,
+    SUMMARY_PROVIDER_LATENCY,
+    SUMMARY_ROUTED,
+)
+from app.services import textrank
+from app.services.yandex_service import YandexGPTError, YandexGPTService, yandex_service
+
+# Ошибки поставщиков, после которых пробуется следующий
+PROVIDER_ERRORS = (YandexGPTError,)
+
+
+class SummaryUnavailableError(Exception):
+    """Ни один поставщик не вернул резюме"""
+
+
+class SummaryProvider(ABC):
+    """Поставщик резюме; local — работает без сети и не бывает недоступен"""
+
+    name = ""
+    local = False
+
+    def available(self) -> bool:
+        return True
+
+    @abstractmethod
+    async def summarize(self, content: str, title: str) -> str:
+        """Резюме статьи"""
+
+    async def open(self) -> None:
+        pass
+
+    async def close(self) -> None:
+        pass
+
+
+class YandexProvider(SummaryProvider):
+    """Модель YandexGPT"""
+
+    def __init__(self, service: YandexGPTService):
+        self.service = service
+        self.name = service.model
+
+    def available(self) -> bool:
+        # Открытый размыкатель до паузы и ожидание пробного вызова — недоступен
+        breaker = self.service.breaker
+        return breaker.state == CLOSED or (breaker.state == OPEN and breaker.retry_in == 0)
+
+    async def summarize(self, content: str, title: str) -> str:
+        return await self.service.generate_summary(content=content, title=title)
+
+    async def open(self) -> None:
+        await self.service.open()
+
+    async def close(self) -> None:
+        await self.service.close()
+
+
+class ExtractiveProvider(SummaryProvider):
+    """Локальная выжимка TextRank (app/services/textrank.py)"""
+
+    name = "extractive"
+    local = True
+
+    async def summarize(self, content: str, title: str) -> str:
+        return textrank.summarize(content, title)
+
+
+@dataclass
+class ProviderStats:
+    """Скользящие средние задержки и доли ошибок поставщика"""
+
+    latency: float | None = None
+    error_rate: float = 0.0
+    in_flight: int = 0
+    last_observed: float = float("-inf")
+
+    def observe(self, seconds: float, ok: bool, now: float, alpha: float) -> None:
+        self.latency = (
+            seconds if self.latency is None else (1 - alpha) * self.latency + alpha * seconds
+        )
+        self.error_rate = (1 - alpha) * self.error_rate + alpha * (0.0 if ok else 1.0)
+        self.last_observed = now
+
+
+@dataclass(frozen=True)
+class RoutedSummary:
+    """Резюме и поставщик, который его дал"""
+
+    text: str
+    provider: str
+    provisional: bool = False
+    errors: tuple[str, ...] = field(default_factory=tuple)
+
+    @property
+    def retry_reason(self) -> str | None:
+        """Причина оставить статью в очереди повторов; None для резюме от модели"""
+        if not self.provisional:
+            return None
+        return "; ".join(self.errors) or "no healthy LLM provider"
+
+
+class LLMRouter:
+    """Маршрутизатор запросов резюме между поставщиками"""
+
+    def __init__(
+        self, providers: list[SummaryProvider], clock: Callable[[], float] = time.monotonic
+    ):
+        self.providers = providers
+        self.clock = clock
+        self.stats = {provider.name: ProviderStats() for provider in providers}
+
+    async def open(self) -> None:
+        for provider in self.providers:
+            await provider.open()
+
+    async def close(self) -> None:
+        for provider in self.providers:
+            await provider.close()
+
+    def healthy(self, provider: SummaryProvider) -> bool:
+        """Поставщик доступен, отвечает быстро, редко ошибается и не перегружен"""
+        if not provider.available():
+            return False
+        stats = self.stats[provider.name]
+        if stats.in_flight >= settings.llm_router_max_in_flight:
+            return False
+        if self.clock() - stats.last_observed >= settings.llm_router_probe_seconds:
+            # Давно нет сведений: пробуем, вдруг поставщик восстановился
+            return True
+        return stats.error_rate <= settings.llm_router_max_error_rate and (
+            stats.latency is None or stats.latency <= settings.llm_router_latency_budget_seconds
+        )
+
+    def candidates(self) -> list[SummaryProvider]:
+        """Поставщики в порядке попыток: здоровые модели, затем локальная выжимка"""
+        remote = [provider for provider in self.providers if not provider.local]
+        local = [provider for provider in self.providers if provider.local]
+        healthy = [provider for provider in remote if self.healthy(provider)]
+        if local:
+            return healthy + local
+        # Без локального запасного варианта пробуем и нездоровые модели
+        return healthy + [provider for provider in remote if provider not in healthy]
+
+    def hedge_delay(self, provider: SummaryProvider) -> float:
+        """Сколько ждать ответа поставщика, прежде чем продублировать запрос"""
+        latency = self.stats[provider.name].latency
+        if latency is None:
+            latency = settings.llm_router_latency_budget_seconds
+        return max(
+            settings.llm_router_hedge_min_seconds, latency * settings.llm_router_hedge_factor
+        )
+
+    def prefers_local(self, content: str, low_priority: bool = False) -> bool:
+        """Короткий анонс или статья без подписчиков: платный вызов модели не нужен"""
+        if not any(provider.local for provider in self.providers):
+            return False
+        return low_priority or len(content) <= settings.summary_local_max_chars
+
+    async def summarize(
+        self, content: str, title: str, low_priority: bool = False
+    ) -> RoutedSummary:
+        """Резюме от первого ответившего поставщика; SummaryUnavailableError, если никто"""
+        if self.prefers_local(content, low_priority):
+            local = next(provider for provider in self.providers if provider.local)
+            return RoutedSummary(await self._call(local, content, title), local.name)
+
+        candidates = self.candidates()
+        errors: list[str] = []
+        running: dict[asyncio.Task, SummaryProvider] = {}
+        position = 0
+
+        def launch() -> SummaryProvider:
+            nonlocal position
+            provider = candidates[position]
+            position += 1
+            running[asyncio.create_task(self._call(provider, content, title))] = provider
+            return provider
+
+        if not candidates:
+            raise SummaryUnavailableError("no summary providers configured")
+        last = launch()
+        try:
+            while running:
+                # Дублируется запрос только к другой модели, локальная выжимка ждёт ошибок
+                can_hedge = position < len(candidates) and not candidates[position].local
+                done, _ = await asyncio.wait(
+                    running,
+                    timeout=self.hedge_delay(last) if can_hedge else None,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                if not done:
+                    SUMMARY_HEDGES.labels(candidates[position].name).inc()
+                    logger.info(f"{last.name} is slow, hedging with {candidates[position].name}")
+                    last = launch()
+                    continue
+
+                for task in done:
+                    provider = running.pop(task)
+                    try:
+                        text = task.result()
+                    except PROVIDER_ERRORS as e:
+                        errors.append(f"{provider.name}: {e}")
+                        continue
+                    return RoutedSummary(text, provider.name, provider.local, tuple(errors))
+
+                if not running and position < len(candidates):
+                    last = launch()
+        finally:
+            for task in running:
+                task.cancel()
+
+        raise SummaryUnavailableError("; ".join(errors))
+
+    async def _call(self, provider: SummaryProvider, content: str, title: str) -> str:
+        """Вызов поставщика с учётом задержки, ошибок и числа запросов в работе"""
+        stats = self.stats[provider.name]
+        stats.in_flight += 1
+        started = self.clock()
+        try:
+            text = await provider.summarize(content, title)
+        except PROVIDER_ERRORS:
+            self._observe(provider, started, ok=False)
+            raise
+        except asyncio.CancelledError:
+            # Проиграл дублирующему запросу: задержка не меньше прошедшего времени
+            self._observe(provider, started, ok=True, outcome="hedged")
+            raise
+        finally:
+            stats.in_flight -= 1
+        self._observe(provider, started, ok=True)
+        return text
+
+    def _observe(
+        self, provider: SummaryProvider, started: float, ok: bool, outcome: str | None = None
+    ) -> None:
+        now = self.clock()
+        stats = self.stats[provider.name]
+        stats.observe(now - started, ok, now, settings.llm_router_alpha)
+        SUMMARY_ROUTED.labels(provider.name, outcome or ("ok" if ok else "error")).inc()
+        SUMMARY_PROVIDER_LATENCY.labels(provider.name).set(stats.latency)
+        SUMMARY_PROVIDER_ERROR_RATE.labels(provider.name).set(stats.error_rate)
+
+
+def build_router() -> LLMRouter:
+    """Маршрутизатор по списку LLM_ROUTER_PROVIDERS"""
+    providers: list[SummaryProvider] = []
+    for name in settings.llm_router_providers:
+        if name == ExtractiveProvider.name:
+            providers.append(ExtractiveProvider())
+        elif name == yandex_service.model:
+            providers.append(YandexProvider(yandex_service))
+        else:
+            providers.append(YandexProvider(YandexGPTService(model=name)))
+    return LLMRouter(providers)
+
+
+summary_router = build_router()
@@ -1,15 +1,41 @@
 import contextlib
-from datetime import datetime
+import time
+from datetime import UTC, datetime, timedelta
 from urllib.parse import urljoin, urlparse
 
 import aiohttp
 from bs4 import BeautifulSoup
 from loguru import logger
+from sqlalchemy import and_, or_
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import Session
 
 from app.core.config import settings
-from app.database.models import Article
+from app.core.metrics import (
+    DUPLICATE_ARTICLES,
+    HABR_FETCH_BYTES,
+    HABR_FETCH_ERRORS,
+    HABR_FETCH_SECONDS,
+    HABR_PARSE_SECONDS,
+)
+from app.core.tracing import span
+from app.database.models import Article, SimhashBand
+from app.services import dedup, pipeline
+from app.services.database_service import DatabaseService, summary_due
+from app.services.hub_directory import parse_hubs
+from app.services.semantic import article_text, matching_topics, semantic_index
+
+# Сокращения счётчиков просмотров на Хабре, в том числе русские
+COUNTER_SUFFIXES = {"K": 1_000, "К": 1_000, "M": 1_000_000, "М": 1_000_000}
+
+
+class HabrFetchError(Exception):
+    """Страница Хабра не получена: сетевая ошибка или неуспешный HTTP-статус"""
+
+    def __init__(self, url: str, status: int | None = None):
+        super().__init__(f"Failed to fetch {url}: {status or 'network error'}")
+        self.url = url
+        self.status = status
 
 
 class HabrParser:
@@ -23,60 +49,115 @@ class HabrParser:
         }
 
     async def __aenter__(self):
-        self.session = aiohttp.ClientSession(headers=self.headers)
+        await self.open()
         return self
 
     async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    async def open(self):
+        """Открытие HTTP-сессии; соединения переиспользуются до close"""
+        if self.session is None or self.session.closed:
+            self.session = aiohttp.ClientSession(headers=self.headers)
+
+    async def close(self):
+        """Закрытие HTTP-сессии"""
         if self.session:
             await self.session.close()
+            self.session = None
 
-    async def get_articles_by_topic(self, topic_slug: str, max_articles: int = 20) -> list[dict]:
-        """Получение статей по теме"""
+    async def _fetch_html(self, url: str, page: str) -> str:
+        """Загрузка страницы с замером времени и объёма; HabrFetchError при неудаче"""
+        started = time.perf_counter()
+        try:
+            with span("habr.fetch", stage="fetch", url=url, page=page):
+                async with self.session.get(url) as response:
+                    if response.status != 200:
+                        HABR_FETCH_ERRORS.labels(page, str(response.status)).inc()
+                        raise HabrFetchError(url, response.status)
+
+                    body = await response.read()
+                    encoding = response.get_encoding()
+
+        except (aiohttp.ClientError, TimeoutError) as e:
+            HABR_FETCH_ERRORS.labels(page, type(e).__name__).inc()
+            raise HabrFetchError(url) from e
+        finally:
+            HABR_FETCH_SECONDS.labels(page).observe(time.perf_counter() - started)
+
+        HABR_FETCH_BYTES.labels(page).inc(len(body))
+        return body.decode(encoding, errors="replace")
+
+    async def get_articles_by_topic(
+        self, topic_slug: str, max_articles: int = 20, raise_errors: bool = False
+    ) -> list[dict]:
+        """Получение статей по теме.
+
+        При raise_errors=True ошибка загрузки поднимается как HabrFetchError,
+        чтобы вызывающий код мог повторить именно эту тему.
+        """
         url = f"{self.base_url}/ru/hub/{topic_slug}/"
 
         try:
-            async with self.session.get(url) as response:
-                if response.status != 200:
-                    logger.error(f"Failed to fetch {url}: {response.status}")
-                    return []
+            html = await self._fetch_html(url, "hub")
+        except HabrFetchError as e:
+            logger.error(f"Error fetching articles for topic {topic_slug}: {e}")
+            if raise_errors:
+                raise
+            return []
 
-                html = await response.text()
-                return await self._parse_articles_list(html, max_articles)
+        return await self._parse_articles_list(html, max_articles)
 
-        except (aiohttp.ClientError, TimeoutError):
-            logger.exception(f"Error fetching articles for topic {topic_slug}")
-            return []
+    async def get_hubs(self, max_pages: int = 100) -> dict[str, str]:
+        """Список хабов: slug → название; страницы обходятся, пока появляются новые хабы"""
+        hubs: dict[str, str] = {}
+        for page in range(1, max_pages + 1):
+            suffix = f"page{page}/" if page > 1 else ""
+            try:
+                html = await self._fetch_html(f"{self.base_url}/ru/hubs/{suffix}", "hubs")
+            except HabrFetchError as e:
+                # За последней страницей списка Хабр отвечает 404
+                if page > 1 and e.status == 404:
+                    break
+                raise
+            page_hubs = parse_hubs(html)
+            if not page_hubs.keys() - hubs.keys():
+                break
+            hubs.update(page_hubs)
+        return hubs
 
     async def get_latest_articles(self, max_articles: int = 50) -> list[dict]:
         """Получение последних статей с главной страницы"""
         try:
-            async with self.session.get(self.base_url) as response:
-                if response.status != 200:
-                    logger.error(f"Failed to fetch main page: {response.status}")
-                    return []
-
-                html = await response.text()
-                return await self._parse_articles_list(html, max_articles)
-
-        except (aiohttp.ClientError, TimeoutError):
-            logger.exception("Error fetching latest articles")
+            html = await self._fetch_html(self.base_url, "main")
+        except HabrFetchError as e:
+            logger.error(f"Error fetching latest articles: {e}")
             return []
 
+        return await self._parse_articles_list(html, max_articles)
+
     async def _parse_articles_list(self, html: str, max_articles: int) -> list[dict]:
         """Парсинг списка статей из HTML"""
-        soup = BeautifulSoup(html, "html.parser")
-        articles = []
-
-        article_elements = soup.find_all("article", class_="tm-article-snippet")
-
-        for article_elem in article_elements[:max_articles]:
-            try:
-                article_data = await self._extract_article_data(article_elem)
-                if article_data:
-                    articles.append(article_data)
-            except (AttributeError, KeyError, ValueError, TypeError):
-                logger.exception("Error parsing article element")
-                continue
+        with HABR_PARSE_SECONDS.time(), span("habr.parse", stage="parse") as parse_span:
+            soup = BeautifulSoup(html, "html.parser")
+            articles = []
+
+            article_elements = soup.find_all("article", class_="tm-article-snippet")
+
+            for article_elem in article_elements[:max_articles]:
+                try:
+                    article_data = await self._extract_article_data(article_elem)
+                    if article_data:
+                        fingerprint = dedup.fingerprint(
+                            article_data["title"], article_data["content"]
+                        )
+                        article_data["simhash"] = fingerprint.simhash if fingerprint else None
+                        articles.append(article_data)
+                except (AttributeError, KeyError, ValueError, TypeError):
+                    logger.exception("Error parsing article element")
+                    continue
+
+            parse_span.set_attribute("articles", len(articles))
 
         return articles
 
@@ -124,6 +205,9 @@ class HabrParser:
                 if hub_name:
                     hubs.append(hub_name)
 
+            rating_elem = article_elem.find(class_="tm-votes-meter__value")
+            views_elem = article_elem.find(class_="tm-icon-counter__value")
+
             return {
                 "habr_id": habr_id,
                 "title": title,
@@ -132,19 +216,39 @@ class HabrParser:
                 "published_at": published_at,
                 "content": content,
                 "topics": hubs,
+                "rating": self._parse_counter(rating_elem.get_text(strip=True))
+                if rating_elem
+                else None,
+                "views": self._parse_counter(views_elem.get_text(strip=True))
+                if views_elem
+                else None,
             }
 
         except (AttributeError, KeyError, ValueError, TypeError):
             logger.exception("Error extracting article data")
             return None
 
+    @staticmethod
+    def _parse_counter(text: str) -> int | None:
+        """Счётчик из карточки статьи: «+42», «-3», «1.2K», «3M»"""
+        text = text.strip().replace(",", ".").replace("\u2212", "-")
+        multiplier = 1
+        if text[-1:].upper() in COUNTER_SUFFIXES:
+            multiplier = COUNTER_SUFFIXES[text[-1].upper()]
+            text = text[:-1]
+        try:
+            return round(float(text) * multiplier)
+        except ValueError:
+            return None
+
     def _extract_habr_id(self, url: str) -> str | None:
         """Извлечение ID статьи из URL"""
         try:
             parsed = urlparse(url)
             path_parts = parsed.path.strip("/").split("/")
-            if len(path_parts) >= 2 and path_parts[0] == "ru":
-                return path_parts[1]
+            # /ru/articles/123456/, /ru/companies/<компания>/articles/123456/
+            if len(path_parts) >= 3 and path_parts[0] == "ru" and path_parts[-1].isdigit():
+                return path_parts[-1]
             return None
         except (ValueError, AttributeError):
             return None
@@ -152,26 +256,26 @@ class HabrParser:
     async def get_article_content(self, url: str) -> str | None:
         """Получение полного содержимого статьи"""
         try:
-            async with self.session.get(url) as response:
-                if response.status != 200:
-                    logger.error(f"Failed to fetch article content: {response.status}")
-                    return None
+            html = await self._fetch_html(url, "article")
+        except HabrFetchError as e:
+            logger.error(f"Error fetching article content: {e}")
+            return None
 
-                html = await response.text()
-                soup = BeautifulSoup(html, "html.parser")
+        try:
+            soup = BeautifulSoup(html, "html.parser")
 
-                content_elem = soup.find("div", class_="tm-article-body")
-                if not content_elem:
-                    return None
+            content_elem = soup.find("div", class_="tm-article-body")
+            if not content_elem:
+                return None
 
-                for elem in content_elem.find_all(["script", "style", "nav", "aside"]):
-                    elem.decompose()
+            for elem in content_elem.find_all(["script", "style", "nav", "aside"]):
+                elem.decompose()
 
-                content = content_elem.get_text(separator=" ", strip=True)
-                return content
+            content = content_elem.get_text(separator=" ", strip=True)
+            return content
 
-        except (aiohttp.ClientError, TimeoutError, AttributeError):
-            logger.exception("Error fetching article content")
+        except AttributeError:
+            logger.exception("Error parsing article content")
             return None
 
 
@@ -180,46 +284,141 @@ class ArticleService:
 
     def __init__(self, db: Session):
         self.db = db
+        # Темы, подбираемые по тексту, загружаются при первой статье
+        self._text_topics: list[str] | None = None
 
     async def save_article(self, article_data: dict) -> Article | None:
         """Сохранение статьи в базу данных"""
-        try:
-            existing_article = (
-                self.db.query(Article).filter(Article.habr_id == article_data["habr_id"]).first()
-            )
+        article, _ = await self.get_or_create_article(article_data)
+        return article
 
-            if existing_article:
-                return existing_article
-
-            article = Article(
-                habr_id=article_data["habr_id"],
-                title=article_data["title"],
-                url=article_data["url"],
-                author=article_data["author"],
-                published_at=article_data["published_at"],
-                content=article_data["content"],
-                topics=article_data["topics"],
-                is_processed=False,
+    async def get_or_create_article(self, article_data: dict) -> tuple[Article | None, bool]:
+        """Сохранение статьи; второй элемент — True, если строка создана этим вызовом"""
+        with span("db.save_article", stage="db", habr_id=article_data["habr_id"]):
+            try:
+                existing_article = (
+                    self.db.query(Article)
+                    .filter(Article.habr_id == article_data["habr_id"])
+                    .first()
+                )
+
+                if existing_article:
+                    return existing_article, False
+
+                article = Article(
+                    habr_id=article_data["habr_id"],
+                    title=article_data["title"],
+                    url=article_data["url"],
+                    author=article_data["author"],
+                    published_at=article_data["published_at"],
+                    content=article_data["content"],
+                    topics=article_data["topics"],
+                    rating=article_data.get("rating"),
+                    views=article_data.get("views"),
+                    is_processed=False,
+                    status=pipeline.INGESTED,
+                )
+                self._link_duplicate(article, article_data)
+                if article.canonical_id is None:
+                    self._tag_text_topics(article)
+
+                self.db.add(article)
+                self.db.commit()
+                self.db.refresh(article)
+                if self._text_topics:
+                    semantic_index.add([article])
+
+                if article.canonical_id:
+                    logger.info(
+                        f"Saved article {article.title} as a duplicate of {article.canonical_id}"
+                    )
+                else:
+                    logger.info(f"Saved new article: {article.title}")
+                return article, True
+
+            except SQLAlchemyError:
+                self.db.rollback()
+                logger.exception("Error saving article")
+                self.db.rollback()
+                return None, False
+
+    def _tag_text_topics(self, article: Article) -> None:
+        """Добавление к темам статьи близких по тексту пользовательских тем и тем без хаба"""
+        if self._text_topics is None:
+            db_service = DatabaseService(self.db)
+            topics = db_service.get_text_matched_topics()
+            if topics:
+                semantic_index.sync(db_service)
+            self._text_topics = [topic.name for topic in topics]
+        if not self._text_topics:
+            return
+
+        # Веса IDF меняются с каждой статьёй, поэтому векторы тем считаются заново
+        topic_vectors = {name: semantic_index.embed(name) for name in self._text_topics}
+        vector = semantic_index.embed(article_text(article))
+        names = [
+            name
+            for name in matching_topics(vector, topic_vectors)
+            if name not in (article.topics or [])
+        ]
+        if names:
+            article.topics = [*(article.topics or []), *names]
+            logger.debug(f"Article {article.habr_id} matched custom topics: {', '.join(names)}")
+
+    def _link_duplicate(self, article: Article, article_data: dict) -> None:
+        """Запись отпечатка и ссылки на исходную статью, если новая — её копия"""
+        if "simhash" in article_data:
+            value = article_data["simhash"]
+            fingerprint = (
+                dedup.Fingerprint(value, dedup.split_bands(value)) if value is not None else None
             )
-
-            self.db.add(article)
-            self.db.commit()
-            self.db.refresh(article)
-
-            logger.info(f"Saved new article: {article.title}")
-            return article
-
-        except SQLAlchemyError:
-            self.db.rollback()
-            logger.exception("Error saving article")
-            self.db.rollback()
-            return None
+        else:
+            fingerprint = dedup.fingerprint(article_data["title"], article_data["content"])
+        if fingerprint is None:
+            return
+
+        article.simhash = fingerprint.signed
+        article.simhash_bands = [
+            SimhashBand(band=band, value=value) for band, value in enumerate(fingerprint.bands)
+        ]
+
+        since = datetime.now(UTC) - timedelta(days=settings.dedup_lookback_days)
+        candidates = (
+            self.db.query(Article.id, Article.simhash, Article.canonical_id)
+            .join(SimhashBand, SimhashBand.article_id == Article.id)
+            .filter(
+                Article.created_at >= since,
+                or_(
+                    *(
+                        and_(SimhashBand.band == band, SimhashBand.value == value)
+                        for band, value in enumerate(fingerprint.bands)
+                    )
+                ),
+            )
+            .distinct()
+            .all()
+        )
+        max_distance = min(settings.dedup_max_distance, dedup.BANDS - 1)
+        distance, nearest = min(
+            (
+                (dedup.hamming(fingerprint.simhash, dedup.from_signed(row.simhash)), row)
+                for row in candidates
+            ),
+            key=lambda item: item[0],
+            default=(None, None),
+        )
+        if nearest is not None and distance <= max_distance:
+            # Копия не суммаризуется и не попадает в дайджесты
+            article.canonical_id = nearest.canonical_id or nearest.id
+            article.is_processed = True
+            article.status = pipeline.DUPLICATE
+            DUPLICATE_ARTICLES.inc()
 
     def get_unprocessed_articles(self, limit: int = 50) -> list[Article]:
         """Получение необработанных статей"""
         return (
             self.db.query(Article)
-            .filter(not Article.is_processed)
+            .filter(summary_due(datetime.now(UTC)))
             .order_by(Article.created_at.desc())
             .limit(limit)
             .all()
@@ -0,0 +1,159 @@
+"""Жизненный цикл статьи: ingested → fetched → summarized → deliverable.
+
+Раньше этап статьи угадывался по is_processed и пустому резюме, а
+обработку двигали задачи по таймеру: новая статья ждала резюме до
+получаса и рассылки до часа. Теперь этап записан в Article.status, и
+каждая задача этапа сразу ставит в очередь следующую (celery_app/tasks.py):
+
+* ingested — статья сохранена парсером, в очереди fetch_article_body;
+* fetched — загружен полный текст, в очереди summarize_article;
+* summarizing — статью захватила задача резюме;
+* summarized — резюме от модели сохранено, в очереди publish_article;
+* deliverable — статья готова к рассылке, запрошена рассылка дайджестов.
+
+Перед вызовом модели статья захватывается одним UPDATE (claim): задача
+этапа и подметальщики могут выбрать одну и ту же статью, но резюмирует
+её только та, что успела перевести её в summarizing. Неудача возвращает
+статью в fetched, а захват, брошенный упавшим воркером, снимает
+подметальщик.
+
+Копии уже сохранённых статей получают статус duplicate и дальше не идут.
+Статьи тем с подписчиками идут в очередь с высоким приоритетом Celery,
+остальные — с низким. Задачи по таймеру остались как подметальщики:
+повторяют неудачные резюме и перезапускают статьи, застрявшие на этапе
+дольше PIPELINE_STALL_MINUTES (например, если сообщение брокера пропало).
+
+Для каждого этапа считаются глубина очереди (статьи, ждущие перехода с
+него) и время, проведённое статьёй на предыдущем этапе.
+"""
+
+from collections.abc import Callable
+from datetime import UTC, datetime, timedelta
+
+import redis
+from loguru import logger
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
+
+from app.core.config import settings
+from app.core.metrics import PIPELINE_QUEUE_DEPTH, PIPELINE_STAGE_SECONDS, PIPELINE_TOTAL_SECONDS
+from app.core.redis import get_redis
+from app.database.models import Article
+
+INGESTED = "ingested"
+FETCHED = "fetched"
+SUMMARIZING = "summarizing"
+SUMMARIZED = "summarized"
+DELIVERABLE = "deliverable"
+DUPLICATE = "duplicate"
+
+# Этапы, на которых статья ждёт следующей задачи
+PENDING = (INGESTED, FETCHED, SUMMARIZING, SUMMARIZED)
+# Этапы, с которых статью можно захватить для резюме
+CLAIMABLE = (INGESTED, FETCHED)
+
+# Приоритеты Celery на Redis: меньшее число забирается раньше
+HIGH_PRIORITY = 0
+LOW_PRIORITY = 9
+
+DELIVERY_KEY = "pipeline:delivery"
+
+
+def _aware(value: datetime) -> datetime:
+    # SQLite возвращает время без часового пояса
+    return value if value.tzinfo else value.replace(tzinfo=UTC)
+
+
+def advance(article: Article, status: str, now: datetime | None = None) -> None:
+    """Перевод статьи на этап с учётом времени на предыдущем; фиксирует вызывающий"""
+    now = now or datetime.now(UTC)
+    if article.status_changed_at is not None:
+        PIPELINE_STAGE_SECONDS.labels(status).observe(
+            (now - _aware(article.status_changed_at)).total_seconds()
+        )
+    if status == DELIVERABLE and article.created_at is not None:
+        PIPELINE_TOTAL_SECONDS.observe((now - _aware(article.created_at)).total_seconds())
+    article.status = status
+    article.status_changed_at = now
+
+
+def claim(db: Session, article: Article) -> bool:
+    """Захват статьи для резюме; False, если её уже резюмирует другая задача"""
+    now = datetime.now(UTC)
+    previous = article.status_changed_at
+    claimed = (
+        db.query(Article)
+        .filter(Article.id == article.id, Article.status.in_(CLAIMABLE))
+        .update(
+            {Article.status: SUMMARIZING, Article.status_changed_at: now},
+            synchronize_session=False,
+        )
+    )
+    db.commit()
+    if not claimed:
+        return False
+    if previous is not None:
+        PIPELINE_STAGE_SECONDS.labels(SUMMARIZING).observe((now - _aware(previous)).total_seconds())
+    # Объект приводится к записанному в базе без повторной записи
+    set_committed_value(article, "status", SUMMARIZING)
+    set_committed_value(article, "status_changed_at", now)
+    return True
+
+
+def release(article: Article) -> None:
+    """Снятие захвата без резюме: статья снова ждёт в fetched; фиксирует вызывающий"""
+    if article.status == SUMMARIZING:
+        article.status = FETCHED
+        article.status_changed_at = datetime.now(UTC)
+
+
+def priority(article: Article, subscribed: set[str]) -> int:
+    """Приоритет задачи этапа: выше для статей по темам с подписчиками"""
+    return HIGH_PRIORITY if subscribed.intersection(article.topics or []) else LOW_PRIORITY
+
+
+def queue_depth(db: Session) -> dict[str, int]:
+    """Число статей, ждущих перехода с каждого этапа"""
+    rows = (
+        db.query(Article.status, func.count(Article.id))
+        .filter(Article.status.in_(PENDING))
+        .group_by(Article.status)
+        .all()
+    )
+    depth = dict.fromkeys(PENDING, 0)
+    depth.update(dict(rows))
+    return depth
+
+
+def refresh_queue_depth(db: Session) -> dict[str, int]:
+    """Обновление метрики глубины очередей этапов"""
+    depth = queue_depth(db)
+    for stage, count in depth.items():
+        PIPELINE_QUEUE_DEPTH.labels(stage).set(count)
+    return depth
+
+
+def stalled(db: Session, status: str, limit: int = 100) -> list[Article]:
+    """Статьи, застрявшие на этапе дольше PIPELINE_STALL_MINUTES"""
+    before = datetime.now(UTC) - timedelta(minutes=settings.pipeline_stall_minutes)
+    return (
+        db.query(Article)
+        .filter(Article.status == status, Article.status_changed_at <= before)
+        .order_by(Article.status_changed_at)
+        .limit(limit)
+        .all()
+    )
+
+
+def claim_delivery(client_factory: Callable[[], redis.Redis] = get_redis) -> bool:
+    """Право запросить рассылку: одна на PIPELINE_DELIVERY_DEBOUNCE_SECONDS"""
+    try:
+        return bool(
+            client_factory().set(
+                DELIVERY_KEY, "1", nx=True, ex=settings.pipeline_delivery_debounce_seconds
+            )
+        )
+    except redis.RedisError:
+        logger.exception("Error claiming digest delivery, leaving it to the schedule")
+        return False
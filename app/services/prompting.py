@@ -0,0 +1,208 @@
+"""Промпты для YandexGPT в пределах бюджета токенов.
+
+Вместо среза первых N символов в промпт попадают самые содержательные
+предложения статьи: первые YANDEX_PROMPT_LEAD_SENTENCES (вступление
+обычно формулирует тему) и затем предложения с наибольшим весом, пока
+хватает бюджета модели из YANDEX_PROMPT_BUDGETS. Вес предложения — сумма
+частот его значимых слов в статье, нормированная на длину, с надбавкой за
+слова заголовка; служебные фразы (подписки, ссылки, реклама) и предложения
+без общих слов с остальной статьёй отбрасываются.
+Предложения не обрезаются и идут в исходном порядке.
+
+Токены оцениваются по длине текста, а коэффициент уточняется по полю
+usage ответов модели.
+"""
+
+import math
+import re
+from collections import Counter
+from dataclasses import dataclass
+
+from app.core.config import settings
+
+CHARS_PER_TOKEN = 4.0
+DEFAULT_BUDGET = 1000
+
+_SENTENCE_END = re.compile(r"(?<=[.!?…])\s+(?=[«\"(\[A-ZА-ЯЁ0-9])")
+_WORD = re.compile(r"\w+", re.UNICODE)
+BOILERPLATE = re.compile(
+    r"подписыва|подпишись|телеграм|telegram|читать далее|реклама|промокод|"
+    r"https?://|www\.|\bтеги:|\bхабы:",
+    re.IGNORECASE,
+)
+_STOPWORD_TEXT = (
+    "и в во не что он на я с со как а то все она так его но да ты к у же вы за бы по "
+    "только ее мне было вот от меня еще нет о из ему теперь когда даже ну вдруг ли если "
+    "уже или ни быть был него до вас нибудь опять уж вам ведь там потом себя ничего ей "
+    "может они тут где есть надо ней для мы тебя их чем была сам чтобы без будто чего раз "
+    "тоже себе под будет ж тогда кто этот того потому этого какой совсем ним здесь этом "
+    "один почти мой тем нее сейчас были куда зачем всех никогда можно при наконец "
+    "два об другой хоть после над больше тот через эти нас про всего них какая много "
+    "разве три эту моя впрочем хорошо свою этой перед иногда лучше чуть том нельзя такой "
+    "им более всегда конечно всю между это также который которые которая которых "
+    "the a an and or of to in on for is are was be with as by at this that it from"
+)
+_STOPWORDS = frozenset(_STOPWORD_TEXT.split())
+
+
+@dataclass(frozen=True)
+class PromptTemplate:
+    """Вид промпта: инструкция, требования к ответу и доля бюджета на текст статьи"""
+
+    instruction: str
+    requirements: tuple[str, ...]
+    max_tokens: int
+    budget_share: float = 1.0
+
+
+SUMMARY = PromptTemplate(
+    "Создай краткое и понятное резюме следующей IT-статьи с Хабра.",
+    (
+        "2-3 предложения",
+        "Простой и понятный язык",
+        "Основные идеи и выводы",
+        "Без технических деталей",
+        "На русском языке",
+    ),
+    max_tokens=200,
+    budget_share=0.75,
+)
+DETAILED = PromptTemplate(
+    "Создай подробное резюме следующей IT-статьи с Хабра.",
+    (
+        "4-6 предложений",
+        "Основные концепции и идеи",
+        "Практические выводы",
+        "Ключевые технологии или методы",
+        "На русском языке",
+    ),
+    max_tokens=400,
+)
+KEY_POINTS = PromptTemplate(
+    "Извлеки ключевые моменты из следующей IT-статьи с Хабра.",
+    (
+        "3-5 ключевых пунктов",
+        "Каждый пункт в отдельной строке",
+        "Кратко и по существу",
+        "На русском языке",
+    ),
+    max_tokens=300,
+    budget_share=0.75,
+)
+
+
+@dataclass(frozen=True)
+class Prompt:
+    """Готовый промпт и сведения о вошедшем тексте"""
+
+    text: str
+    max_tokens: int
+    estimated_tokens: int
+    sentences_used: int
+    sentences_total: int
+
+
+class TokenEstimator:
+    """Оценка числа токенов по длине текста с поправкой по фактическому расходу"""
+
+    def __init__(self, chars_per_token: float = CHARS_PER_TOKEN, alpha: float = 0.1):
+        self.chars_per_token = chars_per_token
+        self.alpha = alpha
+        self.ratio = 1.0
+
+    def estimate(self, text: str) -> int:
+        return math.ceil(len(text) / self.chars_per_token * self.ratio)
+
+    def observe(self, estimated: int, actual: int) -> None:
+        """Уточнение поправки по usage ответа модели"""
+        if estimated <= 0 or actual <= 0:
+            return
+        observed = self.ratio * actual / estimated
+        self.ratio = min(2.0, max(0.5, (1 - self.alpha) * self.ratio + self.alpha * observed))
+
+
+def split_sentences(text: str) -> list[str]:
+    """Предложения текста с нормализованными пробелами"""
+    text = " ".join(text.split())
+    return [sentence for sentence in _SENTENCE_END.split(text) if sentence]
+
+
+def content_words(text: str) -> list[str]:
+    """Значимые слова текста в нижнем регистре, без стоп-слов и чисел"""
+    return [
+        word
+        for word in _WORD.findall(text.lower())
+        if len(word) > 2 and word not in _STOPWORDS and not word.isdigit()
+    ]
+
+
+def select_sentences(
+    content: str, title: str, budget: int, estimator: TokenEstimator, lead: int | None = None
+) -> tuple[list[str], int]:
+    """Самые содержательные предложения в пределах бюджета и общее число предложений"""
+    lead = settings.yandex_prompt_lead_sentences if lead is None else lead
+    sentences = split_sentences(content)
+    candidates = [
+        (i, sentence) for i, sentence in enumerate(sentences) if not BOILERPLATE.search(sentence)
+    ]
+    if not candidates:
+        return [], len(sentences)
+
+    frequencies = Counter(word for _, sentence in candidates for word in content_words(sentence))
+    title_words = set(content_words(title))
+
+    def weight(sentence: str) -> float:
+        words = content_words(sentence)
+        unique = set(words)
+        # Предложение без общих слов со статьёй и заголовком — отступление
+        if not any(frequencies[word] > 1 or word in title_words for word in unique):
+            return 0.0
+        return (
+            sum(frequencies[word] for word in unique) + 2 * len(unique & title_words)
+        ) / math.sqrt(len(words))
+
+    # Сначала вступление, затем остальные по убыванию веса
+    ranked = [(i, sentence) for i, sentence in candidates[lead:] if weight(sentence) > 0]
+    order = candidates[:lead] + sorted(ranked, key=lambda item: weight(item[1]), reverse=True)
+    chosen: list[tuple[int, str]] = []
+    spent = 0
+    for i, sentence in order:
+        tokens = estimator.estimate(sentence) + 1
+        if spent + tokens > budget:
+            continue
+        chosen.append((i, sentence))
+        spent += tokens
+
+    if not chosen:
+        # Даже первое предложение не помещается: обрезка по границе слова
+        first = candidates[0][1]
+        limit = int(budget * estimator.chars_per_token / estimator.ratio)
+        return [first[:limit].rsplit(" ", 1)[0] + "…"], len(sentences)
+    return [sentence for _, sentence in sorted(chosen)], len(sentences)
+
+
+def content_budget(model: str) -> int:
+    """Бюджет токенов на текст статьи для модели"""
+    return settings.yandex_prompt_budgets.get(model, DEFAULT_BUDGET)
+
+
+def build_prompt(
+    template: PromptTemplate, title: str, content: str, model: str, estimator: TokenEstimator
+) -> Prompt:
+    """Промпт по шаблону с текстом статьи в пределах бюджета модели"""
+    budget = int(content_budget(model) * template.budget_share)
+    sentences, total = select_sentences(content, title, budget, estimator)
+    requirements = "\n".join(f"- {requirement}" for requirement in template.requirements)
+    text = (
+        f"{template.instruction}\n\n"
+        f"Заголовок: {title}\n\n"
+        f"Содержание:\n{' '.join(sentences)}\n\n"
+        f"Требования:\n{requirements}"
+    )
+    return Prompt(
+        text=text,
+        max_tokens=template.max_tokens,
+        estimated_tokens=estimator.estimate(text),
+        sentences_used=len(sentences),
+        sentences_total=total,
+    )
@@ -0,0 +1,211 @@
+"""Семантический индекс статей для пользовательских тем.
+
+Пользовательская тема («Криптовалюты») не совпадает ни с одним хабом,
+поэтому статьи к ней подбираются по тексту. Заголовок и текст статьи
+разбиваются на слова и символьные n-граммы (они переживают русские
+окончания: «криптовалюты» и «криптовалютный» делят большую часть n-грамм),
+признаки хешируются в BUCKETS корзин и взвешиваются TF-IDF. Частоты
+документов копятся по мере добавления статей. Разреженный вектор случайной
+проекцией сводится к SEMANTIC_DIMENSIONS измерениям, косинус при этом
+почти сохраняется.
+
+Поиск приближённый: векторы раскладываются по спискам вокруг центров
+k-means (IVF), запрос просматривает SEMANTIC_PROBES ближайших списков и
+точно сравнивает только их статьи. Пока статей мало, просматриваются все.
+
+Индекс живёт в процессе и догружает из базы статьи, добавленные после
+последней известной, страницами по возрастанию id, а раз в
+SEMANTIC_REBUILD_HOURS строится заново по статьям за DIGEST_LOOKBACK_DAYS.
+"""
+
+import hashlib
+import math
+import re
+import time
+from collections import Counter
+from collections.abc import Callable, Sequence
+from datetime import UTC, datetime, timedelta
+from functools import cached_property
+
+import numpy as np
+from loguru import logger
+
+from app.core.config import settings
+from app.database.models import Article
+from app.services.database_service import DatabaseService
+
+BUCKETS = 2**13
+NGRAM_SIZES = (3, 4, 5)
+KMEANS_ITERATIONS = 10
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+
+def features(text: str) -> Counter[int]:
+    """Корзины хешированных слов и символьных n-грамм текста"""
+    grams: Counter[str] = Counter()
+    for word in _TOKEN.findall(text.lower()):
+        grams[word] += 1
+        marked = f"<{word}>"
+        for size in NGRAM_SIZES:
+            for i in range(len(marked) - size + 1):
+                grams[marked[i : i + size]] += 1
+
+    buckets: Counter[int] = Counter()
+    for gram, count in grams.items():
+        digest = hashlib.blake2b(gram.encode(), digest_size=4).digest()
+        buckets[int.from_bytes(digest, "big") % BUCKETS] += count
+    return buckets
+
+
+def article_text(article: Article) -> str:
+    """Текст статьи для индекса: заголовок весит вдвое больше"""
+    return f"{article.title} {article.title} {article.content or ''}"
+
+
+class SemanticIndex:
+    """Векторы статей с приближённым поиском ближайших по косинусу"""
+
+    def __init__(
+        self,
+        dimensions: int | None = None,
+        probes: int | None = None,
+        seed: int = 0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.dimensions = dimensions or settings.semantic_dimensions
+        self.probes = probes or settings.semantic_probes
+        self.seed = seed
+        self.clock = clock
+        self.reset()
+
+    @cached_property
+    def projection(self) -> np.ndarray:
+        """Случайная проекция корзин в плотный вектор, создаётся при первом расчёте"""
+        rng = np.random.default_rng(self.seed)
+        return (
+            rng.standard_normal((BUCKETS, self.dimensions)) / math.sqrt(self.dimensions)
+        ).astype(np.float32)
+
+    def reset(self) -> None:
+        self.article_ids: list[int] = []
+        self.vectors = np.zeros((0, self.dimensions), dtype=np.float32)
+        self.document_frequency = np.zeros(BUCKETS, dtype=np.float32)
+        self.centroids: np.ndarray | None = None
+        self.assignments = np.zeros(0, dtype=np.int32)
+        self.trained_rows = 0
+        self.last_article_id = 0
+        self.built_at: float | None = None
+
+    def __len__(self) -> int:
+        return len(self.article_ids)
+
+    def _embed(self, buckets: Counter[int]) -> np.ndarray:
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        if not buckets:
+            return vector
+        index = np.fromiter(buckets.keys(), dtype=np.int64, count=len(buckets))
+        counts = np.fromiter(buckets.values(), dtype=np.float32, count=len(buckets))
+        idf = np.log((1 + len(self)) / (1 + self.document_frequency[index])) + 1
+        vector = ((1 + np.log(counts)) * idf) @ self.projection[index]
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def embed(self, text: str) -> np.ndarray:
+        """Нормированный вектор текста"""
+        return self._embed(features(text))
+
+    def add(self, articles: Sequence[Article]) -> None:
+        """Добавление статей; частоты документов обновляются до расчёта их векторов"""
+        articles = [article for article in articles if article.id > self.last_article_id]
+        if not articles:
+            return
+        article_features = [features(article_text(article)) for article in articles]
+        for buckets in article_features:
+            self.document_frequency[list(buckets)] += 1
+        self.article_ids.extend(article.id for article in articles)
+        vectors = np.stack([self._embed(buckets) for buckets in article_features])
+        self.vectors = np.concatenate([self.vectors, vectors])
+        self.last_article_id = max(self.last_article_id, *(article.id for article in articles))
+
+        if self.centroids is not None:
+            self.assignments = np.concatenate(
+                [self.assignments, np.argmax(vectors @ self.centroids.T, axis=1)]
+            )
+        # Центры переучиваются, когда статей стало вдвое больше
+        if len(self) >= max(2 * self.trained_rows, settings.semantic_min_train_rows):
+            self.train()
+
+    def train(self) -> None:
+        """Сферический k-means: около sqrt(n) списков"""
+        lists = max(1, round(math.sqrt(len(self))))
+        rng = np.random.default_rng(self.seed)
+        centroids = self.vectors[rng.choice(len(self), lists, replace=False)]
+        for _ in range(KMEANS_ITERATIONS):
+            assignments = np.argmax(self.vectors @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignments, self.vectors)
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            # Опустевший список сохраняет прежний центр
+            centroids = np.where(norms > 0, sums / np.maximum(norms, 1e-12), centroids)
+        self.centroids = centroids
+        self.assignments = np.argmax(self.vectors @ centroids.T, axis=1).astype(np.int32)
+        self.trained_rows = len(self)
+
+    def search(self, vector: np.ndarray, k: int, min_similarity: float) -> list[tuple[int, float]]:
+        """Ближайшие статьи с косинусом не ниже min_similarity, ближайшие первыми"""
+        if not len(self):
+            return []
+        if self.centroids is None:
+            rows = np.arange(len(self))
+        else:
+            probes = min(self.probes, len(self.centroids))
+            nearest = np.argpartition(-(self.centroids @ vector), probes - 1)[:probes]
+            rows = np.flatnonzero(np.isin(self.assignments, nearest))
+
+        scores = self.vectors[rows] @ vector
+        order = np.argsort(-scores, kind="stable")[:k]
+        return [
+            (self.article_ids[rows[i]], float(scores[i]))
+            for i in order
+            if scores[i] >= min_similarity
+        ]
+
+    def sync(self, db_service: DatabaseService) -> None:
+        """Догрузка новых статей из базы, полная перестройка раз в SEMANTIC_REBUILD_HOURS"""
+        now = self.clock()
+        if self.built_at is None or now - self.built_at >= settings.semantic_rebuild_hours * 3600:
+            self.reset()
+            self.built_at = now
+        since = datetime.now(UTC) - timedelta(days=settings.digest_lookback_days)
+        limit = settings.semantic_max_articles
+        if not len(self):
+            # Пустой индекс строится по последним статьям, более старые не нужны
+            articles = db_service.get_recent_articles(since, limit=limit)
+            # Частоты и списки копятся в порядке поступления статей
+            self.add(sorted(articles, key=lambda article: article.id))
+            loaded = len(articles)
+        else:
+            # Новые статьи догружаются страницами по возрастанию id: last_article_id
+            # не перескакивает статьи, не вошедшие в страницу
+            loaded = 0
+            while True:
+                page = db_service.get_articles_after(self.last_article_id, since, limit)
+                self.add(page)
+                loaded += len(page)
+                if len(page) < limit:
+                    break
+        if loaded:
+            logger.debug(f"Semantic index synced: {loaded} new, {len(self)} total")
+
+
+def matching_topics(vector: np.ndarray, topic_vectors: dict[str, np.ndarray]) -> list[str]:
+    """Пользовательские темы, близкие к вектору статьи"""
+    return [
+        name
+        for name, topic_vector in topic_vectors.items()
+        if float(vector @ topic_vector) >= settings.semantic_min_similarity
+    ]
+
+
+semantic_index = SemanticIndex()
@@ -0,0 +1,172 @@
+"""История отправленных статей пользователя в Redis.
+
+Для каждого пользователя в Redis хранится Bloom-фильтр идентификаторов
+отправленных статей. Отрицательный ответ фильтра точен, поэтому такие
+кандидаты в дайджест отсеиваются без обращения к базе; только
+положительные ответы проверяются по sent_articles, что заодно убирает
+ложные срабатывания.
+
+Фильтр разбит на поколения длиной DIGEST_LOOKBACK_DAYS: статьи в дайджест
+берутся только за этот срок, значит их отправки лежат в текущем или
+предыдущем поколении, а более старые ключи истекают сами. Если фильтра
+нет (новый пользователь, Redis очищен), он заполняется из базы при первой
+проверке. Если Redis недоступен, проверка целиком идёт через базу.
+"""
+
+import hashlib
+import math
+import time
+from collections.abc import Callable, Iterable
+from datetime import UTC, datetime, timedelta
+
+import redis
+from loguru import logger
+from redis.exceptions import RedisError
+
+from app.core.config import settings
+from app.core.metrics import SENT_HISTORY_CHECKS
+from app.core.redis import get_redis
+from app.services.database_service import DatabaseService
+
+KEY_PREFIX = "sent:"
+
+
+def bloom_parameters(capacity: int, error_rate: float) -> tuple[int, int]:
+    """Размер фильтра в битах и число хеш-функций для заданной ёмкости и доли ошибок"""
+    bits = math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+    hashes = max(1, round(bits / capacity * math.log(2)))
+    return bits, hashes
+
+
+class SentHistory:
+    """Bloom-фильтры отправленных статей с проверкой положительных ответов по базе"""
+
+    def __init__(
+        self,
+        client_factory: Callable[[], redis.Redis] = get_redis,
+        capacity: int | None = None,
+        error_rate: float | None = None,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.client_factory = client_factory
+        self.bits, self.hashes = bloom_parameters(
+            capacity or settings.sent_history_capacity,
+            error_rate or settings.sent_history_error_rate,
+        )
+        self.clock = clock
+
+    @property
+    def window_seconds(self) -> int:
+        return settings.digest_lookback_days * 86400
+
+    def _keys(self, user_id: int) -> tuple[str, str]:
+        """Ключи текущего и предыдущего поколения"""
+        generation = int(self.clock()) // self.window_seconds
+        return (
+            f"{KEY_PREFIX}{user_id}:{generation}",
+            f"{KEY_PREFIX}{user_id}:{generation - 1}",
+        )
+
+    def positions(self, article_id: int) -> list[int]:
+        """Номера битов статьи (двойное хеширование)"""
+        digest = hashlib.blake2b(str(article_id).encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "big")
+        second = int.from_bytes(digest[8:], "big") | 1
+        return [(first + i * second) % self.bits for i in range(self.hashes)]
+
+    def _set_bits(self, key: str, article_ids: Iterable[int], sentinel: bool = False) -> None:
+        client = self.client_factory()
+        bitfield = client.bitfield(key)
+        for article_id in article_ids:
+            for position in self.positions(article_id):
+                bitfield.set("u1", position, 1)
+        if sentinel:
+            # Бит за пределами фильтра: ключ существует, даже если отправок не было
+            bitfield.set("u1", self.bits, 1)
+        with client.pipeline(transaction=False) as pipe:
+            pipe.execute_command(*bitfield.command)
+            pipe.expire(key, 2 * self.window_seconds)
+            pipe.execute()
+
+    def _might_contain(self, user_id: int, article_ids: list[int]) -> set[int]:
+        """Статьи, которые фильтр считает отправленными"""
+        client = self.client_factory()
+        maybe = set()
+        with client.pipeline(transaction=False) as pipe:
+            for key in self._keys(user_id):
+                bitfield = client.bitfield(key)
+                for article_id in article_ids:
+                    for position in self.positions(article_id):
+                        bitfield.get("u1", position)
+                pipe.execute_command(*bitfield.command)
+            replies = pipe.execute()
+
+        for bits in replies:
+            for i, article_id in enumerate(article_ids):
+                if all(bits[i * self.hashes : (i + 1) * self.hashes]):
+                    maybe.add(article_id)
+        return maybe
+
+    def _ensure_warm(self, db_service: DatabaseService, user_id: int, since: datetime) -> None:
+        """Заполнение фильтра из базы, если его нет ни в одном поколении"""
+        client = self.client_factory()
+        if client.exists(*self._keys(user_id)):
+            return
+        sent_ids = db_service.get_sent_article_ids(user_id, since)
+        self._set_bits(self._keys(user_id)[0], sent_ids, sentinel=True)
+        logger.debug(f"Sent history of user {user_id} warmed with {len(sent_ids)} articles")
+
+    def filter_unsent(
+        self, db_service: DatabaseService, user_id: int, article_ids: list[int]
+    ) -> list[int]:
+        """Статьи из списка, которые пользователю ещё не отправлялись, в том же порядке"""
+        if not article_ids:
+            return []
+        since = datetime.now(UTC) - timedelta(days=settings.digest_lookback_days)
+        try:
+            self._ensure_warm(db_service, user_id, since)
+            maybe = self._might_contain(user_id, article_ids)
+        except RedisError as e:
+            logger.warning(f"Sent history unavailable, checking database: {e}")
+            SENT_HISTORY_CHECKS.labels("fallback").inc(len(article_ids))
+            return self._filter_in_database(db_service, user_id, article_ids, since, article_ids)
+
+        SENT_HISTORY_CHECKS.labels("miss").inc(len(article_ids) - len(maybe))
+        if not maybe:
+            return list(article_ids)
+        unsent = self._filter_in_database(db_service, user_id, article_ids, since, maybe)
+        sent = len(article_ids) - len(unsent)
+        SENT_HISTORY_CHECKS.labels("hit").inc(sent)
+        SENT_HISTORY_CHECKS.labels("false_positive").inc(len(maybe) - sent)
+        return unsent
+
+    def _filter_in_database(
+        self,
+        db_service: DatabaseService,
+        user_id: int,
+        article_ids: list[int],
+        since: datetime,
+        to_check: Iterable[int],
+    ) -> list[int]:
+        """Проверка по sent_articles только статей из to_check"""
+        sent = db_service.get_sent_article_ids(user_id, since, article_ids=to_check)
+        return [article_id for article_id in article_ids if article_id not in sent]
+
+    def record_sent(self, user_id: int, article_ids: list[int]) -> None:
+        """Добавление отправленных статей в фильтр после записи в базу"""
+        try:
+            self._set_bits(self._keys(user_id)[0], article_ids)
+        except RedisError:
+            logger.exception(f"Error updating sent history of user {user_id}")
+            # Фильтр без этих статей дал бы повторную отправку: пусть заполнится из базы
+            self.forget(user_id)
+
+    def forget(self, user_id: int) -> None:
+        """Удаление фильтров пользователя"""
+        try:
+            self.client_factory().delete(*self._keys(user_id))
+        except RedisError:
+            logger.exception(f"Error dropping sent history of user {user_id}")
+
+
+sent_history = SentHistory()
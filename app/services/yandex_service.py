@@ -1,120 +1,358 @@
-from typing import Any
+import asyncio
+import random
+import time
+from collections.abc import AsyncIterator, Awaitable, Callable, Sequence
+from contextlib import asynccontextmanager
+from typing import Any, TypeVar
 
 import httpx
 from loguru import logger
 
+from app.core.circuit import OPEN, CircuitBreaker
 from app.core.config import settings
+from app.core.metrics import (
+    YANDEX_BATCH_OPERATIONS,
+    YANDEX_CIRCUIT_OPEN,
+    YANDEX_ERRORS,
+    YANDEX_REQUEST_SECONDS,
+    YANDEX_RETRIES,
+    YANDEX_TOKENS,
+)
+from app.core.tracing import span
+from app.services.prompting import (
+    DETAILED,
+    KEY_POINTS,
+    SUMMARY,
+    PromptTemplate,
+    TokenEstimator,
+    build_prompt,
+)
+
+T = TypeVar("T")
+
+
+class YandexGPTError(Exception):
+    """Ошибка генерации в YandexGPT; retryable — сбой временный и запрос стоит повторить"""
+
+    retryable = False
+
+
+class YandexHTTPError(YandexGPTError):
+    """API ответил ошибкой HTTP"""
+
+    def __init__(self, status: int, detail: str = "", retry_after: float | None = None):
+        super().__init__(f"HTTP {status}" + (f": {detail}" if detail else ""))
+        self.status = status
+        self.retry_after = retry_after
+        self.retryable = status == 429 or status >= 500
+
+
+class YandexNetworkError(YandexGPTError):
+    """Запрос не дошёл до API или ответ не пришёл вовремя"""
+
+    retryable = True
+
+
+class YandexResponseError(YandexGPTError):
+    """Ответ API не того формата"""
+
+
+class YandexOperationError(YandexGPTError):
+    """Отложенная операция YandexGPT завершилась ошибкой"""
+
+
+class YandexCircuitOpenError(YandexGPTError):
+    """Размыкатель открыт после серии сбоев: вызов отклонён без запроса к API"""
+
+    retryable = True
 
 
 class YandexGPTService:
     """Расширенный сервис для работы с Yandex GPT"""
 
-    def __init__(self):
+    def __init__(self, model: str | None = None):
         self.api_key = settings.yandex_api_key
         self.folder_id = settings.yandex_folder_id
-        self.model = settings.yandex_model
+        self.model = model or settings.yandex_model
         self.base_url = "https://llm.api.cloud.yandex.net/foundationModels/v1/completion"
+        self.async_url = "https://llm.api.cloud.yandex.net/foundationModels/v1/completionAsync"
+        self.operations_url = "https://operation.api.cloud.yandex.net/operations"
+        self._client: httpx.AsyncClient | None = None
+        self.token_estimator = TokenEstimator()
+        self.breaker = CircuitBreaker(
+            f"yandex:{self.model}",
+            failure_threshold=settings.yandex_circuit_failures,
+            reset_seconds=settings.yandex_circuit_reset_seconds,
+        )
+
+    async def open(self):
+        """Открытие постоянного HTTP-клиента, соединения переиспользуются между вызовами"""
+        if self._client is None:
+            self._client = httpx.AsyncClient()
+
+    async def close(self):
+        """Закрытие постоянного HTTP-клиента"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    @asynccontextmanager
+    async def _http_client(self) -> AsyncIterator[httpx.AsyncClient]:
+        """Постоянный клиент, если он открыт, иначе клиент на один запрос"""
+        if self._client is not None:
+            yield self._client
+        else:
+            async with httpx.AsyncClient() as client:
+                yield client
 
     async def generate_summary(self, content: str, title: str) -> str:
         """Генерация краткого резюме статьи"""
-        prompt = self._create_summary_prompt(content, title)
-        return await self._call_api(prompt)
+        return await self._complete(SUMMARY, content, title)
 
     async def generate_detailed_summary(self, content: str, title: str) -> str:
         """Генерация подробного резюме статьи"""
-        prompt = self._create_detailed_prompt(content, title)
-        return await self._call_api(prompt, max_tokens=400)
+        return await self._complete(DETAILED, content, title)
 
     async def extract_key_points(self, content: str, title: str) -> str:
         """Извлечение ключевых моментов из статьи"""
-        prompt = self._create_key_points_prompt(content, title)
-        return await self._call_api(prompt, max_tokens=300)
+        return await self._complete(KEY_POINTS, content, title)
 
-    def _create_summary_prompt(self, content: str, title: str) -> str:
-        """Создание промпта для краткого резюме"""
-        return f"""
-        Создай краткое и понятное резюме следующей IT-статьи с Хабра.
+    async def _complete(self, template: PromptTemplate, content: str, title: str) -> str:
+        """Промпт по шаблону в пределах бюджета модели и вызов API"""
+        prompt = build_prompt(template, title, content, self.model, self.token_estimator)
+        logger.debug(
+            f"Prompt for '{title}': {prompt.sentences_used}/{prompt.sentences_total} sentences, "
+            f"~{prompt.estimated_tokens} tokens"
+        )
+        return await self._call_api(
+            prompt.text, max_tokens=prompt.max_tokens, estimated_tokens=prompt.estimated_tokens
+        )
 
-        Заголовок: {title}
+    async def _call_api(
+        self, prompt: str, max_tokens: int = 200, estimated_tokens: int | None = None
+    ) -> str:
+        """Вызов Yandex GPT API с повторами временных сбоев; при неудаче — YandexGPTError"""
+        data = self._request_body(prompt, max_tokens)
 
-        Содержание:
-        {content[:3000]}
+        started = time.perf_counter()
+        with span("yandex.completion", stage="summarize", model=self.model) as call_span:
+            try:
+                async with self._http_client() as client:
+                    result = await self._with_retries(
+                        lambda: self._send(client, "POST", self.base_url, json=data)
+                    )
+                try:
+                    summary = result["result"]["alternatives"][0]["message"]["text"]
+                except (KeyError, IndexError, TypeError) as e:
+                    YANDEX_ERRORS.labels(self.model, "malformed").inc()
+                    raise YandexResponseError("no alternatives in response") from e
+            except YandexGPTError as e:
+                call_span.fail(str(e))
+                logger.error(f"Yandex GPT API call failed: {e}")
+                raise
+            finally:
+                YANDEX_REQUEST_SECONDS.labels(self.model).observe(time.perf_counter() - started)
 
-        Требования к резюме:
-        - 2-3 предложения
-        - Простой и понятный язык
-        - Основные идеи и выводы
-        - Без технических деталей
-        - На русском языке
-        """
+        self._record_usage(result["result"].get("usage", {}), estimated_tokens)
+        return summary.strip()
+
+    async def _with_retries(self, call: Callable[[], Awaitable[T]]) -> T:
+        """Повтор временных сбоев с экспоненциальной задержкой и учётом Retry-After"""
+        attempt = 0
+        while True:
+            try:
+                return await call()
+            except YandexCircuitOpenError:
+                # Повторять сразу бессмысленно: цепь откроется не раньше паузы
+                raise
+            except YandexGPTError as e:
+                if not e.retryable or attempt >= settings.yandex_max_retries:
+                    raise
+                delay = min(
+                    settings.yandex_retry_max_seconds,
+                    getattr(e, "retry_after", None)
+                    or settings.yandex_retry_base_seconds * 2**attempt * random.uniform(0.5, 1.0),
+                )
+                attempt += 1
+                YANDEX_RETRIES.labels(self.model).inc()
+                logger.warning(f"Yandex GPT {e}, retry {attempt} in {delay:.1f}s")
+                await asyncio.sleep(delay)
+
+    async def _send(
+        self, client: httpx.AsyncClient, method: str, url: str, **kwargs: Any
+    ) -> dict[str, Any]:
+        """Один запрос к API через размыкатель; сбои переводятся в YandexGPTError"""
+        if not self.breaker.allow():
+            raise YandexCircuitOpenError(
+                f"circuit open, next probe in {self.breaker.retry_in:.0f}s"
+            )
+        try:
+            response = await client.request(
+                method, url, headers=self._headers(), timeout=30.0, **kwargs
+            )
+            response.raise_for_status()
+            result = response.json()
+        except httpx.HTTPStatusError as e:
+            status = e.response.status_code
+            YANDEX_ERRORS.labels(self.model, str(status)).inc()
+            error = YandexHTTPError(
+                status, e.response.text[:200], _retry_after(e.response.headers.get("Retry-After"))
+            )
+            # Ошибка в самом запросе (400, 401) не говорит о том, что API лежит
+            self._record_outcome(ok=not error.retryable)
+            raise error from e
+        except httpx.RequestError as e:
+            YANDEX_ERRORS.labels(self.model, "network").inc()
+            self._record_outcome(ok=False)
+            raise YandexNetworkError(type(e).__name__) from e
+        except ValueError as e:
+            YANDEX_ERRORS.labels(self.model, "malformed").inc()
+            self._record_outcome(ok=False)
+            raise YandexResponseError("response is not JSON") from e
+        except asyncio.CancelledError:
+            # Отменённый пробный вызов освобождает место для следующей пробы
+            self.breaker.release_probe()
+            YANDEX_CIRCUIT_OPEN.labels(self.model).set(self.breaker.state == OPEN)
+            raise
+        self._record_outcome(ok=True)
+        return result
 
-    def _create_detailed_prompt(self, content: str, title: str) -> str:
-        """Создание промпта для подробного резюме"""
-        return f"""
-        Создай подробное резюме следующей IT-статьи с Хабра.
+    def _record_outcome(self, ok: bool) -> None:
+        if ok:
+            self.breaker.record_success()
+        else:
+            self.breaker.record_failure()
+        YANDEX_CIRCUIT_OPEN.labels(self.model).set(self.breaker.state == OPEN)
 
-        Заголовок: {title}
+    def _headers(self) -> dict[str, str]:
+        return {"Authorization": f"Api-Key {self.api_key}", "Content-Type": "application/json"}
 
-        Содержание:
-        {content[:4000]}
+    def _request_body(self, prompt: str, max_tokens: int) -> dict[str, Any]:
+        return {
+            "modelUri": f"gpt://{self.folder_id}/{self.model}",
+            "completionOptions": {"temperature": 0.3, "maxTokens": max_tokens},
+            "messages": [{"role": "user", "text": prompt}],
+        }
 
-        Требования к резюме:
-        - 4-6 предложений
-        - Основные концепции и идеи
-        - Практические выводы
-        - Ключевые технологии или методы
-        - На русском языке
+    async def generate_summaries_batch(
+        self, articles: Sequence[tuple[int, str, str]], template: PromptTemplate = SUMMARY
+    ) -> tuple[dict[int, str], dict[int, YandexGPTError]]:
+        """Резюме пачки статей (id, заголовок, текст) через отложенный режим.
+
+        Возвращает резюме и ошибки по id статьи. Ошибка записывается, если
+        операция не создалась, завершилась неудачей или не успела за
+        YANDEX_BATCH_TIMEOUT_SECONDS.
         """
+        semaphore = asyncio.Semaphore(settings.yandex_batch_concurrency)
+        results: dict[int, str] = {}
+        errors: dict[int, YandexGPTError] = {}
 
-    def _create_key_points_prompt(self, content: str, title: str) -> str:
-        """Создание промпта для извлечения ключевых моментов"""
-        return f"""
-        Извлеки ключевые моменты из следующей IT-статьи с Хабра.
+        async with self._http_client() as client:
 
-        Заголовок: {title}
+            async def submit(article_id: int, title: str, content: str) -> tuple[str, int, int]:
+                prompt = build_prompt(template, title, content, self.model, self.token_estimator)
+                async with semaphore:
+                    operation_id = await self._submit_operation(
+                        client, prompt.text, prompt.max_tokens
+                    )
+                return operation_id, article_id, prompt.estimated_tokens
 
-        Содержание:
-        {content[:3000]}
+            async def poll(operation_id: str) -> dict | None:
+                async with semaphore:
+                    return await self._poll_operation(client, operation_id)
 
-        Требования:
-        - 3-5 ключевых пунктов
-        - Каждый пункт в отдельной строке
-        - Кратко и по существу
-        - На русском языке
-        """
+            with span("yandex.batch.submit", stage="summarize", model=self.model):
+                submitted = await asyncio.gather(
+                    *(submit(*article) for article in articles), return_exceptions=True
+                )
+            # id операции → (id статьи, оценка токенов промпта)
+            pending: dict[str, tuple[int, int]] = {}
+            for article, outcome in zip(articles, submitted, strict=True):
+                if isinstance(outcome, BaseException):
+                    if not isinstance(outcome, YandexGPTError):
+                        raise outcome
+                    YANDEX_BATCH_OPERATIONS.labels(self.model, "rejected").inc()
+                    logger.error(f"Error submitting article {article[0]} to Yandex GPT: {outcome}")
+                    errors[article[0]] = outcome
+                    continue
+                operation_id, article_id, estimated_tokens = outcome
+                pending[operation_id] = (article_id, estimated_tokens)
+            logger.info(f"Submitted {len(pending)}/{len(articles)} deferred completions")
 
-    async def _call_api(self, prompt: str, max_tokens: int = 200) -> str:
-        """Вызов Yandex GPT API"""
-        headers = {"Authorization": f"Api-Key {self.api_key}", "Content-Type": "application/json"}
+            deadline = time.monotonic() + settings.yandex_batch_timeout_seconds
+            with span("yandex.batch.poll", stage="summarize", model=self.model):
+                while pending and time.monotonic() < deadline:
+                    await asyncio.sleep(settings.yandex_batch_poll_seconds)
+                    operation_ids = list(pending)
+                    polled = await asyncio.gather(
+                        *(poll(operation_id) for operation_id in operation_ids),
+                        return_exceptions=True,
+                    )
+                    for operation_id, outcome in zip(operation_ids, polled, strict=True):
+                        if outcome is None or getattr(outcome, "retryable", False):
+                            # Операция ещё идёт или опрос не прошёл: спросим в следующий раз
+                            continue
+                        article_id, estimated_tokens = pending.pop(operation_id)
+                        if isinstance(outcome, BaseException):
+                            if not isinstance(outcome, YandexGPTError):
+                                raise outcome
+                            YANDEX_BATCH_OPERATIONS.labels(self.model, "failed").inc()
+                            logger.error(
+                                f"Deferred completion for article {article_id} failed: {outcome}"
+                            )
+                            errors[article_id] = outcome
+                            continue
+                        YANDEX_BATCH_OPERATIONS.labels(self.model, "done").inc()
+                        results[article_id] = outcome["alternatives"][0]["message"]["text"].strip()
+                        self._record_usage(outcome.get("usage", {}), estimated_tokens)
 
-        data = {
-            "modelUri": f"gpt://{self.folder_id}/{self.model}",
-            "completionOptions": {"temperature": 0.3, "maxTokens": max_tokens},
-            "messages": [{"role": "user", "text": prompt}],
-        }
+        if pending:
+            YANDEX_BATCH_OPERATIONS.labels(self.model, "expired").inc(len(pending))
+            logger.warning(f"{len(pending)} deferred completions did not finish in time")
+            for article_id, _ in pending.values():
+                errors[article_id] = YandexOperationError("did not finish in time")
+        return results, errors
+
+    async def _submit_operation(
+        self, client: httpx.AsyncClient, prompt: str, max_tokens: int
+    ) -> str:
+        """Создание отложенной операции генерации: id операции"""
+        body = self._request_body(prompt, max_tokens)
+        operation = await self._with_retries(
+            lambda: self._send(client, "POST", self.async_url, json=body)
+        )
+        if "id" not in operation:
+            raise YandexResponseError("no operation id in response")
+        return operation["id"]
 
+    async def _poll_operation(self, client: httpx.AsyncClient, operation_id: str) -> dict | None:
+        """Результат операции или None, пока она не завершилась"""
+        operation = await self._send(client, "GET", f"{self.operations_url}/{operation_id}")
+        if not operation.get("done"):
+            return None
+        if "error" in operation:
+            error = operation["error"]
+            raise YandexOperationError(f"{error.get('code')}: {error.get('message')}")
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    self.base_url, headers=headers, json=data, timeout=30.0
-                )
-                response.raise_for_status()
+            operation["response"]["alternatives"][0]["message"]["text"]
+        except (KeyError, IndexError, TypeError) as e:
+            raise YandexResponseError("no alternatives in operation response") from e
+        return operation["response"]
 
-                result = response.json()
-                summary = result["result"]["alternatives"][0]["message"]["text"]
-                return summary.strip()
+    def _record_usage(self, usage: dict, estimated_tokens: int | None = None) -> None:
+        """Учёт потраченных токенов из блока usage ответа"""
+        for kind, field in (("input", "inputTextTokens"), ("completion", "completionTokens")):
+            if usage.get(field):
+                YANDEX_TOKENS.labels(self.model, kind).inc(int(usage[field]))
 
-        except httpx.HTTPStatusError as e:
-            logger.error(
-                f"HTTP error calling Yandex GPT API: {e.response.status_code} - {e.response.text}"
-            )
-            return f"Ошибка при генерации резюме: HTTP {e.response.status_code}"
-        except httpx.RequestError:
-            logger.exception("Request error calling Yandex GPT API")
-            return "Ошибка при подключении к Yandex GPT API"
-        except (KeyError, IndexError, ValueError):
-            logger.exception("Malformed response from Yandex GPT API")
-            return "Неожиданная ошибка при генерации резюме"
+        input_tokens = int(usage.get("inputTextTokens") or 0)
+        completion_tokens = int(usage.get("completionTokens") or 0)
+        if estimated_tokens is not None:
+            self.token_estimator.observe(estimated_tokens, input_tokens)
+        logger.info(
+            f"Yandex GPT {self.model} tokens: input {input_tokens} "
+            f"(estimated {estimated_tokens}), completion {completion_tokens}"
+        )
 
     async def test_connection(self) -> bool:
         """Тестирование подключения к Yandex GPT API"""
@@ -122,10 +360,16 @@ class YandexGPTService:
             test_prompt = "Привет! Это тестовое сообщение."
             result = await self._call_api(test_prompt, max_tokens=10)
             return "Привет" in result or "тест" in result.lower()
-        except (httpx.HTTPError, KeyError, IndexError, ValueError):
+        except YandexGPTError:
             logger.exception("Connection test failed")
             return False
 
+    async def ping(self, timeout: float = 5.0) -> int:
+        """Проверка доступности API без запроса к модели: HTTP-статус ответа"""
+        async with self._http_client() as client:
+            response = await client.get(self.base_url, timeout=timeout)
+            return response.status_code
+
     def get_model_info(self) -> dict[str, Any]:
         """Получение информации о модели"""
         return {
@@ -134,7 +378,16 @@ class YandexGPTService:
             "folder_id": self.folder_id,
             "api_key_configured": bool(self.api_key),
             "folder_id_configured": bool(self.folder_id),
+            "circuit": self.breaker.state,
         }
 
 
+def _retry_after(value: str | None) -> float | None:
+    """Секунды из заголовка Retry-After; дата вместо числа не поддерживается"""
+    try:
+        return float(value) if value else None
+    except ValueError:
+        return None
+
+
 yandex_service = YandexGPTService()
@@ -0,0 +1,27 @@
+"""Ручки статистики API"""
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.routes import router
+from app.database.database import get_db
+
+
+@pytest.fixture
+def client(bench_session):
+    app = FastAPI()
+    app.include_router(router)
+    app.dependency_overrides[get_db] = lambda: bench_session
+    return TestClient(app)
+
+
+@pytest.mark.parametrize(
+    "path",
+    ["/api/database/statistics", "/api/database/activity?days=7"],
+    ids=["statistics", "activity"],
+)
+def bench_stats_endpoint(benchmark, client, path):
+    """Сводная статистика и активность за неделю"""
+    response = benchmark(client.get, path)
+    assert response.status_code == 200
@@ -0,0 +1,54 @@
+"""Запросы к базе на горячих путях парсинга и рассылки"""
+
+import asyncio
+import itertools
+
+from app.services.database_service import DatabaseService
+from app.services.parser_service import ArticleService
+
+_habr_ids = itertools.count(10_000_000)
+
+
+def _article_data(habr_id: str) -> dict:
+    return {
+        "habr_id": habr_id,
+        "title": "Синтетическая статья",
+        "url": f"https://habr.com/ru/articles/{habr_id}/",
+        "author": "bench",
+        "published_at": None,
+        "content": "Текст статьи " * 50,
+        "topics": ["Python", "Go"],
+    }
+
+
+def bench_save_article_new(benchmark, bench_session):
+    """Сохранение новой статьи: проверка дубля, INSERT и COMMIT"""
+    service = ArticleService(bench_session)
+    loop = asyncio.new_event_loop()
+
+    def save():
+        return loop.run_until_complete(service.save_article(_article_data(str(next(_habr_ids)))))
+
+    article = benchmark(save)
+    loop.close()
+    assert article is not None
+
+
+def bench_save_article_existing(benchmark, bench_session):
+    """Повторная статья: только поиск дубля по habr_id"""
+    service = ArticleService(bench_session)
+    loop = asyncio.new_event_loop()
+    data = _article_data("100001")
+
+    article = benchmark(lambda: loop.run_until_complete(service.save_article(data)))
+    loop.close()
+    assert article.id == 1
+
+
+def bench_get_new_articles_for_user(benchmark, bench_session):
+    """Новые статьи по теме без уже отправленных пользователю"""
+    service = DatabaseService(bench_session)
+    users = itertools.cycle(range(1, bench_session.bind.bench_size.users + 1))
+    topics = itertools.cycle(range(1, 11))
+
+    benchmark(lambda: service.get_new_articles_for_user(next(users), next(topics), 5))
@@ -0,0 +1,51 @@
+"""Рассылка дайджестов всем подписчикам"""
+
+import asyncio
+
+import pytest
+from sqlalchemy import delete, func, select, update
+from telegram import Bot
+
+from app.bot.bot import bot_instance
+from app.database.models import SentArticle, Subscription
+from app.services.database_service import DatabaseService
+from app.services.digest_service import DigestService
+from app.services.yandex_service import yandex_service
+from benchmarks.conftest import FULL_PASS_MAX_SCALE
+
+
+@pytest.fixture
+def stubbed_services(stub_server, monkeypatch):
+    """Бот и YandexGPT направлены на заглушку"""
+    monkeypatch.setattr(
+        bot_instance, "bot", Bot(token="1:bench", base_url=stub_server.telegram_url)
+    )
+    monkeypatch.setattr(yandex_service, "base_url", stub_server.completion_url)
+
+
+def bench_send_digest_to_all_users(benchmark, bench_session, stubbed_services, stub_server):
+    """Полный проход рассылки; перед каждым раундом история отправки откатывается"""
+    if bench_session.bind.bench_scale > FULL_PASS_MAX_SCALE:
+        pytest.skip(f"full digest pass is limited to {FULL_PASS_MAX_SCALE}x")
+
+    service = DigestService()
+    service.db_service = DatabaseService(bench_session)
+    baseline = bench_session.scalar(select(func.max(SentArticle.id))) or 0
+    loop = asyncio.new_event_loop()
+
+    def reset():
+        bench_session.execute(delete(SentArticle).where(SentArticle.id > baseline))
+        bench_session.execute(update(Subscription).values(updated_at=None))
+        bench_session.commit()
+
+    stats = benchmark.pedantic(
+        lambda: loop.run_until_complete(service.send_digest_to_all_users()),
+        setup=reset,
+        rounds=3,
+    )
+
+    reset()
+    loop.close()
+    assert stats["users_processed"] == bench_session.bind.bench_size.users
+    benchmark.extra_info.update(stats)
+    benchmark.extra_info["telegram_requests"] = stub_server.requests.get("telegram", 0)
@@ -0,0 +1,38 @@
+"""Разбор страниц Хабра"""
+
+import asyncio
+
+import pytest
+
+from app.services.parser_service import HabrParser
+from benchmarks.synthetic import article_page_html, listing_html
+
+
+@pytest.mark.parametrize("articles", [20, 200, 2000], ids=["1x", "10x", "100x"])
+def bench_parse_articles_list(benchmark, articles):
+    """Список статей: 20 карточек — одна страница хаба"""
+    html = listing_html(articles)
+    parser = HabrParser()
+    loop = asyncio.new_event_loop()
+
+    result = benchmark(lambda: loop.run_until_complete(parser._parse_articles_list(html, articles)))
+
+    loop.close()
+    assert len(result) == articles
+
+
+def bench_get_article_content(benchmark, stub_server):
+    """Полный текст статьи: загрузка с заглушки и очистка разметки"""
+    loop = asyncio.new_event_loop()
+    parser = HabrParser()
+    parser.base_url = stub_server.habr_url
+    loop.run_until_complete(parser.open())
+    url = f"{stub_server.habr_url}/ru/articles/1/"
+
+    result = benchmark(lambda: loop.run_until_complete(parser.get_article_content(url)))
+
+    loop.run_until_complete(parser.close())
+    loop.close()
+    assert result
+    assert "реклама" not in result
+    assert len(article_page_html()) > len(result)
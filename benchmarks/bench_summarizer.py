@@ -0,0 +1,20 @@
+"""Локальная выжимка TextRank: статей в секунду"""
+
+import pytest
+
+from app.services.textrank import summarize
+from benchmarks.synthetic import article_content
+
+ARTICLES = 100
+
+
+@pytest.mark.parametrize("sentences", [4, 60, 300], ids=["teaser", "article", "longread"])
+def bench_textrank_summarize(benchmark, sentences):
+    """Выжимка из 100 статей: анонс из 4 предложений, статья из 60 и лонгрид из 300"""
+    contents = [article_content(sentences, seed=i) for i in range(ARTICLES)]
+
+    summaries = benchmark(lambda: [summarize(content, "Сервис и база") for content in contents])
+
+    assert all(summary.count(".") == min(sentences, 3) for summary in summaries)
+    if benchmark.stats:
+        benchmark.extra_info["articles_per_second"] = round(ARTICLES / benchmark.stats["mean"])
@@ -0,0 +1,60 @@
+"""Общие фикстуры замеров.
+
+База по умолчанию — SQLite в памяти, наполняется отдельно для каждого
+множителя из BENCH_SCALES (по умолчанию 1, 10 и 100). Для замеров на
+Postgres задайте BENCH_DATABASE_URL: таблицы будут созданы и удалены.
+Полный проход рассылки ограничен множителем BENCH_FULL_PASS_MAX_SCALE.
+"""
+
+import os
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.database.instrumentation import instrument_engine
+from app.database.models import Base
+from benchmarks.stubs import start_stub_server
+from benchmarks.synthetic import seed_database
+
+SCALES = [int(scale) for scale in os.environ.get("BENCH_SCALES", "1,10,100").split(",")]
+# Полный проход рассылки на 100× занимает десятки минут, по умолчанию не запускается
+FULL_PASS_MAX_SCALE = int(os.environ.get("BENCH_FULL_PASS_MAX_SCALE", "10"))
+
+
+def _create_engine():
+    url = os.environ.get("BENCH_DATABASE_URL")
+    if url:
+        return create_engine(url)
+    return create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+
+
+@pytest.fixture(scope="session", params=SCALES, ids=[f"{scale}x" for scale in SCALES])
+def bench_engine(request):
+    """Наполненная база для одного множителя"""
+    engine = instrument_engine(_create_engine())
+    Base.metadata.drop_all(bind=engine)
+    size = seed_database(engine, scale=request.param)
+    engine.bench_scale, engine.bench_size = request.param, size
+    yield engine
+    Base.metadata.drop_all(bind=engine)
+    engine.dispose()
+
+
+@pytest.fixture
+def bench_session(bench_engine):
+    """Сессия к наполненной базе"""
+    session = sessionmaker(bind=bench_engine, autoflush=False)()
+    yield session
+    session.close()
+
+
+@pytest.fixture(scope="session")
+def stub_server():
+    """Заглушка Хабра, YandexGPT и Telegram"""
+    server = start_stub_server()
+    yield server
+    server.stop()
@@ -0,0 +1,307 @@
+"""Синтетическая нагрузка на бота и API одной реплики.
+
+Виртуальные пользователи проходят сценарий бота: /start, выбор темы,
+завершение выбора, смена частоты и отписка. Апдейты собираются как
+настоящие Update и подаются в Application с обработчиками из
+setup_handlers через тот же процессор апдейтов, что и в боевом режиме,
+поэтому учитываются и ограничение параллельности, и порядок внутри чата.
+Ответы бота уходят в заглушку Telegram Bot API. Параллельно нагружаются
+ручки /api/database/*: в процессе или на живой реплике (--api-url).
+
+    python -m benchmarks.loadgen --users 200 --duration 30
+    python -m benchmarks.loadgen --database-url postgresql+psycopg://... --seed --scale 10
+
+В конце печатается задержка (p50/p95/p99) и пропускная способность по
+каждому виду запросов.
+"""
+
+import argparse
+import asyncio
+import itertools
+import random
+import statistics
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import UTC, datetime
+
+import httpx
+from fastapi import FastAPI
+from loguru import logger
+from sqlalchemy import create_engine, event, select
+from telegram import Update
+from telegram.ext import Application
+
+from app.bot.concurrency import ChatOrderedUpdateProcessor
+from app.bot.handlers import setup_handlers
+from app.core.config import settings
+from app.database.database import SessionLocal
+from app.database.models import Subscription, User
+from benchmarks.stubs import start_stub_server
+from benchmarks.synthetic import TOPICS, seed_database
+
+API_PATHS = (
+    "/api/database/statistics",
+    "/api/database/activity?days=7",
+    "/api/database/topics",
+    "/api/database/users?limit=50",
+    "/api/database/articles?limit=20",
+    "/api/database/logs?limit=20",
+)
+
+_update_ids = itertools.count(1)
+_message_ids = itertools.count(1)
+
+
+@dataclass
+class Recorder:
+    """Задержки и ошибки по видам запросов"""
+
+    samples: dict[str, list[float]] = field(default_factory=lambda: defaultdict(list))
+    errors: dict[str, int] = field(default_factory=lambda: defaultdict(int))
+
+    def observe(self, kind: str, seconds: float, ok: bool = True) -> None:
+        self.samples[kind].append(seconds)
+        if not ok:
+            self.errors[kind] += 1
+
+    def report(self, elapsed: float) -> str:
+        """Таблица: число запросов, ошибки, перцентили и пропускная способность"""
+        lines = [
+            f"{'kind':<34}{'count':>8}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}"
+            f"{'p99 ms':>10}{'rps':>10}"
+        ]
+        totals = defaultdict(list)
+        for kind in sorted(self.samples):
+            totals[kind.split(" ", 1)[0]].extend(self.samples[kind])
+            lines.append(self._row(kind, self.samples[kind], self.errors[kind], elapsed))
+        for group, samples in sorted(totals.items()):
+            errors = sum(n for kind, n in self.errors.items() if kind.startswith(group))
+            lines.append(self._row(f"{group} total", samples, errors, elapsed))
+        return "\n".join(lines)
+
+    @staticmethod
+    def _row(kind: str, samples: list[float], errors: int, elapsed: float) -> str:
+        ordered = sorted(samples)
+        quantiles = statistics.quantiles(ordered, n=100) if len(ordered) > 1 else ordered * 99
+        return (
+            f"{kind:<34}{len(ordered):>8}{errors:>8}{quantiles[49] * 1000:>10.1f}"
+            f"{quantiles[94] * 1000:>10.1f}{quantiles[98] * 1000:>10.1f}"
+            f"{len(ordered) / elapsed:>10.1f}"
+        )
+
+
+def _user_payload(telegram_id: int) -> dict:
+    return {
+        "id": telegram_id,
+        "is_bot": False,
+        "first_name": "Load",
+        "username": f"load{telegram_id}",
+    }
+
+
+def _message_payload(telegram_id: int, text: str) -> dict:
+    message = {
+        "message_id": next(_message_ids),
+        "date": int(datetime.now(UTC).timestamp()),
+        "chat": {"id": telegram_id, "type": "private"},
+        "from": _user_payload(telegram_id),
+        "text": text,
+    }
+    if text.startswith("/"):
+        message["entities"] = [{"type": "bot_command", "offset": 0, "length": len(text)}]
+    return message
+
+
+def command_update(bot, telegram_id: int, command: str) -> Update:
+    """Апдейт с командой от пользователя"""
+    payload = {"update_id": next(_update_ids), "message": _message_payload(telegram_id, command)}
+    return Update.de_json(payload, bot)
+
+
+def callback_update(bot, telegram_id: int, data: str) -> Update:
+    """Апдейт с нажатием inline-кнопки под сообщением бота"""
+    message = _message_payload(telegram_id, "меню")
+    message["from"] = {"id": 1, "is_bot": True, "first_name": "Bench"}
+    payload = {
+        "update_id": next(_update_ids),
+        "callback_query": {
+            "id": str(next(_update_ids)),
+            "from": _user_payload(telegram_id),
+            "chat_instance": str(telegram_id),
+            "message": message,
+            "data": data,
+        },
+    }
+    return Update.de_json(payload, bot)
+
+
+def _subscription_id(telegram_id: int, topic_id: int) -> int | None:
+    """Подписка, созданная сценарием (вне замера)"""
+    with SessionLocal() as db:
+        return db.scalar(
+            select(Subscription.id)
+            .join(User)
+            .where(User.telegram_id == telegram_id, Subscription.topic_id == topic_id)
+            .order_by(Subscription.id.desc())
+        )
+
+
+async def dispatch(application: Application, update: Update, kind: str, recorder: Recorder):
+    """Апдейт через процессор приложения; задержка — до конца обработки"""
+    started = time.perf_counter()
+    ok = True
+    try:
+        await application.update_processor.process_update(
+            update, application.process_update(update)
+        )
+    except Exception:
+        ok = False
+    recorder.observe(f"bot {kind}", time.perf_counter() - started, ok)
+
+
+async def bot_user(application: Application, telegram_id: int, deadline: float, recorder):
+    """Виртуальный пользователь: сценарий бота по кругу до дедлайна"""
+    rng = random.Random(telegram_id)
+    bot = application.bot
+    while time.perf_counter() < deadline:
+        topic_id = rng.randint(1, len(TOPICS))
+        await dispatch(application, command_update(bot, telegram_id, "/start"), "/start", recorder)
+        await dispatch(
+            application,
+            callback_update(bot, telegram_id, f"topic_select:{topic_id}"),
+            "topic_select",
+            recorder,
+        )
+        await dispatch(
+            application,
+            callback_update(bot, telegram_id, "finish_topic_selection"),
+            "finish_selection",
+            recorder,
+        )
+        subscription_id = await asyncio.to_thread(_subscription_id, telegram_id, topic_id)
+        if subscription_id:
+            await dispatch(
+                application,
+                callback_update(bot, telegram_id, f"set_freq_{subscription_id}_12"),
+                "set_freq",
+                recorder,
+            )
+            await dispatch(
+                application,
+                callback_update(bot, telegram_id, f"unsubscribe_{subscription_id}"),
+                "unsubscribe",
+                recorder,
+            )
+
+
+async def api_client(client: httpx.AsyncClient, deadline: float, recorder: Recorder, seed: int):
+    """Клиент API: случайные ручки статистики до дедлайна"""
+    rng = random.Random(seed)
+    while time.perf_counter() < deadline:
+        path = rng.choice(API_PATHS)
+        started = time.perf_counter()
+        try:
+            response = await client.get(path)
+            ok = response.status_code == 200
+        except httpx.HTTPError:
+            ok = False
+        recorder.observe(f"api {path.split('?')[0]}", time.perf_counter() - started, ok)
+
+
+def _api_transport(api_url: str | None) -> dict:
+    if api_url:
+        return {"base_url": api_url}
+    from app.api.routes import router
+
+    app = FastAPI()
+    app.include_router(router)
+    return {"base_url": "http://loadgen", "transport": httpx.ASGITransport(app=app)}
+
+
+def _configure_database(args) -> None:
+    """Подключение обработчиков к базе нагрузочного прогона"""
+    url = args.database_url
+    if not url:
+        url = f"sqlite:///{tempfile.mkdtemp()}/loadgen.db"
+        args.seed = True
+    engine = create_engine(url, pool_size=args.concurrency + args.api_clients)
+    if engine.dialect.name == "sqlite":
+
+        @event.listens_for(engine, "connect")
+        def _sqlite_wal(dbapi_connection, _record):
+            dbapi_connection.execute("PRAGMA journal_mode=WAL")
+            dbapi_connection.execute("PRAGMA busy_timeout=5000")
+
+    if args.seed:
+        print(f"Seeding {url} at {args.scale}x...")
+        seed_database(engine, scale=args.scale)
+    SessionLocal.configure(bind=engine)
+
+
+async def run(args, stub) -> None:
+    application = (
+        Application.builder()
+        .token("1:loadgen")
+        .base_url(stub.telegram_url)
+        .concurrent_updates(ChatOrderedUpdateProcessor(args.concurrency))
+        .build()
+    )
+    setup_handlers(application)
+    await application.initialize()
+
+    recorder = Recorder()
+    started = time.perf_counter()
+    deadline = started + args.duration
+    tasks = [bot_user(application, 90_000_000 + i, deadline, recorder) for i in range(args.users)]
+    async with httpx.AsyncClient(timeout=30, **_api_transport(args.api_url)) as client:
+        tasks += [api_client(client, deadline, recorder, i) for i in range(args.api_clients)]
+        await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - started
+
+    await application.shutdown()
+
+    print(
+        f"\n{args.users} bot users (max {args.concurrency} concurrent updates), "
+        f"{args.api_clients} API clients, {elapsed:.1f} s, "
+        f"Telegram API calls: {sum(stub.requests.values())}\n"
+    )
+    print(recorder.report(elapsed))
+
+
+def main() -> None:
+    argparser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    argparser.add_argument("--users", type=int, default=100, help="виртуальные пользователи бота")
+    argparser.add_argument("--api-clients", type=int, default=10, help="параллельные клиенты API")
+    argparser.add_argument("--duration", type=float, default=20.0, help="длительность, с")
+    argparser.add_argument(
+        "--concurrency",
+        type=int,
+        default=settings.bot_max_concurrent_updates,
+        help="параллельность обработки апдейтов",
+    )
+    argparser.add_argument(
+        "--telegram-latency", type=float, default=0.0, help="задержка ответа Telegram, с"
+    )
+    argparser.add_argument("--api-url", help="адрес живой реплики вместо API в процессе")
+    argparser.add_argument("--database-url", help="по умолчанию временная SQLite")
+    argparser.add_argument("--seed", action="store_true", help="наполнить базу перед прогоном")
+    argparser.add_argument("--scale", type=int, default=1, help="множитель объёма данных")
+    args = argparser.parse_args()
+
+    # Логи каждого апдейта искажают замер и забивают вывод
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+
+    _configure_database(args)
+    stub = start_stub_server(latency=args.telegram_latency)
+    try:
+        asyncio.run(run(args, stub))
+    finally:
+        stub.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""Локальные заглушки Хабра, YandexGPT и Telegram Bot API для замеров.
+
+Заглушка работает в фоновом потоке на свободном порту и отвечает мгновенно,
+так что замеры показывают работу нашего кода, а не сети.
+"""
+
+import asyncio
+import threading
+import time
+from dataclasses import dataclass, field
+
+from aiohttp import web
+
+from benchmarks.synthetic import article_page_html, listing_html
+
+COMPLETION = {
+    "result": {
+        "alternatives": [{"message": {"text": "Привет, тест"}}],
+        "usage": {"inputTextTokens": "120", "completionTokens": "30"},
+    }
+}
+
+
+@dataclass
+class StubServer:
+    """Запущенная заглушка и счётчики обращений к ней"""
+
+    base_url: str
+    loop: asyncio.AbstractEventLoop
+    runner: web.AppRunner
+    requests: dict[str, int] = field(default_factory=dict)
+
+    @property
+    def habr_url(self) -> str:
+        return f"{self.base_url}/habr"
+
+    @property
+    def completion_url(self) -> str:
+        return f"{self.base_url}/completion"
+
+    @property
+    def telegram_url(self) -> str:
+        return f"{self.base_url}/telegram/bot"
+
+    def stop(self) -> None:
+        """Остановка сервера и его loop"""
+        asyncio.run_coroutine_threadsafe(self.runner.cleanup(), self.loop).result(5)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+
+
+def start_stub_server(articles_per_page: int = 20, latency: float = 0.0) -> StubServer:
+    """Заглушка в фоновом потоке; latency добавляет задержку к каждому ответу"""
+    counters: dict[str, int] = {}
+    listing = listing_html(articles_per_page)
+    article = article_page_html()
+
+    def counted(name, handler):
+        async def wrapper(request):
+            counters[name] = counters.get(name, 0) + 1
+            if latency:
+                await asyncio.sleep(latency)
+            return await handler(request)
+
+        return wrapper
+
+    async def habr_listing(_request):
+        return web.Response(text=listing, content_type="text/html")
+
+    async def habr_article(_request):
+        return web.Response(text=article, content_type="text/html")
+
+    async def completion(_request):
+        return web.json_response(COMPLETION)
+
+    async def telegram_method(request):
+        if request.content_type == "application/json":
+            payload = await request.json()
+        else:
+            payload = await request.post()
+        chat_id = int(payload.get("chat_id", 0))
+        return web.json_response(
+            {
+                "ok": True,
+                "result": {
+                    "message_id": counters.get("telegram", 0),
+                    "date": int(time.time()),
+                    "chat": {"id": chat_id, "type": "private"},
+                    "text": payload.get("text", ""),
+                },
+            }
+        )
+
+    async def telegram_get_me(_request):
+        return web.json_response(
+            {
+                "ok": True,
+                "result": {"id": 1, "is_bot": True, "first_name": "Bench", "username": "bench_bot"},
+            }
+        )
+
+    app = web.Application()
+    app.router.add_get("/", counted("habr", habr_listing))
+    app.router.add_get("/habr", counted("habr", habr_listing))
+    app.router.add_get("/habr/ru/hub/{slug}/", counted("habr", habr_listing))
+    app.router.add_get("/habr/ru/articles/{habr_id}/", counted("habr", habr_article))
+    app.router.add_get("/completion", counted("completion", completion))
+    app.router.add_post("/completion", counted("completion", completion))
+    app.router.add_post("/telegram/bot{token}/getMe", telegram_get_me)
+    app.router.add_post("/telegram/bot{token}/{method}", counted("telegram", telegram_method))
+
+    loop = asyncio.new_event_loop()
+    runner = web.AppRunner(app)
+    loop.run_until_complete(runner.setup())
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    loop.run_until_complete(site.start())
+    port = runner.addresses[0][1]
+
+    threading.Thread(target=loop.run_forever, name="bench-stub", daemon=True).start()
+    return StubServer(f"http://127.0.0.1:{port}", loop, runner, counters)
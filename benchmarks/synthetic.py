@@ -0,0 +1,244 @@
+"""Синтетические данные для замеров: HTML Хабра и наполненная база.
+
+Размер базы задаётся множителем: 1× — 100 пользователей и 1 000 статей,
+10× и 100× — во столько же раз больше. Генератор детерминирован (seed),
+поэтому замеры на разных машинах и в разных коммитах сравнимы.
+
+Наполнить отдельную базу (например, Postgres для ручных замеров):
+
+    python -m benchmarks.synthetic --database-url postgresql+psycopg://... --scale 10
+"""
+
+import argparse
+import random
+from dataclasses import dataclass
+from datetime import UTC, datetime, timedelta
+
+from sqlalchemy import create_engine, insert, text
+from sqlalchemy.engine import Engine
+
+from app.database.models import Article, Base, SentArticle, Subscription, Topic, User
+
+TOPICS = [
+    ("Python", "python"),
+    ("JavaScript", "javascript"),
+    ("Машинное обучение", "machine_learning"),
+    ("DevOps", "devops"),
+    ("Информационная безопасность", "infosecurity"),
+    ("Go", "go"),
+    ("Базы данных", "databases"),
+    ("Алгоритмы", "algorithms"),
+    ("Программирование", "programming"),
+    ("Разработка веб-сайтов", "webdev"),
+]
+
+WORDS = [
+    "сервис",
+    "запрос",
+    "база",
+    "индекс",
+    "кэш",
+    "очередь",
+    "задача",
+    "поток",
+    "модель",
+    "данные",
+    "пользователь",
+    "ответ",
+    "сеть",
+    "память",
+    "диск",
+    "процесс",
+    "сборка",
+    "релиз",
+    "тест",
+    "метрика",
+    "задержка",
+    "нагрузка",
+]
+
+BASE_USERS = 100
+BASE_ARTICLES = 1000
+SUBSCRIPTIONS_PER_USER = 3
+SENT_PER_USER = 20
+
+
+def _sentence(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize() + "."
+
+
+def snippet_html(rng: random.Random, habr_id: int) -> str:
+    """Карточка статьи в разметке списка Хабра"""
+    hubs = rng.sample(TOPICS, 2)
+    hub_links = "".join(
+        f'<a class="tm-article-snippet__hubs-item-link" href="/ru/hub/{slug}/">'
+        f"<span>{name}</span></a>"
+        for name, slug in hubs
+    )
+    published = datetime(2024, 1, 1, tzinfo=UTC) + timedelta(minutes=habr_id)
+    body = " ".join(_sentence(rng, 12) for _ in range(4))
+    return f"""
+<article class="tm-article-snippet" id="{habr_id}">
+  <div class="tm-article-snippet__meta">
+    <a class="tm-user-info__username" href="/ru/users/author{habr_id % 97}/">author{habr_id % 97}</a>
+    <time datetime="{published.isoformat().replace("+00:00", "Z")}">сегодня</time>
+  </div>
+  <h2 class="tm-article-snippet__title">
+    <a href="/ru/articles/{habr_id}/"><span>{_sentence(rng, 6)}</span></a>
+  </h2>
+  <div class="tm-article-snippet__hubs">{hub_links}</div>
+  <div class="tm-article-snippet__content"><p>{body}</p></div>
+  <div class="tm-data-icons">
+    <span class="tm-votes-meter__value">+{rng.randint(0, 150)}</span>
+    <span class="tm-icon-counter__value">{rng.randint(1, 90)}.{rng.randint(0, 9)}K</span>
+  </div>
+</article>"""
+
+
+def article_content(sentences: int, words: int = 15, seed: int = 0) -> str:
+    """Текст статьи без разметки: sentences предложений по words слов"""
+    rng = random.Random(seed)
+    return " ".join(_sentence(rng, words) for _ in range(sentences))
+
+
+def listing_html(articles: int = 20, seed: int = 42) -> str:
+    """Страница списка статей Хабра с заданным числом карточек"""
+    rng = random.Random(seed)
+    cards = "".join(snippet_html(rng, 700000 + i) for i in range(articles))
+    return (
+        "<!DOCTYPE html><html lang='ru'><head><title>Хабр</title>"
+        "<script>window.__INITIAL_STATE__={}</script></head><body>"
+        f"<div class='tm-layout'><div class='tm-articles-list'>{cards}</div></div>"
+        "</body></html>"
+    )
+
+
+def article_page_html(paragraphs: int = 60, seed: int = 7) -> str:
+    """Страница отдельной статьи"""
+    rng = random.Random(seed)
+    body = "".join(f"<p>{_sentence(rng, 25)}</p>" for _ in range(paragraphs))
+    return (
+        "<html><body><div class='tm-article-body'>"
+        f"<script>track()</script>{body}<aside>реклама</aside>"
+        "</div></body></html>"
+    )
+
+
+@dataclass
+class DatasetSize:
+    """Объём синтетической базы"""
+
+    users: int
+    articles: int
+    subscriptions: int
+    sent: int
+
+
+def dataset_size(scale: int) -> DatasetSize:
+    """Объём базы для множителя scale"""
+    users = BASE_USERS * scale
+    return DatasetSize(
+        users=users,
+        articles=BASE_ARTICLES * scale,
+        subscriptions=users * SUBSCRIPTIONS_PER_USER,
+        sent=users * SENT_PER_USER,
+    )
+
+
+def seed_database(engine: Engine, scale: int = 1, seed: int = 42) -> DatasetSize:
+    """Создание таблиц и наполнение базы синтетическими данными"""
+    rng = random.Random(seed)
+    size = dataset_size(scale)
+    now = datetime.now(UTC)
+
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(
+            insert(Topic),
+            [
+                {"id": i, "name": name, "slug": slug, "hub_slug": slug, "is_active": True}
+                for i, (name, slug) in enumerate(TOPICS, 1)
+            ],
+        )
+        conn.execute(
+            insert(User),
+            [
+                {"id": i, "telegram_id": 10_000_000 + i, "username": f"user{i}", "is_active": True}
+                for i in range(1, size.users + 1)
+            ],
+        )
+        conn.execute(
+            insert(Subscription),
+            [
+                {
+                    "user_id": user_id,
+                    "topic_id": topic_id,
+                    "frequency_hours": 24,
+                    "is_active": True,
+                }
+                for user_id in range(1, size.users + 1)
+                for topic_id in rng.sample(range(1, len(TOPICS) + 1), SUBSCRIPTIONS_PER_USER)
+            ],
+        )
+        conn.execute(
+            insert(Article),
+            [
+                {
+                    "id": i,
+                    "habr_id": str(100000 + i),
+                    "title": _sentence(rng, 6),
+                    "url": f"https://habr.com/ru/articles/{100000 + i}/",
+                    "author": f"author{i % 97}",
+                    "published_at": now - timedelta(minutes=i),
+                    "created_at": now - timedelta(minutes=i),
+                    "content": " ".join(_sentence(rng, 12) for _ in range(8)),
+                    "summary": _sentence(rng, 15) if i % 2 else None,
+                    "topics": [name for name, _ in rng.sample(TOPICS, 2)],
+                    "is_processed": bool(i % 2),
+                    "rating": rng.randint(-5, 150),
+                    "views": rng.randint(100, 90_000),
+                }
+                for i in range(1, size.articles + 1)
+            ],
+        )
+        conn.execute(
+            insert(SentArticle),
+            [
+                {
+                    "user_id": user_id,
+                    "article_id": article_id,
+                    "sent_at": now - timedelta(hours=rng.randint(1, 24 * 30)),
+                }
+                for user_id in range(1, size.users + 1)
+                for article_id in rng.sample(range(1, size.articles + 1), SENT_PER_USER)
+            ],
+        )
+
+    if engine.dialect.name == "postgresql":
+        # Идентификаторы заданы явно, последовательности нужно догнать
+        with engine.begin() as conn:
+            for table in Base.metadata.sorted_tables:
+                if "id" not in table.columns:
+                    continue
+                conn.execute(
+                    text(
+                        f"SELECT setval(pg_get_serial_sequence('{table.name}', 'id'), "
+                        f"coalesce(max(id), 1)) FROM {table.name}"
+                    )
+                )
+    return size
+
+
+def main() -> None:
+    argparser = argparse.ArgumentParser(description="Наполнение базы синтетическими данными")
+    argparser.add_argument("--database-url", required=True)
+    argparser.add_argument("--scale", type=int, default=1)
+    argparser.add_argument("--seed", type=int, default=42)
+    args = argparser.parse_args()
+
+    size = seed_database(create_engine(args.database_url), args.scale, args.seed)
+    print(f"Seeded: {size}")
+
+
+if __name__ == "__main__":
+    main()
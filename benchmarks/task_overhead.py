@@ -0,0 +1,82 @@
+"""Накладные расходы на запуск асинхронной части задачи Celery.
+
+Сравниваются два способа: asyncio.run с новыми HTTP-сессиями на каждую
+задачу (как было) и постоянный loop воркера с общими сессиями
+(celery_app.runtime). Хабр и YandexGPT заменены локальной заглушкой,
+поэтому замер показывает именно накладные расходы, а не сеть.
+
+    python -m benchmarks.task_overhead --iterations 200
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+from app.services.parser_service import HabrParser
+from app.services.yandex_service import yandex_service
+from benchmarks.stubs import start_stub_server
+from celery_app.runtime import runtime
+
+
+async def task_body(parser: HabrParser) -> None:
+    """Типичная работа короткой задачи: одна страница Хабра и один вызов модели"""
+    await parser.get_latest_articles(max_articles=5)
+    await yandex_service.test_connection()
+
+
+def run_per_task(base_url: str) -> None:
+    """Как было: свой loop и свои сессии на каждую задачу"""
+
+    async def body():
+        async with HabrParser() as parser:
+            parser.base_url = base_url
+            await task_body(parser)
+
+    asyncio.run(body())
+
+
+def run_with_runtime(base_url: str) -> None:
+    """Постоянный loop воркера и общие сессии"""
+
+    async def body():
+        parser = await runtime.get_parser()
+        parser.base_url = base_url
+        await task_body(parser)
+
+    runtime.run(body())
+
+
+def measure(name: str, func, base_url: str, iterations: int) -> None:
+    """Прогон и вывод сводки по длительности одной задачи"""
+    func(base_url)  # прогрев
+    durations = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        func(base_url)
+        durations.append((time.perf_counter() - started) * 1000)
+
+    durations.sort()
+    p95 = durations[int(len(durations) * 0.95) - 1]
+    print(
+        f"{name:<12} mean {statistics.mean(durations):7.2f} ms  "
+        f"p50 {statistics.median(durations):7.2f} ms  p95 {p95:7.2f} ms"
+    )
+
+
+def main() -> None:
+    argparser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    argparser.add_argument("--iterations", type=int, default=200)
+    args = argparser.parse_args()
+
+    stub = start_stub_server()
+    base_url = stub.base_url
+    yandex_service.base_url = stub.completion_url
+
+    measure("asyncio.run", run_per_task, base_url, args.iterations)
+    measure("runtime", run_with_runtime, base_url, args.iterations)
+    runtime.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,5 @@
 from celery import Celery
+from celery.schedules import crontab
 
 from app.core.config import settings
 
@@ -6,7 +7,7 @@ celery_app = Celery(
     "habrdigest",
     broker=settings.celery_broker_url,
     backend=settings.celery_result_backend,
-    include=["celery_app.tasks"],
+    include=["celery_app.tasks", "celery_app.monitoring"],
 )
 
 celery_app.conf.update(
@@ -20,6 +21,14 @@ celery_app.conf.update(
     task_soft_time_limit=25 * 60,  # 25 минут
     worker_prefetch_multiplier=1,
     worker_max_tasks_per_child=1000,
+    # Приоритеты задач на Redis: этапы конвейера по темам с подписчиками идут первыми
+    broker_transport_options={
+        "priority_steps": list(range(10)),
+        "queue_order_strategy": "priority",
+    },
+    task_routes={
+        "celery_app.tasks.crawl_topics": {"queue": settings.crawl_queue},
+    },
 )
 
 celery_app.conf.beat_schedule = {
@@ -33,6 +42,26 @@ celery_app.conf.beat_schedule = {
     },
     "process-articles": {
         "task": "celery_app.tasks.process_unprocessed_articles",
-        "schedule": 1800,  # Каждые 30 минут
+        "schedule": 1800,  # Каждые 30 минут, подметальщик конвейера статей
+    },
+    "pipeline-metrics": {
+        "task": "celery_app.tasks.refresh_pipeline_metrics",
+        "schedule": settings.pipeline_metrics_interval_seconds,
+    },
+    "summarize-backlog": {
+        "task": "celery_app.tasks.summarize_backlog",
+        "schedule": crontab(minute=0, hour=settings.yandex_batch_hour),  # Раз в сутки ночью
+    },
+    "cleanup-old-data": {
+        "task": "celery_app.tasks.cleanup_old_data",
+        "schedule": settings.cleanup_interval_hours * 3600,
+    },
+    "refresh-hub-directory": {
+        "task": "celery_app.tasks.refresh_hub_directory",
+        "schedule": settings.hub_directory_refresh_hours * 3600,
+    },
+    "maintain-partitions": {
+        "task": "celery_app.tasks.maintain_partitions",
+        "schedule": 6 * 3600,  # Каждые 6 часов
     },
 }
@@ -0,0 +1,78 @@
+"""Метрики и профилирование воркеров Celery.
+
+Воркер работает несколькими процессами пула, поэтому метрики собираются
+одним из двух способов:
+
+* METRICS_WORKER_PORT и PROMETHEUS_MULTIPROC_DIR — процессы пула пишут
+  значения в общий каталог, главный процесс воркера отдаёт их по HTTP
+  через MultiProcessCollector;
+* METRICS_PUSHGATEWAY_URL — после каждой задачи метрики процесса
+  отправляются в Pushgateway.
+
+Задачи из PROFILING_TASKS профилируются между task_prerun и task_postrun
+(см. app/core/profiling.py), там же открывается область учёта SQL-запросов
+задачи (см. app/database/instrumentation.py).
+"""
+
+import os
+import socket
+import time
+from contextvars import Token
+
+from celery.signals import task_postrun, task_prerun, worker_init, worker_process_shutdown
+from loguru import logger
+from prometheus_client import multiprocess, push_to_gateway, start_http_server
+
+from app.core.config import settings
+from app.core.metrics import REGISTRY, TASK_RESULTS, TASK_SECONDS, collector_registry
+from app.core.profiling import task_profiles
+from app.database.instrumentation import begin_query_scope, end_query_scope
+
+_task_started: dict[str, float] = {}
+_task_query_scopes: dict[str, Token] = {}
+
+
+@worker_init.connect
+def _start_metrics_server(**_kwargs):
+    """HTTP-экспортёр метрик в главном процессе воркера"""
+    if not settings.metrics_worker_port:
+        return
+    start_http_server(settings.metrics_worker_port, registry=collector_registry())
+    logger.info(f"Worker metrics exported on port {settings.metrics_worker_port}")
+
+
+@task_prerun.connect
+def _task_started_at(task_id=None, task=None, **_kwargs):
+    _task_started[task_id] = time.perf_counter()
+    _task_query_scopes[task_id] = begin_query_scope("task", task.name)
+    task_profiles.start(task_id, task.name)
+
+
+@task_postrun.connect
+def _task_finished(task_id=None, task=None, state=None, **_kwargs):
+    task_profiles.stop(task_id)
+    scope = _task_query_scopes.pop(task_id, None)
+    if scope is not None:
+        end_query_scope(scope)
+    started = _task_started.pop(task_id, None)
+    if started is not None:
+        TASK_SECONDS.labels(task.name).observe(time.perf_counter() - started)
+    TASK_RESULTS.labels(task.name, state or "UNKNOWN").inc()
+
+    if settings.metrics_pushgateway_url:
+        try:
+            push_to_gateway(
+                settings.metrics_pushgateway_url,
+                job="habrdigest_celery",
+                grouping_key={"instance": f"{socket.gethostname()}:{os.getpid()}"},
+                registry=REGISTRY,
+            )
+        except OSError:
+            logger.exception("Error pushing metrics to Pushgateway")
+
+
+@worker_process_shutdown.connect
+def _mark_process_dead(pid=None, **_kwargs):
+    """Очистка файлов метрик завершившегося процесса пула"""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        multiprocess.mark_process_dead(pid or os.getpid())
@@ -0,0 +1,121 @@
+"""Постоянный event loop процесса-воркера Celery.
+
+Раньше каждая задача вызывала asyncio.run: новый loop, новая сессия aiohttp
+к Хабру, новый клиент httpx к YandexGPT, и всё это закрывалось в конце
+задачи. Здесь loop один на процесс воркера и живёт в отдельном потоке,
+а HTTP-сессии и пул асинхронного движка БД открываются один раз и
+переиспользуются всеми задачами процесса.
+"""
+
+import asyncio
+import threading
+from collections.abc import Coroutine
+from typing import Any, TypeVar
+
+from celery.signals import worker_process_init, worker_process_shutdown, worker_shutdown
+from loguru import logger
+
+from app.database.database import async_engine, engine
+from app.services.llm_router import summary_router
+from app.services.parser_service import HabrParser
+
+T = TypeVar("T")
+
+
+class AsyncRuntime:
+    """Event loop в фоновом потоке и разделяемые асинхронные ресурсы"""
+
+    def __init__(self):
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+        self._parser: HabrParser | None = None
+
+    def start(self) -> None:
+        """Запуск loop, если он ещё не запущен"""
+        with self._lock:
+            if self._loop is not None:
+                return
+
+            loop = asyncio.new_event_loop()
+            thread = threading.Thread(
+                target=loop.run_forever, name="celery-async-runtime", daemon=True
+            )
+            thread.start()
+            self._loop, self._thread = loop, thread
+            asyncio.run_coroutine_threadsafe(summary_router.open(), loop).result(10)
+            logger.info("Async runtime started")
+
+    def run(self, coro: Coroutine[Any, Any, T], timeout: float | None = None) -> T:
+        """Выполнение корутины в loop воркера с ожиданием результата.
+
+        Если ожидание прервано (например, мягким лимитом времени Celery),
+        корутина отменяется, а не продолжает работать в фоне.
+        """
+        if self._loop is None:
+            self.start()
+
+        future = asyncio.run_coroutine_threadsafe(coro, self._loop)
+        try:
+            return future.result(timeout)
+        except BaseException:
+            future.cancel()
+            raise
+
+    async def get_parser(self) -> HabrParser:
+        """Парсер Хабра с открытой сессией, общий для всех задач процесса"""
+        if self._parser is None:
+            self._parser = HabrParser()
+        await self._parser.open()
+        return self._parser
+
+    async def _close_resources(self) -> None:
+        """Закрытие HTTP-сессий и пула асинхронного движка"""
+        if self._parser is not None:
+            await self._parser.close()
+            self._parser = None
+        await summary_router.close()
+        await async_engine.dispose()
+
+    def stop(self) -> None:
+        """Закрытие ресурсов и остановка loop"""
+        with self._lock:
+            loop, thread = self._loop, self._thread
+            if loop is None:
+                return
+
+            if loop.is_running():
+                try:
+                    asyncio.run_coroutine_threadsafe(self._close_resources(), loop).result(10)
+                except (OSError, RuntimeError, TimeoutError):
+                    logger.exception("Error closing async runtime resources")
+                loop.call_soon_threadsafe(loop.stop)
+                thread.join(timeout=10)
+
+            loop.close()
+            self._loop, self._thread = None, None
+            logger.info("Async runtime stopped")
+
+    def reset_after_fork(self) -> None:
+        """Сброс унаследованного от родителя состояния в дочернем процессе"""
+        self._loop, self._thread, self._parser = None, None, None
+        self._lock = threading.Lock()
+
+
+runtime = AsyncRuntime()
+
+
+@worker_process_init.connect
+def _init_worker_process(**_kwargs):
+    """Инициализация процесса пула: свой loop и свои соединения с БД"""
+    runtime.reset_after_fork()
+    # Соединения пула, открытые родителем до fork, нельзя использовать в потомке
+    engine.dispose(close=False)
+    runtime.start()
+
+
+@worker_process_shutdown.connect
+@worker_shutdown.connect
+def _shutdown_worker_process(**_kwargs):
+    """Аккуратное закрытие соединений при остановке процесса пула"""
+    runtime.stop()
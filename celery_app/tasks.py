@@ -1,17 +1,35 @@
-import asyncio
 from datetime import UTC, datetime, timedelta
 
+from celery import chord
+from celery.exceptions import SoftTimeLimitExceeded
 from loguru import logger
+from sqlalchemy import or_
 from sqlalchemy.orm import Session
 
-from app.database.database import SessionLocal
+from app.core.config import settings
+from app.core.locks import current_lease, exclusive, release_token
+from app.core.tracing import STAGES, span
+from app.database import partitions
+from app.database.database import SessionLocal, engine
 from app.database.models import Article, ParsingLog, SentArticle, Subscription, Topic
-from app.services.parser_service import ArticleService, HabrParser
-from app.services.yandex_service import yandex_service
+from app.services import pipeline
+from app.services.database_service import DatabaseService, summary_due
+from app.services.hub_directory import apply_to_topics, hub_directory
+from app.services.llm_router import SummaryUnavailableError, summary_router
+from app.services.parser_service import ArticleService, HabrFetchError
+from app.services.semantic import semantic_index
+from app.services.yandex_service import YandexCircuitOpenError, yandex_service
 from celery_app.celery_app import celery_app
+from celery_app.runtime import runtime
+
+PARSING_LEASE = "parse-habr-articles"
+
+# Ответы, после которых хаб считается несуществующим
+DEAD_HUB_STATUSES = (404, 410)
 
 
 @celery_app.task
+@exclusive(PARSING_LEASE)
 def parse_habr_articles():
     """Задача для парсинга новых статей с Хабра"""
     try:
@@ -22,41 +40,39 @@ def parse_habr_articles():
 
         logger.info("Starting Habr articles parsing...")
 
-        topics = db.query(Topic).filter(Topic.is_active).all()
+        topics, parsing_log.requests_saved = _due_topics(db)
+        db.commit()
 
         if not topics:
-            logger.warning("No active topics found")
+            logger.warning("No topics to crawl")
+            parsing_log.finished_at = datetime.now(UTC)
+            parsing_log.status = "completed"
+            db.commit()
             return
 
-        article_service = ArticleService(db)
+        with span("parse_habr_articles", parsing_log_id=parsing_log.id) as trace:
+            if settings.parsing_fanout:
+                _start_fanout_parsing(parsing_log.id, topics, trace.traceparent)
+                return
+
+            article_service = ArticleService(db)
 
-        async def parse_topic_articles() -> int:
-            parsed = 0
-            async with HabrParser() as parser:
+            async def parse_topic_articles() -> int:
+                parsed = 0
                 for topic in topics:
                     try:
-                        logger.info(f"Parsing articles for topic: {topic.name}")
-                        articles = await parser.get_articles_by_topic(topic.slug, max_articles=20)
-
-                        for article_data in articles:
-                            if not article_data.get("topics"):
-                                article_data["topics"] = []
-                            article_data["topics"].append(topic.name)
-
-                            saved_article = await article_service.save_article(article_data)
-                            if saved_article:
-                                parsed += 1
-
+                        parsed += await _crawl_topic(topic, article_service)
                     except Exception:
                         logger.exception(f"Error parsing topic {topic.name}")
                         continue
-            return parsed
+                return parsed
 
-        total_articles = asyncio.run(parse_topic_articles())
+            total_articles = runtime.run(parse_topic_articles())
 
         parsing_log.finished_at = datetime.now(UTC)
         parsing_log.articles_found = total_articles
         parsing_log.status = "completed"
+        _store_stage_seconds(parsing_log, trace.stage_seconds())
         db.commit()
 
         logger.info(f"Parsing completed. Found {total_articles} new articles")
@@ -73,13 +89,249 @@ def parse_habr_articles():
             db.close()
 
 
+def _due_topics(db: Session) -> tuple[list[Topic], int]:
+    """Темы, чьи хабы пора обойти, и число активных тем, запросы к которым не нужны"""
+    active = db.query(Topic).filter(Topic.is_active)
+    topics = active.filter(
+        Topic.hub_slug.isnot(None),
+        or_(Topic.next_crawl_at.is_(None), Topic.next_crawl_at <= datetime.now(UTC)),
+    ).all()
+    requests_saved = active.count() - len(topics)
+    if requests_saved:
+        logger.info(f"Skipping {requests_saved} topics without a live hub")
+    return topics, requests_saved
+
+
+async def _crawl_topic(
+    topic: Topic, article_service: ArticleService, raise_errors: bool = False
+) -> int:
+    """Загрузка и сохранение статей одной темы"""
+    parser = await runtime.get_parser()
+    db_service = DatabaseService(article_service.db)
+
+    with span("crawl.topic", topic=topic.hub_slug) as topic_span:
+        logger.info(f"Parsing articles for topic: {topic.name}")
+        try:
+            articles = await parser.get_articles_by_topic(
+                topic.hub_slug, max_articles=20, raise_errors=True
+            )
+        except HabrFetchError as e:
+            if e.status in DEAD_HUB_STATUSES:
+                db_service.record_hub_crawl(topic, found=False)
+                logger.warning(
+                    f"Hub {topic.hub_slug} of topic {topic.name} not found, "
+                    f"next crawl after {topic.next_crawl_at}"
+                )
+                return 0
+            if raise_errors:
+                raise
+            return 0
+        db_service.record_hub_crawl(topic, found=True)
+
+        parsed = 0
+        ingested: list[Article] = []
+        for article_data in articles:
+            if not article_data.get("topics"):
+                article_data["topics"] = []
+            article_data["topics"].append(topic.name)
+
+            saved_article, created = await article_service.get_or_create_article(article_data)
+            if saved_article:
+                parsed += 1
+                # Статья, уже встреченная в другом хабе, в очереди на загрузку текста
+                if created and saved_article.status == pipeline.INGESTED:
+                    ingested.append(saved_article)
+
+        if settings.pipeline_enabled and ingested:
+            subscribed = db_service.get_subscribed_topic_names()
+            for article in ingested:
+                _enqueue_stage(fetch_article_body, article, subscribed)
+
+        topic_span.set_attribute("articles_saved", parsed)
+    return parsed
+
+
+def _subscribed_topics(db_service: DatabaseService) -> set[str] | None:
+    """Темы с подписчиками; None, если статьи без подписчиков резюмируются как обычно"""
+    if not settings.summary_low_priority_local:
+        return None
+    return db_service.get_subscribed_topic_names()
+
+
+def _low_priority(article: Article, subscribed: set[str] | None) -> bool:
+    """Статья ни по одной теме с подписчиками: резюме можно сделать локально"""
+    return subscribed is not None and not subscribed.intersection(article.topics or [])
+
+
+def _enqueue_stage(task, article: Article, subscribed: set[str]) -> None:
+    """Постановка следующего этапа конвейера в очередь с приоритетом по подпискам"""
+    task.apply_async((article.id,), priority=pipeline.priority(article, subscribed))
+
+
+def _release_abandoned_claims(db: Session) -> None:
+    """Снятие захвата резюме, брошенного упавшим воркером: статья снова ждёт в fetched"""
+    abandoned = pipeline.stalled(db, pipeline.SUMMARIZING)
+    for article in abandoned:
+        pipeline.release(article)
+    db.commit()
+    if abandoned:
+        logger.warning(f"Released {len(abandoned)} abandoned summary claims")
+
+
+def _sweep_pipeline(db: Session) -> None:
+    """Перезапуск статей, застрявших между этапами, например из-за потерянной задачи"""
+    subscribed = DatabaseService(db).get_subscribed_topic_names()
+    for status, task in (
+        (pipeline.INGESTED, fetch_article_body),
+        (pipeline.SUMMARIZED, publish_article),
+    ):
+        articles = pipeline.stalled(db, status)
+        for article in articles:
+            _enqueue_stage(task, article, subscribed)
+        if articles:
+            logger.warning(f"Requeued {len(articles)} articles stalled in {status}")
+
+
+def _store_stage_seconds(parsing_log: ParsingLog, stage_seconds: dict[str, float]) -> None:
+    """Запись времени этапов из трассы в колонки лога"""
+    for stage, seconds in stage_seconds.items():
+        setattr(parsing_log, f"{stage}_seconds", seconds)
+
+
+def _start_fanout_parsing(log_id: int, topics: list[Topic], traceparent: str | None) -> None:
+    """Веерный парсинг: подзадача на каждую пачку тем и сводка через chord"""
+    batch_size = max(1, settings.parsing_fanout_batch_size)
+    topic_ids = [topic.id for topic in topics]
+    batches = [topic_ids[i : i + batch_size] for i in range(0, len(topic_ids), batch_size)]
+
+    # Аренда парсинга переходит к подзадачам и снимается в finalize_parsing
+    lease = current_lease.get()
+    lease_token = lease.token if lease else None
+
+    chord(crawl_topics.s(log_id, batch, traceparent=traceparent) for batch in batches)(
+        finalize_parsing.s(log_id, lease_token)
+    )
+    if lease:
+        lease.hand_off(settings.parsing_fanout_lease_seconds)
+
+    logger.info(f"Queued {len(batches)} crawl subtasks for {len(topic_ids)} topics")
+
+
+@celery_app.task(
+    bind=True,
+    max_retries=settings.parsing_topic_max_retries,
+    soft_time_limit=4 * 60,
+    time_limit=5 * 60,
+)
+def crawl_topics(
+    self,
+    log_id: int,
+    topic_ids: list[int],
+    found: int = 0,
+    traceparent: str | None = None,
+    stage_seconds: dict[str, float] | None = None,
+) -> dict:
+    """Подзадача веерного парсинга: статьи по пачке тем.
+
+    Повторно ставится в очередь только с темами, которые не удалось
+    загрузить; уже найденные статьи и время этапов переносятся в повтор
+    через found и stage_seconds.
+    """
+    db = SessionLocal()
+    try:
+        topics = db.query(Topic).filter(Topic.id.in_(topic_ids)).all()
+        article_service = ArticleService(db)
+        failed: list[Topic] = []
+
+        with span(
+            "crawl_topics",
+            traceparent=traceparent,
+            parsing_log_id=log_id,
+            attempt=self.request.retries,
+        ) as trace:
+            for index, topic in enumerate(topics):
+                try:
+                    found += runtime.run(_crawl_topic(topic, article_service, raise_errors=True))
+                except HabrFetchError:
+                    logger.warning(f"Crawl of topic {topic.name} failed (parsing log {log_id})")
+                    failed.append(topic)
+                except SoftTimeLimitExceeded:
+                    logger.warning(f"Crawl subtask for parsing log {log_id} hit its time limit")
+                    failed.extend(topics[index:])
+                    break
+                except Exception:
+                    # Ошибка разбора повторится и при повторе, поэтому тему не повторяем
+                    logger.exception(f"Error parsing topic {topic.name}")
+
+        stage_seconds = {
+            stage: round((stage_seconds or {}).get(stage, 0.0) + seconds, 3)
+            for stage, seconds in trace.stage_seconds().items()
+        }
+
+        if failed and self.request.retries < self.max_retries:
+            raise self.retry(
+                args=(log_id, [topic.id for topic in failed]),
+                kwargs={"found": found, "traceparent": traceparent, "stage_seconds": stage_seconds},
+                countdown=settings.parsing_topic_retry_delay_seconds * 2**self.request.retries,
+            )
+
+        return {
+            "found": found,
+            "failed_topics": [topic.name for topic in failed],
+            "stage_seconds": stage_seconds,
+        }
+    finally:
+        db.close()
+
+
+@celery_app.task
+def finalize_parsing(results: list[dict], log_id: int, lease_token: str | None = None):
+    """Callback chord: сводка подзадач веерного парсинга в ParsingLog"""
+    try:
+        total_articles = sum(result["found"] for result in results)
+        failed_topics = [name for result in results for name in result["failed_topics"]]
+        stage_seconds = {
+            stage: round(
+                sum(result.get("stage_seconds", {}).get(stage, 0.0) for result in results), 3
+            )
+            for stage in STAGES
+        }
+
+        with DatabaseService() as db_service:
+            db_service.update_parsing_log(
+                log_id,
+                finished_at=datetime.now(UTC),
+                articles_found=total_articles,
+                errors=f"Failed topics: {', '.join(failed_topics)}" if failed_topics else None,
+                status="failed" if failed_topics and not total_articles else "completed",
+                stage_seconds=stage_seconds,
+            )
+
+        logger.info(
+            f"Fan-out parsing completed. Found {total_articles} new articles, "
+            f"{len(failed_topics)} topics failed"
+        )
+
+    except Exception:
+        logger.exception("Error in finalize_parsing task")
+    finally:
+        if lease_token:
+            release_token(PARSING_LEASE, lease_token)
+
+
 @celery_app.task
+@exclusive("process-articles")
 def process_unprocessed_articles():
     """Задача для обработки необработанных статей (генерация резюме)"""
     try:
         db = SessionLocal()
         article_service = ArticleService(db)
 
+        # Захват резюме берут и подметальщики, поэтому он снимается и без конвейера
+        _release_abandoned_claims(db)
+        if settings.pipeline_enabled:
+            _sweep_pipeline(db)
+
         unprocessed_articles = article_service.get_unprocessed_articles(limit=10)
 
         if not unprocessed_articles:
@@ -88,25 +340,51 @@ def process_unprocessed_articles():
 
         logger.info(f"Processing {len(unprocessed_articles)} articles...")
 
-        async def process_articles():
+        processing_log = ParsingLog(task="process_unprocessed_articles")
+        db.add(processing_log)
+        db.commit()
+
+        db_service = DatabaseService(db)
+        subscribed = _subscribed_topics(db_service)
+        summarized: list[Article] = []
+
+        async def process_articles() -> int:
+            processed = 0
             for article in unprocessed_articles:
+                # Статью могла уже захватить задача этапа summarize_article
+                if not article.content or not pipeline.claim(db, article):
+                    continue
                 try:
-                    if article.content:
-                        summary = await yandex_service.generate_summary(
-                            content=article.content, title=article.title
+                    with span("summarize.article", article_id=article.id):
+                        routed = await summary_router.summarize(
+                            article.content,
+                            article.title,
+                            low_priority=_low_priority(article, subscribed),
                         )
-
-                        article.summary = summary
-                        article.is_processed = True
-                        db.commit()
-
-                        logger.info(f"Generated summary for article: {article.title}")
-
-                except Exception:
-                    logger.exception(f"Error processing article {article.id}")
+                except SummaryUnavailableError as e:
+                    db_service.record_summary_failure(article, str(e))
                     continue
 
-        asyncio.run(process_articles())
+                with span("db.save_summary", stage="db"):
+                    db_service.save_summary(
+                        article, routed.text, routed.provider, routed.retry_reason
+                    )
+                if routed.provisional:
+                    continue
+                processed += 1
+                summarized.append(article)
+                logger.info(f"Generated summary for article {article.title} with {routed.provider}")
+            return processed
+
+        with span("process_unprocessed_articles", parsing_log_id=processing_log.id) as trace:
+            processed = runtime.run(process_articles())
+        _publish(db_service, summarized)
+
+        processing_log.finished_at = datetime.now(UTC)
+        processing_log.articles_processed = processed
+        processing_log.status = "completed"
+        _store_stage_seconds(processing_log, trace.stage_seconds())
+        db.commit()
 
         logger.info("Article processing completed")
 
@@ -117,7 +395,206 @@ def process_unprocessed_articles():
             db.close()
 
 
+@celery_app.task(
+    soft_time_limit=settings.yandex_batch_timeout_seconds + 300,
+    time_limit=settings.yandex_batch_timeout_seconds + 600,
+)
+@exclusive("process-articles")
+def summarize_backlog():
+    """Задача для пакетной генерации резюме накопившихся статей через отложенный режим"""
+    try:
+        db = SessionLocal()
+        article_service = ArticleService(db)
+
+        articles = [
+            article
+            for article in article_service.get_unprocessed_articles(
+                limit=settings.yandex_batch_size
+            )
+            if article.content and pipeline.claim(db, article)
+        ]
+        if not articles:
+            logger.info("No unprocessed articles found")
+            return
+
+        logger.info(f"Summarizing {len(articles)} articles in batch mode...")
+
+        processing_log = ParsingLog(task="summarize_backlog")
+        db.add(processing_log)
+        db.commit()
+
+        db_service = DatabaseService(db)
+        subscribed = _subscribed_topics(db_service)
+        # Короткие и никому не нужные сейчас статьи резюмируются локально, без модели
+        local = [
+            article
+            for article in articles
+            if summary_router.prefers_local(article.content, _low_priority(article, subscribed))
+        ]
+        remote = [article for article in articles if article not in local]
+
+        with span("summarize_backlog", parsing_log_id=processing_log.id) as trace:
+            for article in local:
+                routed = runtime.run(
+                    summary_router.summarize(article.content, article.title, low_priority=True)
+                )
+                db_service.save_summary(article, routed.text, routed.provider)
+
+            summaries, errors = {}, {}
+            if remote:
+                summaries, errors = runtime.run(
+                    yandex_service.generate_summaries_batch(
+                        [(article.id, article.title, article.content) for article in remote]
+                    )
+                )
+
+            with span("db.save_summary", stage="db"):
+                for article in remote:
+                    if article.id in summaries:
+                        db_service.save_summary(
+                            article, summaries[article.id], yandex_service.model
+                        )
+                    elif isinstance(errors.get(article.id), YandexCircuitOpenError):
+                        pipeline.release(article)
+                    else:
+                        db_service.record_summary_failure(
+                            article, str(errors.get(article.id, "no result"))
+                        )
+                db.commit()
+        _publish(db_service, local + [article for article in remote if article.id in summaries])
+
+        processing_log.finished_at = datetime.now(UTC)
+        processing_log.articles_processed = len(local) + len(summaries)
+        processing_log.status = "completed"
+        _store_stage_seconds(processing_log, trace.stage_seconds())
+        db.commit()
+
+        logger.info(
+            f"Batch summarization completed: {len(summaries)}/{len(remote)} articles by the model, "
+            f"{len(local)} locally"
+        )
+
+    except Exception:
+        logger.exception("Error in summarize_backlog task")
+    finally:
+        if "db" in locals():
+            db.close()
+
+
+def _publish(db_service: DatabaseService, articles: list[Article]) -> None:
+    """Передача статей с резюме, сделанным подметальщиком, на этап рассылки"""
+    if not settings.pipeline_enabled or not articles:
+        return
+    subscribed = db_service.get_subscribed_topic_names()
+    for article in articles:
+        _enqueue_stage(publish_article, article, subscribed)
+
+
+@celery_app.task
+def fetch_article_body(article_id: int):
+    """Этап конвейера: загрузка полного текста статьи, затем резюме"""
+    try:
+        db = SessionLocal()
+        article = db.get(Article, article_id)
+        if article is None or article.status != pipeline.INGESTED:
+            return
+
+        if settings.pipeline_fetch_body:
+
+            async def fetch() -> str | None:
+                parser = await runtime.get_parser()
+                return await parser.get_article_content(article.url)
+
+            with span("pipeline.fetch_body", article_id=article.id):
+                content = runtime.run(fetch())
+            if content:
+                article.content = content
+            else:
+                logger.warning(f"Full text of article {article.id} unavailable, keeping the teaser")
+
+        pipeline.advance(article, pipeline.FETCHED)
+        db.commit()
+        _enqueue_stage(summarize_article, article, DatabaseService(db).get_subscribed_topic_names())
+
+    except Exception:
+        logger.exception(f"Error fetching body of article {article_id}")
+    finally:
+        if "db" in locals():
+            db.close()
+
+
+@celery_app.task
+def summarize_article(article_id: int):
+    """Этап конвейера: резюме статьи, затем передача в рассылку"""
+    try:
+        db = SessionLocal()
+        db_service = DatabaseService(db)
+        # Отложенные повторы и исчерпанные попытки остаются подметальщику
+        article = (
+            db.query(Article)
+            .filter(Article.id == article_id, summary_due(datetime.now(UTC)))
+            .first()
+        )
+        if article is None or not article.content or not pipeline.claim(db, article):
+            return
+
+        subscribed = db_service.get_subscribed_topic_names()
+        low_priority = settings.summary_low_priority_local and _low_priority(article, subscribed)
+        try:
+            with span("summarize.article", article_id=article.id):
+                routed = runtime.run(
+                    summary_router.summarize(article.content, article.title, low_priority)
+                )
+        except SummaryUnavailableError as e:
+            db_service.record_summary_failure(article, str(e))
+            return
+
+        db_service.save_summary(article, routed.text, routed.provider, routed.retry_reason)
+        if routed.provisional:
+            return
+        logger.info(f"Generated summary for article {article.title} with {routed.provider}")
+        _enqueue_stage(publish_article, article, subscribed)
+
+    except Exception:
+        logger.exception(f"Error summarizing article {article_id}")
+    finally:
+        if "db" in locals():
+            db.close()
+
+
+@celery_app.task
+def publish_article(article_id: int):
+    """Этап конвейера: статья готова к рассылке, дайджесты запрашиваются сразу"""
+    try:
+        db = SessionLocal()
+        article = db.get(Article, article_id)
+        if article is None or article.status != pipeline.SUMMARIZED:
+            return
+
+        pipeline.advance(article, pipeline.DELIVERABLE)
+        db.commit()
+
+        # Статьи одного обхода успевают собраться в один запуск рассылки
+        if pipeline.claim_delivery():
+            send_digests_to_users.apply_async(countdown=settings.pipeline_delivery_debounce_seconds)
+
+    except Exception:
+        logger.exception(f"Error publishing article {article_id}")
+    finally:
+        if "db" in locals():
+            db.close()
+
+
 @celery_app.task
+def refresh_pipeline_metrics():
+    """Обновление глубины очередей этапов конвейера"""
+    with DatabaseService() as db_service:
+        depth = pipeline.refresh_queue_depth(db_service.db)
+    logger.debug(f"Pipeline queue depth: {depth}")
+
+
+@celery_app.task
+@exclusive("send-digests")
 def send_digests_to_users():
     """Задача для отправки дайджестов пользователям"""
     try:
@@ -125,7 +602,7 @@ def send_digests_to_users():
 
         from app.services.digest_service import digest_service
 
-        stats = asyncio.run(digest_service.send_digest_to_all_users())
+        stats = runtime.run(digest_service.send_digest_to_all_users())
 
         logger.info(f"Digest sending task completed: {stats}")
 
@@ -190,6 +667,103 @@ def _mark_articles_as_sent(user_id: int, article_ids: list[int], db: Session):
         db.rollback()
 
 
+@celery_app.task(bind=True)
+@exclusive("cleanup-old-data")
+def cleanup_old_data(self):
+    """Задача для очистки старых статей и логов парсинга"""
+
+    def report_progress(articles_deleted: int) -> None:
+        self.update_state(state="PROGRESS", meta={"articles_deleted": articles_deleted})
+
+    with DatabaseService() as db_service:
+        try:
+            articles_deleted = db_service.cleanup_old_articles(
+                settings.cleanup_articles_days,
+                batch_size=settings.cleanup_batch_size,
+                on_batch=report_progress,
+            )
+            sent_deleted = db_service.cleanup_old_sent_articles(
+                settings.sent_articles_retention_days
+            )
+            logs_deleted = db_service.cleanup_old_logs(settings.cleanup_logs_days)
+        except Exception:
+            logger.exception("Error in cleanup_old_data task")
+            db_service.db.rollback()
+            raise
+
+    logger.info(
+        f"Cleanup completed: {articles_deleted} articles, {sent_deleted} sent marks, "
+        f"{logs_deleted} logs deleted"
+    )
+    return {
+        "articles_deleted": articles_deleted,
+        "sent_articles_deleted": sent_deleted,
+        "logs_deleted": logs_deleted,
+    }
+
+
+@celery_app.task
+@exclusive("maintain-partitions")
+def maintain_partitions():
+    """Задача для создания секций sent_articles и parsing_logs заранее"""
+    with engine.begin() as conn:
+        created = partitions.maintain_partitions(conn, settings.partition_premake_days)
+    if created:
+        logger.info(f"Created partitions: {', '.join(created)}")
+    return created
+
+
+@celery_app.task
+@exclusive("refresh-hub-directory")
+def refresh_hub_directory():
+    """Задача для обновления каталога хабов и привязки тем к хабам"""
+
+    async def fetch_hubs() -> dict[str, str]:
+        parser = await runtime.get_parser()
+        return await parser.get_hubs(settings.hub_directory_max_pages)
+
+    try:
+        hubs = runtime.run(fetch_hubs())
+    except HabrFetchError:
+        logger.exception("Error fetching hub directory")
+        return 0
+    if not hubs:
+        # Пустой список — скорее сломанная разметка, чем отсутствие хабов
+        logger.warning("Hub directory is empty, topics left unchanged")
+        return 0
+
+    hub_directory.store(hubs)
+    with DatabaseService() as db_service:
+        changed = apply_to_topics(db_service.get_all_topics(), hubs)
+        db_service.db.commit()
+
+    logger.info(f"Hub directory refreshed: {len(hubs)} hubs, {changed} topics changed")
+    return changed
+
+
+@celery_app.task
+def match_custom_topic(topic_id: int):
+    """Задача для подбора уже сохранённых статей к новой пользовательской теме"""
+    with DatabaseService() as db_service:
+        topic = db_service.get_topic_by_id(topic_id)
+        if not topic or not topic.is_custom:
+            logger.warning(f"Custom topic {topic_id} not found")
+            return 0
+
+        semantic_index.sync(db_service)
+        matches = semantic_index.search(
+            semantic_index.embed(topic.name),
+            settings.semantic_backfill_limit,
+            settings.semantic_min_similarity,
+        )
+        tagged = db_service.add_topic_to_articles(
+            topic.name, [article_id for article_id, _ in matches]
+        )
+
+    logger.info(f"Custom topic {topic.name} matched {tagged} existing articles")
+    return tagged
+
+
 @celery_app.task
 def add_default_topics():
     """Задача для добавления стандартных тем"""
@@ -222,7 +796,8 @@ def add_default_topics():
         for topic_data in default_topics:
             existing_topic = db.query(Topic).filter(Topic.slug == topic_data["slug"]).first()
             if not existing_topic:
-                topic = Topic(**topic_data)
+                # Хаб уточнится при обновлении каталога хабов
+                topic = Topic(**topic_data, hub_slug=topic_data["slug"])
                 db.add(topic)
                 logger.info(f"Added topic: {topic_data['name']}")
 
@@ -1,14 +1,20 @@
 import asyncio
 import sys
+import time
 
 import uvicorn
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import JSONResponse
 from loguru import logger
 
+from app.api.admin import router as admin_router
 from app.api.routes import router as database_router
 from app.bot.bot import bot_instance
 from app.core.config import settings
+from app.core.metrics import HTTP_REQUEST_SECONDS, render_latest
 from app.database.database import create_tables
+from app.database.instrumentation import begin_query_scope, current_query_stats, end_query_scope
+from app.services.health_service import health_service
 from celery_app.tasks import add_default_topics
 
 logger.remove()
@@ -31,6 +37,28 @@ app = FastAPI(
 )
 
 app.include_router(database_router)
+app.include_router(admin_router)
+
+
+@app.middleware("http")
+async def track_request_latency(request: Request, call_next):
+    """Замер времени обработки и SQL-запросов по шаблону маршрута"""
+    started = time.perf_counter()
+    status = 500
+    scope = begin_query_scope("http", f"{request.method} {request.url.path}")
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        path = route.path if route else "unmatched"
+        HTTP_REQUEST_SECONDS.labels(request.method, path, str(status)).observe(
+            time.perf_counter() - started
+        )
+        if stats := current_query_stats():
+            stats.name = f"{request.method} {path}"
+        end_query_scope(scope)
 
 
 @app.on_event("startup")
@@ -67,15 +95,39 @@ async def root():
 @app.get("/health")
 async def health_check():
     """Проверка здоровья приложения"""
+    report = await health_service.readiness()
+    checks = report["checks"]
     return {
-        "status": "healthy",
+        "status": report["status"],
         "ai_provider": "yandex_gpt",
         "yandex_model": settings.yandex_model,
-        "database": "connected",
-        "bot": "running",
+        "database": "connected" if checks["database"]["ok"] else "unavailable",
+        "bot": "running" if checks["bot"]["ok"] else "stopped",
+        "checks": checks,
     }
 
 
+@app.get("/health/live")
+async def liveness():
+    """Живость процесса: отвечает, пока работает event loop"""
+    return {"status": "alive"}
+
+
+@app.get("/health/ready")
+async def readiness():
+    """Готовность принимать трафик: 503, если недоступна критичная зависимость"""
+    report = await health_service.readiness()
+    status_code = 503 if report["status"] == "unhealthy" else 200
+    return JSONResponse(report, status_code=status_code)
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Метрики в формате Prometheus"""
+    payload, content_type = render_latest()
+    return Response(content=payload, media_type=content_type)
+
+
 async def run_bot():
     """Запуск Telegram бота"""
     try:
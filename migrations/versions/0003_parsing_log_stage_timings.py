@@ -0,0 +1,35 @@
+"""Add stage timings to parsing logs
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+STAGE_COLUMNS = ("fetch_seconds", "parse_seconds", "db_seconds", "summarize_seconds")
+
+
+def upgrade() -> None:
+    op.add_column(
+        "parsing_logs",
+        sa.Column(
+            "task", sa.String(length=100), server_default="parse_habr_articles", nullable=True
+        ),
+    )
+    for column in STAGE_COLUMNS:
+        op.add_column("parsing_logs", sa.Column(column, sa.Float(), nullable=True))
+
+
+def downgrade() -> None:
+    for column in reversed(STAGE_COLUMNS):
+        op.drop_column("parsing_logs", column)
+    op.drop_column("parsing_logs", "task")
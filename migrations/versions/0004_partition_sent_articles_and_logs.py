@@ -0,0 +1,100 @@
+"""Partition sent_articles and parsing_logs by time
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+
+from datetime import UTC, datetime, timedelta
+
+from alembic import op
+
+from app.core.config import settings
+from app.database.partitions import PARSING_LOGS, SENT_ARTICLES, create_partitions
+
+# revision identifiers, used by Alembic.
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+FOREIGN_KEYS = {
+    "sent_articles": [("user_id", "users"), ("article_id", "articles")],
+    "parsing_logs": [],
+}
+
+
+def _add_foreign_keys(name: str) -> None:
+    for column, referenced in FOREIGN_KEYS[name]:
+        op.execute(
+            f"ALTER TABLE {name} ADD CONSTRAINT {name}_{column}_fkey "
+            f"FOREIGN KEY ({column}) REFERENCES {referenced} (id)"
+        )
+
+
+def _detach(name: str, renamed: str) -> None:
+    """Переименование таблицы со всеми именами, которые займёт новая"""
+    op.execute(f"ALTER SEQUENCE {name}_id_seq OWNED BY NONE")
+    op.execute(f"ALTER TABLE {name} RENAME TO {renamed}")
+    op.execute(f"ALTER TABLE {renamed} RENAME CONSTRAINT {name}_pkey TO {renamed}_pkey")
+    op.execute(f"DROP INDEX ix_{name}_id")
+
+
+def _partition(table, keep_days: int) -> None:
+    name, column = table.name, table.column
+    old = f"{name}_unpartitioned"
+    _detach(name, old)
+
+    # Ключ секционирования обязан входить в первичный ключ
+    op.execute(f"UPDATE {old} SET {column} = now() WHERE {column} IS NULL")
+    op.execute(
+        f"CREATE TABLE {name} (LIKE {old} INCLUDING DEFAULTS, PRIMARY KEY (id, {column})) "
+        f"PARTITION BY RANGE ({column})"
+    )
+    _add_foreign_keys(name)
+    op.execute(f"CREATE INDEX ix_{name}_id ON {name} (id)")
+
+    # Секции на срок хранения и вперёд; более старые строки уйдут в секцию по умолчанию
+    bind = op.get_bind()
+    now = datetime.now(UTC)
+    oldest = bind.exec_driver_sql(f"SELECT min({column}) FROM {old}").scalar() or now
+    since = max(oldest, now - timedelta(days=keep_days))
+    create_partitions(bind, table, since, now + timedelta(days=settings.partition_premake_days))
+    op.execute(f"CREATE TABLE {table.default_partition} PARTITION OF {name} DEFAULT")
+
+    op.execute(f"INSERT INTO {name} SELECT * FROM {old}")
+    op.execute(f"DROP TABLE {old}")
+    op.execute(f"ALTER SEQUENCE {name}_id_seq OWNED BY {name}.id")
+
+
+def _unpartition(table) -> None:
+    name, column = table.name, table.column
+    old = f"{name}_partitioned"
+    _detach(name, old)
+
+    op.execute(f"CREATE TABLE {name} (LIKE {old} INCLUDING DEFAULTS, PRIMARY KEY (id))")
+    op.execute(f"ALTER TABLE {name} ALTER COLUMN {column} DROP NOT NULL")
+    _add_foreign_keys(name)
+    op.execute(f"CREATE INDEX ix_{name}_id ON {name} (id)")
+
+    op.execute(f"INSERT INTO {name} SELECT * FROM {old}")
+    op.execute(f"DROP TABLE {old} CASCADE")
+    op.execute(f"ALTER SEQUENCE {name}_id_seq OWNED BY {name}.id")
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    _partition(SENT_ARTICLES, settings.sent_articles_retention_days)
+    op.execute(
+        "CREATE INDEX ix_sent_articles_user_id_article_id ON sent_articles (user_id, article_id)"
+    )
+    _partition(PARSING_LOGS, settings.cleanup_logs_days)
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    _unpartition(PARSING_LOGS)
+    _unpartition(SENT_ARTICLES)
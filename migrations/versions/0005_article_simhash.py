@@ -0,0 +1,49 @@
+"""Add SimHash fingerprints and canonical links to articles
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("articles", sa.Column("simhash", sa.BigInteger(), nullable=True))
+    op.add_column("articles", sa.Column("canonical_id", sa.Integer(), nullable=True))
+    op.create_index(op.f("ix_articles_canonical_id"), "articles", ["canonical_id"], unique=False)
+    op.create_foreign_key(
+        "articles_canonical_id_fkey",
+        "articles",
+        "articles",
+        ["canonical_id"],
+        ["id"],
+        ondelete="SET NULL",
+    )
+
+    op.create_table(
+        "simhash_bands",
+        sa.Column("article_id", sa.Integer(), nullable=False),
+        sa.Column("band", sa.SmallInteger(), nullable=False),
+        sa.Column("value", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["article_id"], ["articles.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("article_id", "band"),
+    )
+    op.create_index("ix_simhash_bands_band_value", "simhash_bands", ["band", "value"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_simhash_bands_band_value", table_name="simhash_bands")
+    op.drop_table("simhash_bands")
+    op.drop_constraint("articles_canonical_id_fkey", "articles", type_="foreignkey")
+    op.drop_index(op.f("ix_articles_canonical_id"), table_name="articles")
+    op.drop_column("articles", "canonical_id")
+    op.drop_column("articles", "simhash")
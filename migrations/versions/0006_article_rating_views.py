@@ -0,0 +1,26 @@
+"""Add rating and views to articles
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("articles", sa.Column("rating", sa.Integer(), nullable=True))
+    op.add_column("articles", sa.Column("views", sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("articles", "views")
+    op.drop_column("articles", "rating")
@@ -0,0 +1,31 @@
+"""Mark user-created topics as custom
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "topics",
+        sa.Column("is_custom", sa.Boolean(), server_default=sa.false(), nullable=False),
+    )
+    # Темы из бота создавались с таким описанием (handle_custom_topic)
+    op.execute(
+        "UPDATE topics SET is_custom = true WHERE description LIKE 'Пользовательская тема:%'"
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("topics", "is_custom")
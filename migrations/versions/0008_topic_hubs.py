@@ -0,0 +1,39 @@
+"""Add hub resolution and crawl backoff to topics
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "0008"
+down_revision = "0007"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("topics", sa.Column("hub_slug", sa.String(length=255), nullable=True))
+    op.add_column(
+        "topics",
+        sa.Column("crawl_failures", sa.Integer(), server_default="0", nullable=False),
+    )
+    op.add_column("topics", sa.Column("next_crawl_at", sa.DateTime(timezone=True), nullable=True))
+    # До первого обновления каталога хабов стандартные темы обходятся по своему slug
+    op.execute("UPDATE topics SET hub_slug = slug WHERE NOT is_custom")
+
+    op.add_column(
+        "parsing_logs",
+        sa.Column("requests_saved", sa.Integer(), server_default="0", nullable=True),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("parsing_logs", "requests_saved")
+    op.drop_column("topics", "next_crawl_at")
+    op.drop_column("topics", "crawl_failures")
+    op.drop_column("topics", "hub_slug")
@@ -0,0 +1,45 @@
+"""Add summary retry queue to articles
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "0009"
+down_revision = "0008"
+branch_labels = None
+depends_on = None
+
+# Тексты, которые раньше сохранялись как резюме при ошибке вызова YandexGPT
+ERROR_SUMMARIES = (
+    "summary LIKE 'Ошибка при генерации резюме%' "
+    "OR summary = 'Ошибка при подключении к Yandex GPT API' "
+    "OR summary = 'Неожиданная ошибка при генерации резюме'"
+)
+
+
+def upgrade() -> None:
+    op.add_column(
+        "articles",
+        sa.Column("summary_attempts", sa.Integer(), server_default="0", nullable=False),
+    )
+    op.add_column(
+        "articles", sa.Column("summary_next_attempt_at", sa.DateTime(timezone=True), nullable=True)
+    )
+    op.add_column("articles", sa.Column("summary_error", sa.String(length=500), nullable=True))
+    # Статьи с текстом ошибки вместо резюме возвращаются в очередь
+    op.execute(
+        f"UPDATE articles SET summary_error = summary, summary = NULL, is_processed = false "
+        f"WHERE {ERROR_SUMMARIES}"
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("articles", "summary_error")
+    op.drop_column("articles", "summary_next_attempt_at")
+    op.drop_column("articles", "summary_attempts")
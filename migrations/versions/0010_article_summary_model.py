@@ -0,0 +1,24 @@
+"""Add summary provider to articles
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "0010"
+down_revision = "0009"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("articles", sa.Column("summary_model", sa.String(length=50), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("articles", "summary_model")
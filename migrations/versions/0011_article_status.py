@@ -0,0 +1,47 @@
+"""Add lifecycle status to articles
+
+Revision ID: 0011
+Revises: 0010
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "0011"
+down_revision = "0010"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "articles",
+        sa.Column("status", sa.String(length=20), server_default="ingested", nullable=False),
+    )
+    op.add_column(
+        "articles",
+        sa.Column(
+            "status_changed_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.func.now(),
+            nullable=True,
+        ),
+    )
+    op.create_index(op.f("ix_articles_status"), "articles", ["status"], unique=False)
+    # Этап уже сохранённых статей выводится из прежних признаков. Необработанные
+    # считаются загруженными: их резюмирует очередь повторов без новых запросов к Хабру
+    op.execute(
+        "UPDATE articles SET status = CASE "
+        "WHEN canonical_id IS NOT NULL THEN 'duplicate' "
+        "WHEN is_processed THEN 'deliverable' "
+        "ELSE 'fetched' END"
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(op.f("ix_articles_status"), table_name="articles")
+    op.drop_column("articles", "status_changed_at")
+    op.drop_column("articles", "status")
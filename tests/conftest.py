@@ -0,0 +1,25 @@
+"""
+Общие фикстуры тестов
+"""
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from app.database.models import Base
+
+
+@pytest.fixture
+def db_session():
+    """Сессия SQLite в памяти с проверкой внешних ключей"""
+    engine = create_engine("sqlite://")
+    event.listen(
+        engine,
+        "connect",
+        lambda dbapi_connection, _: dbapi_connection.execute("PRAGMA foreign_keys=ON"),
+    )
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+    engine.dispose()
@@ -0,0 +1,111 @@
+"""
+Тесты параллельной обработки апдейтов бота
+"""
+
+import asyncio
+
+import pytest
+from telegram import Update
+
+from app.bot.concurrency import ChatOrderedUpdateProcessor
+from app.bot.metrics import HandlerLatency
+
+
+def make_update(update_id: int, chat_id: int) -> Update:
+    """Минимальный апдейт с сообщением из указанного чата"""
+    return Update.de_json(
+        {
+            "update_id": update_id,
+            "message": {
+                "message_id": update_id,
+                "date": 0,
+                "chat": {"id": chat_id, "type": "private"},
+                "from": {"id": chat_id, "is_bot": False, "first_name": "Test"},
+                "text": "/start",
+            },
+        },
+        None,
+    )
+
+
+class TestChatOrderedUpdateProcessor:
+    """Тесты порядка обработки апдейтов"""
+
+    @pytest.mark.asyncio
+    async def test_same_chat_is_sequential(self):
+        """Апдейты одного чата не перекрываются и идут по порядку"""
+        processor = ChatOrderedUpdateProcessor(max_concurrent_updates=8)
+        events = []
+
+        async def handle(update_id: int, delay: float):
+            events.append(("start", update_id))
+            await asyncio.sleep(delay)
+            events.append(("end", update_id))
+
+        await asyncio.gather(
+            processor.process_update(make_update(1, 100), handle(1, 0.05)),
+            processor.process_update(make_update(2, 100), handle(2, 0.0)),
+        )
+
+        assert events == [("start", 1), ("end", 1), ("start", 2), ("end", 2)]
+        assert processor.active_chats == 0
+
+    @pytest.mark.asyncio
+    async def test_different_chats_run_concurrently(self):
+        """Медленный апдейт одного чата не задерживает другой чат"""
+        processor = ChatOrderedUpdateProcessor(max_concurrent_updates=8)
+        finished = []
+
+        async def handle(chat_id: int, delay: float):
+            await asyncio.sleep(delay)
+            finished.append(chat_id)
+
+        await asyncio.gather(
+            processor.process_update(make_update(1, 100), handle(100, 0.05)),
+            processor.process_update(make_update(2, 200), handle(200, 0.0)),
+        )
+
+        assert finished == [200, 100]
+
+    @pytest.mark.asyncio
+    async def test_flooding_chat_does_not_take_all_slots(self):
+        """Чат, приславший больше апдейтов, чем слотов, не задерживает другие чаты"""
+        processor = ChatOrderedUpdateProcessor(max_concurrent_updates=2)
+        release = asyncio.Event()
+        finished = []
+
+        async def slow(update_id: int):
+            await release.wait()
+            finished.append(update_id)
+
+        async def fast():
+            finished.append("other chat")
+
+        flood = [
+            asyncio.create_task(processor.process_update(make_update(i, 100), slow(i)))
+            for i in range(1, 6)
+        ]
+        await asyncio.wait_for(processor.process_update(make_update(10, 200), fast()), 1)
+
+        assert finished == ["other chat"]
+        assert processor.current_concurrent_updates == 1
+        release.set()
+        await asyncio.gather(*flood)
+        assert finished == ["other chat", 1, 2, 3, 4, 5]
+
+
+class TestHandlerLatency:
+    """Тесты учёта длительности обработчиков"""
+
+    def test_snapshot(self):
+        """Сводка считает вызовы, ошибки и перцентили"""
+        latency = HandlerLatency(slow_threshold=10.0)
+        for seconds in (0.1, 0.2, 0.3, 0.4):
+            latency.observe("cmd_start", seconds)
+        latency.observe("cmd_start", 0.5, failed=True)
+
+        stats = latency.snapshot()["cmd_start"]
+        assert stats["calls"] == 5
+        assert stats["errors"] == 1
+        assert stats["max_seconds"] == 0.5
+        assert stats["p50_seconds"] == 0.3
@@ -0,0 +1,145 @@
+"""
+Тесты сервиса базы данных
+"""
+
+from datetime import UTC, datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, func, select, text
+from sqlalchemy.exc import OperationalError
+
+from app.core.config import settings
+from app.database.models import Article, SentArticle, User
+from app.database.partitions import (
+    PARSING_LOGS,
+    SENT_ARTICLES,
+    create_partitions,
+    is_partitioned,
+    partition_name,
+    partition_start,
+)
+from app.services.database_service import DatabaseService
+
+
+class TestCleanupOldArticles:
+    """Тесты пакетной очистки старых статей"""
+
+    def _seed(self, session, old_sent: int, old_unsent: int, fresh_sent: int) -> None:
+        user = User(telegram_id=1)
+        session.add(user)
+        old = datetime.now(UTC) - timedelta(days=60)
+        groups = [("old-sent", old_sent, old, True), ("old-unsent", old_unsent, old, False)]
+        groups.append(("fresh-sent", fresh_sent, datetime.now(UTC), True))
+        for prefix, count, created_at, sent in groups:
+            for i in range(count):
+                article = Article(
+                    habr_id=f"{prefix}-{i}", title="t", url="u", created_at=created_at
+                )
+                session.add(article)
+                if sent:
+                    session.add(SentArticle(user=user, article=article))
+        session.commit()
+
+    def test_deletes_sent_articles_in_batches(self, db_session):
+        """Тест: удаляются только старые отправленные статьи вместе с отметками"""
+        self._seed(db_session, old_sent=7, old_unsent=2, fresh_sent=3)
+        progress = []
+
+        deleted = DatabaseService(db_session).cleanup_old_articles(
+            days=30, batch_size=3, on_batch=progress.append
+        )
+
+        assert deleted == 7
+        assert progress == [3, 6, 7]
+        remaining = db_session.scalars(select(Article.habr_id)).all()
+        assert sorted(remaining) == sorted(
+            [f"old-unsent-{i}" for i in range(2)] + [f"fresh-sent-{i}" for i in range(3)]
+        )
+        assert db_session.scalar(select(func.count()).select_from(SentArticle)) == 3
+
+    def test_nothing_to_delete(self, db_session):
+        """Тест: без старых отправленных статей ничего не удаляется"""
+        self._seed(db_session, old_sent=0, old_unsent=2, fresh_sent=1)
+
+        assert DatabaseService(db_session).cleanup_old_articles(days=30, batch_size=3) == 0
+
+
+class TestPartitions:
+    """Тесты секционирования по времени"""
+
+    def test_partition_start(self):
+        """Тест: недельные секции начинаются с понедельника, дневные — с полуночи UTC"""
+        moment = datetime(2026, 10, 22, 15, 30, tzinfo=UTC)  # четверг
+
+        assert partition_start(SENT_ARTICLES, moment) == datetime(2026, 10, 19, tzinfo=UTC)
+        assert partition_start(PARSING_LOGS, moment) == datetime(2026, 10, 22, tzinfo=UTC)
+        assert partition_name(SENT_ARTICLES, partition_start(SENT_ARTICLES, moment)) == (
+            "sent_articles_p20261019"
+        )
+
+    def test_sqlite_falls_back_to_row_deletes(self, db_session, monkeypatch):
+        """Тест: без секций старые отметки удаляются строками, но не свежее срока дайджеста"""
+        monkeypatch.setattr(settings, "digest_lookback_days", 14)
+        user = User(telegram_id=1)
+        article = Article(habr_id="1", title="t", url="u")
+        now = datetime.now(UTC)
+        for age_days in (100, 20, 1):
+            db_session.add(
+                SentArticle(user=user, article=article, sent_at=now - timedelta(days=age_days))
+            )
+        db_session.commit()
+
+        assert not is_partitioned(db_session.connection(), SENT_ARTICLES)
+        service = DatabaseService(db_session)
+        assert service.cleanup_old_sent_articles(days=90) == 1
+        assert service.cleanup_old_sent_articles(days=7) == 1
+        assert db_session.scalar(select(func.count()).select_from(SentArticle)) == 1
+
+
+@pytest.fixture
+def pg_connection():
+    """Соединение с PostgreSQL из DATABASE_URL после миграций; изменения откатываются"""
+    if not settings.database_url.startswith("postgresql"):
+        pytest.skip("DATABASE_URL is not PostgreSQL")
+    engine = create_engine(settings.database_url)
+    try:
+        conn = engine.connect()
+    except OperationalError:
+        engine.dispose()
+        pytest.skip("PostgreSQL is unavailable")
+    transaction = conn.begin()
+    if not is_partitioned(conn, PARSING_LOGS):
+        pytest.skip("parsing_logs is not partitioned, run the migrations first")
+    yield conn
+    transaction.rollback()
+    conn.close()
+    engine.dispose()
+
+
+@pytest.mark.database
+class TestPartitionsOnPostgres:
+    """Тесты секций на PostgreSQL: запускаются в CI после alembic upgrade head"""
+
+    def test_rows_in_default_moved_to_new_partition(self, pg_connection):
+        """Тест: строки диапазона из секции по умолчанию переезжают в новую секцию"""
+        moment = datetime.now(UTC) + timedelta(days=400)
+        start = partition_start(PARSING_LOGS, moment)
+        name = partition_name(PARSING_LOGS, start)
+        pg_connection.execute(
+            text("INSERT INTO parsing_logs (started_at, status) VALUES (:moment, 'completed')"),
+            {"moment": moment},
+        )
+        in_default = text(
+            f"SELECT count(*) FROM {PARSING_LOGS.default_partition} WHERE started_at >= :start"
+        )
+        assert pg_connection.scalar(in_default, {"start": start}) == 1
+
+        assert create_partitions(pg_connection, PARSING_LOGS, moment, moment) == [name]
+        assert pg_connection.scalar(text(f"SELECT count(*) FROM {name}")) == 1
+        assert pg_connection.scalar(in_default, {"start": start}) == 0
+
+        # Следующий диапазон пуст и создаётся обычным путём
+        later = moment + timedelta(days=1)
+        assert create_partitions(pg_connection, PARSING_LOGS, moment, later) == [
+            partition_name(PARSING_LOGS, partition_start(PARSING_LOGS, later))
+        ]
@@ -0,0 +1,73 @@
+"""
+Тесты поиска дублей статей
+"""
+
+import pytest
+
+from app.core.config import settings
+from app.services import dedup, pipeline
+from app.services.parser_service import ArticleService
+
+TEXT = (
+    "Разбираем, как устроен планировщик запросов PostgreSQL: статистика по колонкам, "
+    "оценка селективности условий, выбор между последовательным и индексным "
+    "сканированием и типичные ошибки, из-за которых план внезапно становится медленным"
+)
+
+
+def article_data(habr_id: str, content: str) -> dict:
+    return {
+        "habr_id": habr_id,
+        "title": "Как работает планировщик PostgreSQL",
+        "url": f"https://habr.com/ru/articles/{habr_id}/",
+        "author": "author",
+        "published_at": None,
+        "content": content,
+        "topics": ["Database"],
+    }
+
+
+class TestSimHash:
+    """Тесты отпечатков SimHash"""
+
+    def test_near_duplicates_are_close(self):
+        """Тест: перепубликация с мелкой правкой близка, другой текст далёк"""
+        original = dedup.fingerprint("Планировщик PostgreSQL", TEXT)
+        repost = dedup.fingerprint("Планировщик PostgreSQL", TEXT + " Перевод")
+        other = dedup.fingerprint("Асинхронный Python", "Event loop, корутины и задачи " * 5)
+
+        assert dedup.hamming(original.simhash, repost.simhash) <= 6
+        assert dedup.hamming(original.simhash, other.simhash) > 10
+        assert dedup.from_signed(original.signed) == original.simhash
+
+    def test_short_text_is_skipped(self):
+        """Тест: по нескольким словам отпечаток не строится"""
+        assert dedup.fingerprint("Коротко", "о главном") is None
+
+
+class TestArticleDeduplication:
+    """Тесты связывания дублей при сохранении"""
+
+    @pytest.mark.asyncio
+    async def test_duplicate_linked_to_canonical(self, db_session, monkeypatch):
+        """Тест: копия ссылается на первую статью и не ждёт суммаризации"""
+        # Очередь резюме без этапа загрузки полного текста
+        monkeypatch.setattr(settings, "pipeline_enabled", False)
+        service = ArticleService(db_session)
+
+        original = await service.save_article(article_data("1", TEXT))
+        repost = await service.save_article(article_data("2", TEXT + " Перевод"))
+        repost_of_repost = await service.save_article(article_data("3", TEXT + " Копия"))
+        unrelated = await service.save_article(
+            article_data("4", "Event loop, корутины и задачи в asyncio " * 5)
+        )
+
+        assert original.canonical_id is None
+        assert repost.canonical_id == original.id
+        assert repost.is_processed
+        assert repost_of_repost.canonical_id == original.id
+        assert unrelated.canonical_id is None
+        assert repost.status == repost_of_repost.status == pipeline.DUPLICATE
+        assert original.status == unrelated.status == pipeline.INGESTED
+        unprocessed = {article.id for article in service.get_unprocessed_articles()}
+        assert unprocessed == {original.id, unrelated.id}
@@ -0,0 +1,132 @@
+"""
+Тесты сборки дайджестов
+"""
+
+from datetime import UTC, datetime, timedelta
+
+import pytest
+import redis
+
+from app.core.config import settings
+from app.database.models import Article, Subscription, Topic, User
+from app.services import digest_service as digest_module
+from app.services import pipeline
+from app.services.database_service import DatabaseService
+from app.services.digest_service import DigestService
+from app.services.llm_router import RoutedSummary
+from app.services.sent_history import SentHistory
+
+
+@pytest.fixture
+def digest(db_session, monkeypatch):
+    """Сервис дайджестов над сессией SQLite: отправленные сообщения и вызовы модели"""
+    sent: list[str] = []
+    summarized: list[str] = []
+
+    async def send_message(chat_id, text):
+        sent.append(text)
+
+    async def summarize(content, title, low_priority=False):
+        summarized.append(title)
+        return RoutedSummary(f"Резюме: {title}", "yandexgpt-lite")
+
+    monkeypatch.setattr(digest_module.bot_instance, "send_message", send_message)
+    monkeypatch.setattr(digest_module.summary_router, "summarize", summarize)
+    # Без Redis отправленные статьи отсеиваются по базе
+    monkeypatch.setattr(
+        digest_module,
+        "sent_history",
+        SentHistory(lambda: redis.Redis(port=1, socket_connect_timeout=0.1)),
+    )
+
+    user = User(telegram_id=1)
+    topic = Topic(name="Database", slug="database")
+    db_session.add_all([user, topic, Subscription(user=user, topic=topic)])
+    for title, status, summary in (
+        ("Готовая", pipeline.DELIVERABLE, "Резюме готовой"),
+        ("Загруженная", pipeline.INGESTED, None),
+        ("Резюмируемая", pipeline.SUMMARIZING, None),
+    ):
+        db_session.add(
+            Article(
+                habr_id=title,
+                title=title,
+                url="u",
+                content="Текст статьи",
+                topics=["Database"],
+                status=status,
+                summary=summary,
+                is_processed=summary is not None,
+            )
+        )
+    db_session.commit()
+
+    service = DigestService()
+    service.db_service = DatabaseService(db_session)
+    return service, sent, summarized
+
+
+def statuses(db_session) -> dict[str, str]:
+    return {article.title: article.status for article in db_session.query(Article)}
+
+
+class TestDigestCandidates:
+    """Тесты выбора статей для дайджеста при работающих задачах резюме"""
+
+    @pytest.mark.asyncio
+    async def test_pipeline_digest_takes_only_deliverable(self, db_session, digest, monkeypatch):
+        """Тест: в конвейере дайджест не резюмирует статьи, не дошедшие до рассылки"""
+        monkeypatch.setattr(settings, "pipeline_enabled", True)
+        service, sent, summarized = digest
+
+        stats = await service.send_digest_to_all_users()
+
+        assert stats["digests_sent"] == 1
+        assert summarized == []
+        assert "Готовая" in sent[0]
+        assert "Загруженная" not in sent[0] and "Резюмируемая" not in sent[0]
+        assert statuses(db_session) == {
+            "Готовая": pipeline.DELIVERABLE,
+            "Загруженная": pipeline.INGESTED,
+            "Резюмируемая": pipeline.SUMMARIZING,
+        }
+
+    @pytest.mark.asyncio
+    async def test_digest_skips_article_being_summarized(self, db_session, digest, monkeypatch):
+        """Тест: без конвейера дайджест резюмирует статью, только захватив её"""
+        monkeypatch.setattr(settings, "pipeline_enabled", False)
+        service, sent, summarized = digest
+
+        await service.send_digest_to_all_users()
+
+        assert summarized == ["Загруженная"]
+        assert "Резюме: Загруженная" in sent[0]
+        assert "Резюмируемая" not in sent[0]
+        assert statuses(db_session)["Резюмируемая"] == pipeline.SUMMARIZING
+
+    @pytest.mark.asyncio
+    async def test_niche_topic_not_crowded_out(self, db_session, digest, monkeypatch):
+        """Тест: предел кандидатов действует на тему, старая статья нишевой темы не теряется"""
+        monkeypatch.setattr(settings, "pipeline_enabled", True)
+        monkeypatch.setattr(settings, "ranking_max_candidates", 2)
+        service, sent, _ = digest
+        niche = db_session.query(Article).filter(Article.title == "Готовая").one()
+        niche.created_at = datetime.now(UTC) - timedelta(days=3)
+        db_session.add_all(
+            Article(
+                habr_id=f"python-{i}",
+                title=f"Python {i}",
+                url="u",
+                topics=["Python"],
+                status=pipeline.DELIVERABLE,
+                summary="Резюме",
+                is_processed=True,
+            )
+            for i in range(3)
+        )
+        db_session.commit()
+
+        await service.send_digest_to_all_users()
+
+        assert "Готовая" in sent[0]
+        assert "Python" not in sent[0]
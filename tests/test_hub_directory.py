@@ -0,0 +1,132 @@
+"""
+Тесты каталога хабов и отсрочки обхода мёртвых хабов
+"""
+
+from datetime import UTC, datetime
+
+import pytest
+
+from app.core.config import settings
+from app.database.models import Topic
+from app.services.database_service import DatabaseService
+from app.services.hub_directory import apply_to_topics, parse_hubs, resolve
+from app.services.parser_service import HabrFetchError, HabrParser
+from celery_app.tasks import _due_topics
+
+HUBS_PAGE = """
+<div class="tm-hubs-list">
+  <a class="tm-hub__title" href="/ru/hubs/python/"><span>Python</span></a>
+  <a class="tm-hub__title" href="/ru/hubs/machine_learning/"><span>Машинное обучение</span></a>
+  <a class="tm-hub__title" href="/ru/hubs/react/"><span>ReactJS</span></a>
+  <a class="tm-hub__title" href="/ru/hubs/cryptocurrency/"><span>Криптовалюты</span></a>
+</div>
+"""
+
+
+class TestHubDirectory:
+    """Тесты разбора списка хабов и привязки тем"""
+
+    def test_parse_and_resolve(self):
+        """Тест: тема находит хаб по slug или названию, выдуманный slug — нет"""
+        hubs = parse_hubs(HUBS_PAGE)
+
+        assert hubs["machine_learning"] == "Машинное обучение"
+        assert resolve(hubs, "Python", "python") == "python"
+        assert resolve(hubs, "Machine Learning", "machine-learning") == "machine_learning"
+        assert resolve(hubs, "Криптовалюты", "криптовалюты") == "cryptocurrency"
+        assert resolve(hubs, "Web Development", "web-development") is None
+
+    @pytest.mark.asyncio
+    async def test_page_past_the_end_stops_walk(self, monkeypatch):
+        """Тест: 404 за последней страницей списка завершает обход, а не роняет его"""
+        parser = HabrParser()
+        pages = []
+
+        async def fetch(url: str, page: str) -> str:
+            pages.append(url)
+            if url.endswith("/ru/hubs/"):
+                return HUBS_PAGE
+            raise HabrFetchError(url, 404)
+
+        monkeypatch.setattr(parser, "_fetch_html", fetch)
+
+        hubs = await parser.get_hubs(max_pages=100)
+
+        assert hubs == parse_hubs(HUBS_PAGE)
+        assert len(pages) == 2
+
+    @pytest.mark.asyncio
+    async def test_first_page_error_is_raised(self, monkeypatch):
+        """Тест: недоступный первый лист списка — ошибка, а не пустой каталог"""
+        parser = HabrParser()
+
+        async def fetch(url: str, page: str) -> str:
+            raise HabrFetchError(url, 404)
+
+        monkeypatch.setattr(parser, "_fetch_html", fetch)
+
+        with pytest.raises(HabrFetchError):
+            await parser.get_hubs()
+
+    def test_apply_resets_backoff(self):
+        """Тест: смена хаба сбрасывает отсрочку, тема без хаба перестаёт обходиться"""
+        hubs = parse_hubs(HUBS_PAGE)
+        moved = Topic(name="Machine Learning", slug="machine-learning", hub_slug="machine-learning")
+        moved.crawl_failures = 3
+        moved.next_crawl_at = datetime.now(UTC)
+        missing = Topic(name="Web Development", slug="web-development", hub_slug="web-development")
+        same = Topic(name="Python", slug="python", hub_slug="python")
+
+        assert apply_to_topics([moved, missing, same], hubs) == 2
+        assert moved.hub_slug == "machine_learning"
+        assert moved.crawl_failures == 0
+        assert moved.next_crawl_at is None
+        assert missing.hub_slug is None
+
+    def test_habr_id_from_url(self):
+        """Тест: habr_id — номер статьи, а не сегмент «articles»"""
+        parser = HabrParser()
+        assert parser._extract_habr_id("https://habr.com/ru/articles/812345/") == "812345"
+        assert parser._extract_habr_id("https://habr.com/ru/companies/x/articles/7/") == "7"
+        assert parser._extract_habr_id("https://habr.com/ru/hubs/python/") is None
+
+
+class TestHubBackoff:
+    """Тесты отсрочки обхода хабов, ответивших 404"""
+
+    def test_dead_hub_is_skipped(self, db_session):
+        """Тест: после 404 хаб откладывается с растущей задержкой и не запрашивается"""
+        live = Topic(name="Python", slug="python", hub_slug="python")
+        dead = Topic(name="Go", slug="go", hub_slug="go")
+        custom = Topic(name="Криптовалюты", slug="kriptovaliuty", is_custom=True)
+        db_session.add_all([live, dead, custom])
+        db_session.commit()
+        db_service = DatabaseService(db_session)
+
+        db_service.record_hub_crawl(dead, found=False)
+        first_delay = dead.next_crawl_at
+        db_service.record_hub_crawl(dead, found=False)
+
+        assert dead.crawl_failures == 2
+        assert dead.next_crawl_at > first_delay
+        topics, requests_saved = _due_topics(db_session)
+        assert [topic.name for topic in topics] == ["Python"]
+        assert requests_saved == 2
+
+        db_service.record_hub_crawl(dead, found=True)
+        assert dead.crawl_failures == 0
+        assert len(_due_topics(db_session)[0]) == 2
+
+    def test_backoff_is_capped(self, db_session, monkeypatch):
+        """Тест: задержка не превышает HUB_BACKOFF_MAX_HOURS"""
+        monkeypatch.setattr(settings, "hub_backoff_max_hours", 24)
+        topic = Topic(name="Go", slug="go", hub_slug="go", crawl_failures=10)
+        db_session.add(topic)
+        db_session.commit()
+
+        before = datetime.now(UTC)
+        DatabaseService(db_session).record_hub_crawl(topic, found=False)
+
+        # SQLite возвращает время без часового пояса
+        next_crawl_at = topic.next_crawl_at.replace(tzinfo=UTC)
+        assert (next_crawl_at - before).total_seconds() <= 24 * 3600 + 1
@@ -0,0 +1,154 @@
+"""
+Тесты выбора поставщика резюме
+"""
+
+import asyncio
+
+import pytest
+
+from app.core.config import settings
+from app.services.llm_router import (
+    ExtractiveProvider,
+    LLMRouter,
+    SummaryProvider,
+    SummaryUnavailableError,
+)
+from app.services.yandex_service import YandexNetworkError
+
+CONTENT = (
+    "Мы перевели поиск на PostgreSQL. Индекс PostgreSQL оказался быстрым. "
+    "Подписывайтесь на наш Telegram-канал. Поиск по индексу занимает десять миллисекунд."
+)
+
+
+class FakeProvider(SummaryProvider):
+    """Поставщик с заданной задержкой, который может падать"""
+
+    def __init__(self, name: str, delay: float = 0.0, fail: bool = False):
+        self.name = name
+        self.delay = delay
+        self.fail = fail
+        self.calls = 0
+
+    async def summarize(self, content: str, title: str) -> str:
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise YandexNetworkError("ConnectError")
+        return f"{self.name}: {title}"
+
+
+@pytest.fixture(autouse=True)
+def no_local_fast_path(monkeypatch):
+    """Короткие тексты тестов иначе резюмировались бы локально, минуя модели"""
+    monkeypatch.setattr(settings, "summary_local_max_chars", 0)
+
+
+class TestRouting:
+    """Тесты выбора поставщика по ошибкам, задержке и загрузке"""
+
+    @pytest.mark.asyncio
+    async def test_short_and_low_priority_summarized_locally(self, monkeypatch):
+        """Тест: короткий анонс и статья без подписчиков не идут в модель, резюме не временное"""
+        monkeypatch.setattr(settings, "summary_local_max_chars", 500)
+        lite = FakeProvider("yandexgpt-lite")
+        router = LLMRouter([lite, ExtractiveProvider()])
+
+        short = await router.summarize(CONTENT, "Поиск")
+        unpopular = await router.summarize(CONTENT * 10, "Поиск", low_priority=True)
+
+        assert short.provider == unpopular.provider == "extractive"
+        assert not short.provisional and short.retry_reason is None
+        assert lite.calls == 0
+        assert (await router.summarize(CONTENT * 10, "Поиск")).provider == "yandexgpt-lite"
+
+    @pytest.mark.asyncio
+    async def test_falls_back_and_avoids_failing_model(self):
+        """Тест: при ошибках модели берётся следующая, а затем сбойная пропускается"""
+        lite, pro = FakeProvider("yandexgpt-lite", fail=True), FakeProvider("yandexgpt")
+        router = LLMRouter([lite, pro, ExtractiveProvider()])
+
+        first = await router.summarize(CONTENT, "Поиск")
+        assert first.provider == "yandexgpt" and not first.provisional
+        for _ in range(4):
+            await router.summarize(CONTENT, "Поиск")
+
+        assert router.stats["yandexgpt-lite"].error_rate > settings.llm_router_max_error_rate
+        # Доля ошибок превысила порог после четырёх сбоев подряд, пятый запрос модель не получила
+        assert lite.calls == 4
+        assert [provider.name for provider in router.candidates()] == ["yandexgpt", "extractive"]
+
+    @pytest.mark.asyncio
+    async def test_extractive_summary_is_provisional(self):
+        """Тест: если все модели падают, резюме локальное и статья остаётся в очереди"""
+        router = LLMRouter(
+            [
+                FakeProvider("yandexgpt-lite", fail=True),
+                FakeProvider("yandexgpt", fail=True),
+                ExtractiveProvider(),
+            ]
+        )
+
+        routed = await router.summarize(CONTENT, "Поиск на PostgreSQL")
+
+        assert routed.provider == "extractive" and routed.provisional
+        assert routed.text.startswith("Мы перевели поиск на PostgreSQL.")
+        assert "Telegram" not in routed.text
+        assert "yandexgpt-lite: ConnectError" in routed.retry_reason
+
+    @pytest.mark.asyncio
+    async def test_all_models_failing_without_fallback(self):
+        """Тест: без локальной выжимки ошибка всех моделей — SummaryUnavailableError"""
+        router = LLMRouter([FakeProvider("yandexgpt-lite", fail=True)])
+
+        with pytest.raises(SummaryUnavailableError, match="ConnectError"):
+            await router.summarize(CONTENT, "Поиск")
+
+    @pytest.mark.asyncio
+    async def test_slow_model_hedged(self, monkeypatch):
+        """Тест: медленный запрос дублируется следующей модели, побеждает первый ответ"""
+        monkeypatch.setattr(settings, "llm_router_latency_budget_seconds", 0.05)
+        monkeypatch.setattr(settings, "llm_router_hedge_min_seconds", 0.01)
+        slow, fast = FakeProvider("yandexgpt-lite", delay=5), FakeProvider("yandexgpt")
+        router = LLMRouter([slow, fast, ExtractiveProvider()])
+
+        routed = await asyncio.wait_for(router.summarize(CONTENT, "Поиск"), timeout=2)
+
+        assert routed.provider == "yandexgpt"
+        assert slow.calls == fast.calls == 1
+        assert router.stats["yandexgpt-lite"].in_flight == 0
+        # Проигравший запрос учтён в задержке, и модель больше не выбирается первой
+        assert router.stats["yandexgpt-lite"].latency >= 0.1
+        assert router.candidates()[0].name == "yandexgpt"
+
+    def test_busy_model_skipped_and_probed_later(self, monkeypatch):
+        """Тест: перегруженная модель пропускается, сбойная пробуется после паузы"""
+        now = [1000.0]
+        lite, pro = FakeProvider("yandexgpt-lite"), FakeProvider("yandexgpt")
+        router = LLMRouter([lite, pro], clock=lambda: now[0])
+
+        router.stats["yandexgpt-lite"].in_flight = settings.llm_router_max_in_flight
+        assert [provider.name for provider in router.candidates()] == [
+            "yandexgpt",
+            "yandexgpt-lite",
+        ]
+
+        router.stats["yandexgpt-lite"].in_flight = 0
+        router.stats["yandexgpt-lite"].observe(1.0, ok=False, now=now[0], alpha=1.0)
+        assert not router.healthy(lite)
+        now[0] += settings.llm_router_probe_seconds
+        assert router.healthy(lite)
+
+
+class TestProviders:
+    """Тесты базового класса поставщиков"""
+
+    def test_provider_without_summarize_rejected(self):
+        """Тест: поставщик без summarize не создаётся"""
+
+        class Incomplete(SummaryProvider):
+            name = "incomplete"
+
+        with pytest.raises(TypeError):
+            Incomplete()
+        assert ExtractiveProvider().local
@@ -0,0 +1,73 @@
+"""
+Тесты метрик Prometheus
+"""
+
+from prometheus_client import REGISTRY
+from sqlalchemy import create_engine, text
+
+from app.core.config import settings
+from app.core.metrics import render_latest
+from app.database.instrumentation import (
+    current_query_stats,
+    instrument_engine,
+    normalize_statement,
+    query_scope,
+    statement_operation,
+)
+
+
+class TestDatabaseInstrumentation:
+    """Тесты замеров SQL-запросов"""
+
+    def test_statement_operation(self):
+        """Тест определения типа запроса"""
+        assert statement_operation("  SELECT 1") == "select"
+        assert statement_operation("insert into t values (1)") == "insert"
+        assert statement_operation("PRAGMA foreign_keys=ON") == "other"
+        assert statement_operation("") == "other"
+
+    def test_query_latency_recorded(self):
+        """Тест записи времени запроса в гистограмму"""
+        engine = instrument_engine(create_engine("sqlite:///:memory:"))
+
+        def select_count():
+            return (
+                REGISTRY.get_sample_value(
+                    "habrdigest_db_query_seconds_count", {"operation": "select"}
+                )
+                or 0
+            )
+
+        before = select_count()
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+            conn.execute(text("SELECT 2"))
+
+        assert select_count() == before + 2
+
+    def test_query_scope_accounting(self, monkeypatch):
+        """Тест учёта запросов и медленных запросов в области"""
+        engine = instrument_engine(create_engine("sqlite:///:memory:"))
+        monkeypatch.setattr(settings, "db_slow_query_seconds", 0.0)
+
+        with query_scope("task", "cleanup") as stats, engine.connect() as conn:
+            conn.execute(text("SELECT :value"), {"value": "secret-token"})
+            conn.execute(text("SELECT\n    2"))
+
+        assert current_query_stats() is None
+        assert stats.statements == 2
+        assert stats.db_seconds > 0
+        assert [slow.statement for slow in stats.slow] == ["SELECT ?", "SELECT 2"]
+        assert all("secret-token" not in slow.statement for slow in stats.slow)
+
+    def test_normalize_statement(self):
+        """Тест сжатия текста запроса"""
+        assert normalize_statement("SELECT *\n  FROM t\n") == "SELECT * FROM t"
+        assert normalize_statement("x" * 3000).endswith("…")
+
+    def test_render_latest(self):
+        """Тест выдачи метрик в текстовом формате"""
+        payload, content_type = render_latest()
+
+        assert content_type.startswith("text/plain")
+        assert b"habrdigest_db_query_seconds" in payload
@@ -0,0 +1,277 @@
+"""
+Тесты конвейера статей: этапы, метрики и задачи этапов
+"""
+
+import asyncio
+from datetime import UTC, datetime, timedelta
+
+import pytest
+from prometheus_client import REGISTRY
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.core.config import settings
+from app.database.models import Article, Base, Topic
+from app.services import pipeline
+from app.services.llm_router import RoutedSummary, SummaryUnavailableError
+from app.services.parser_service import ArticleService
+from celery_app import tasks
+
+
+class FakeRedis:
+    """Заглушка Redis: только SET с NX"""
+
+    def __init__(self):
+        self.values: dict[str, str] = {}
+
+    def set(self, key, value, nx=False, ex=None):
+        if nx and key in self.values:
+            return None
+        self.values[key] = value
+        return True
+
+
+@pytest.fixture
+def session_factory(monkeypatch):
+    engine = create_engine(
+        "sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False}
+    )
+    Base.metadata.create_all(bind=engine)
+    factory = sessionmaker(bind=engine, expire_on_commit=False)
+    monkeypatch.setattr(tasks, "SessionLocal", factory)
+    return factory
+
+
+def add_article(factory, status: str, topics: list[str] | None = None) -> int:
+    with factory() as session:
+        article = Article(
+            habr_id=f"{status}-{datetime.now(UTC).timestamp()}",
+            title="Индексы PostgreSQL",
+            url="https://habr.com/ru/articles/1/",
+            content="Индексы в PostgreSQL ускоряют выборки. " * 30,
+            topics=topics or ["Database"],
+            status=status,
+        )
+        session.add(article)
+        session.commit()
+        return article.id
+
+
+class TestStages:
+    """Тесты переходов между этапами и метрик"""
+
+    def test_advance_observes_time_on_previous_stage(self):
+        """Тест: переход записывает время, проведённое статьёй на прошлом этапе"""
+        now = datetime.now(UTC)
+        article = Article(
+            status=pipeline.INGESTED,
+            status_changed_at=(now - timedelta(seconds=90)).replace(tzinfo=None),
+            created_at=now - timedelta(seconds=120),
+        )
+
+        def observed(name: str, labels: dict | None = None) -> float:
+            return REGISTRY.get_sample_value(name, labels or {}) or 0
+
+        stage_before = observed("habrdigest_pipeline_stage_seconds_sum", {"stage": "fetched"})
+        pipeline.advance(article, pipeline.FETCHED, now)
+        assert observed(
+            "habrdigest_pipeline_stage_seconds_sum", {"stage": "fetched"}
+        ) - stage_before == pytest.approx(90)
+        assert article.status == pipeline.FETCHED
+        assert article.status_changed_at == now
+
+        total_before = observed("habrdigest_pipeline_total_seconds_sum")
+        pipeline.advance(article, pipeline.DELIVERABLE, now)
+        assert observed("habrdigest_pipeline_total_seconds_sum") - total_before == pytest.approx(
+            120
+        )
+
+    def test_queue_depth_counts_pending_stages(self, session_factory):
+        """Тест: глубина очереди считается по этапам, готовые статьи и копии не входят"""
+        for status in (pipeline.INGESTED, pipeline.INGESTED, pipeline.FETCHED):
+            add_article(session_factory, status)
+        add_article(session_factory, pipeline.DELIVERABLE)
+        add_article(session_factory, pipeline.DUPLICATE)
+
+        with session_factory() as session:
+            depth = pipeline.refresh_queue_depth(session)
+
+        assert depth == {
+            pipeline.INGESTED: 2,
+            pipeline.FETCHED: 1,
+            pipeline.SUMMARIZING: 0,
+            pipeline.SUMMARIZED: 0,
+        }
+        assert REGISTRY.get_sample_value(
+            "habrdigest_pipeline_queue_depth", {"stage": pipeline.INGESTED}
+        ) == pytest.approx(2)
+
+    def test_priority_and_delivery_debounce(self):
+        """Тест: статьи тем с подписчиками идут первыми, рассылка запрашивается один раз"""
+        article = Article(topics=["Database"])
+        assert pipeline.priority(article, {"Database"}) == pipeline.HIGH_PRIORITY
+        assert pipeline.priority(article, {"Python"}) == pipeline.LOW_PRIORITY
+
+        client = FakeRedis()
+        assert pipeline.claim_delivery(lambda: client)
+        assert not pipeline.claim_delivery(lambda: client)
+
+
+class TestStageTasks:
+    """Тесты задач этапов: каждая сразу ставит в очередь следующую"""
+
+    @pytest.fixture
+    def enqueued(self, monkeypatch):
+        calls: list[tuple[str, tuple, dict]] = []
+
+        def recorder(name):
+            return lambda args=(), **options: calls.append((name, args, options))
+
+        for task in (
+            tasks.fetch_article_body,
+            tasks.summarize_article,
+            tasks.publish_article,
+            tasks.send_digests_to_users,
+        ):
+            monkeypatch.setattr(task, "apply_async", recorder(task.name.rsplit(".", 1)[-1]))
+        return calls
+
+    @pytest.mark.asyncio
+    async def test_article_from_two_hubs_fetched_once(self, session_factory, enqueued, monkeypatch):
+        """Тест: статья из двух хабов одного обхода ставится на загрузку текста один раз"""
+
+        class Parser:
+            async def get_articles_by_topic(self, hub_slug, max_articles=20, raise_errors=False):
+                return [
+                    {
+                        "habr_id": "1",
+                        "title": "Индексы PostgreSQL",
+                        "url": "https://habr.com/ru/articles/1/",
+                        "author": None,
+                        "published_at": None,
+                        "content": "Индексы в PostgreSQL ускоряют выборки.",
+                        "topics": [],
+                    }
+                ]
+
+        async def get_parser():
+            return Parser()
+
+        monkeypatch.setattr(settings, "pipeline_enabled", True)
+        monkeypatch.setattr(tasks.runtime, "get_parser", get_parser)
+        with session_factory() as session:
+            topics = [
+                Topic(name="Database", slug="database", hub_slug="db"),
+                Topic(name="PostgreSQL", slug="postgresql", hub_slug="postgresql"),
+            ]
+            session.add_all(topics)
+            session.commit()
+            service = ArticleService(session)
+            for topic in topics:
+                assert await tasks._crawl_topic(topic, service) == 1
+
+        assert [name for name, _, _ in enqueued] == ["fetch_article_body"]
+
+    def test_summary_then_publish(self, session_factory, enqueued, monkeypatch):
+        """Тест: резюме переводит статью в summarized, публикация — в deliverable"""
+
+        async def summarize(content, title, low_priority=False):
+            return RoutedSummary(f"Резюме: {title}", "yandexgpt-lite")
+
+        monkeypatch.setattr(tasks.summary_router, "summarize", summarize)
+        monkeypatch.setattr(tasks.pipeline, "claim_delivery", lambda: True)
+        article_id = add_article(session_factory, pipeline.FETCHED)
+
+        tasks.summarize_article(article_id)
+        with session_factory() as session:
+            article = session.get(Article, article_id)
+            assert article.status == pipeline.SUMMARIZED
+            assert article.summary == "Резюме: Индексы PostgreSQL"
+        assert enqueued == [("publish_article", (article_id,), {"priority": pipeline.LOW_PRIORITY})]
+
+        tasks.publish_article(article_id)
+        with session_factory() as session:
+            assert session.get(Article, article_id).status == pipeline.DELIVERABLE
+        assert enqueued[-1][0] == "send_digests_to_users"
+
+    def test_stage_skips_article_on_other_stage(self, session_factory, enqueued, monkeypatch):
+        """Тест: задача этапа не трогает статью, которая ещё не дошла до него"""
+
+        async def summarize(content, title, low_priority=False):
+            raise AssertionError("summary requested before the body was fetched")
+
+        monkeypatch.setattr(tasks.summary_router, "summarize", summarize)
+        article_id = add_article(session_factory, pipeline.INGESTED)
+
+        tasks.summarize_article(article_id)
+        tasks.publish_article(article_id)
+
+        with session_factory() as session:
+            assert session.get(Article, article_id).status == pipeline.INGESTED
+        assert enqueued == []
+
+    def test_sweeper_skips_article_claimed_by_stage(self, session_factory, enqueued, monkeypatch):
+        """Тест: подметальщик не резюмирует статью, которую уже резюмирует задача этапа"""
+        calls: list[str] = []
+        sweeper = tasks.process_unprocessed_articles.run.__wrapped__
+
+        async def summarize(content, title, low_priority=False):
+            calls.append(title)
+            if len(calls) == 1:
+                # Подметальщик запускается, пока задача этапа ждёт модель
+                await asyncio.to_thread(sweeper)
+            return RoutedSummary(f"Резюме: {title}", "yandexgpt-lite")
+
+        monkeypatch.setattr(tasks.summary_router, "summarize", summarize)
+        article_id = add_article(session_factory, pipeline.FETCHED)
+
+        tasks.summarize_article(article_id)
+
+        assert calls == ["Индексы PostgreSQL"]
+        with session_factory() as session:
+            assert session.get(Article, article_id).status == pipeline.SUMMARIZED
+
+    def test_abandoned_claim_released_without_pipeline(
+        self, session_factory, enqueued, monkeypatch
+    ):
+        """Тест: без конвейера подметальщик снимает брошенный захват и резюмирует статью"""
+        monkeypatch.setattr(settings, "pipeline_enabled", False)
+        monkeypatch.setattr(settings, "pipeline_stall_minutes", 30)
+
+        async def summarize(content, title, low_priority=False):
+            return RoutedSummary(f"Резюме: {title}", "yandexgpt-lite")
+
+        monkeypatch.setattr(tasks.summary_router, "summarize", summarize)
+        article_id = add_article(session_factory, pipeline.SUMMARIZING)
+        with session_factory() as session:
+            session.get(Article, article_id).status_changed_at = datetime.now(UTC) - timedelta(
+                hours=1
+            )
+            session.commit()
+
+        tasks.process_unprocessed_articles.run.__wrapped__()
+
+        with session_factory() as session:
+            article = session.get(Article, article_id)
+            assert article.status == pipeline.SUMMARIZED
+            assert article.summary == "Резюме: Индексы PostgreSQL"
+
+    def test_failed_summary_releases_claim(self, session_factory, enqueued, monkeypatch):
+        """Тест: после неудачи статья снова ждёт в fetched и может быть захвачена"""
+
+        async def summarize(content, title, low_priority=False):
+            raise SummaryUnavailableError("all providers failed")
+
+        monkeypatch.setattr(tasks.summary_router, "summarize", summarize)
+        article_id = add_article(session_factory, pipeline.FETCHED)
+
+        tasks.summarize_article(article_id)
+
+        with session_factory() as session:
+            article = session.get(Article, article_id)
+            assert article.status == pipeline.FETCHED
+            assert article.summary_attempts == 1
+            assert pipeline.claim(session, article)
+            assert not pipeline.claim(session, article)
+        assert enqueued == []
@@ -0,0 +1,94 @@
+"""
+Тесты профилирования по настройкам
+"""
+
+import time
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.admin import router as admin_router
+from app.core.config import settings
+from app.core.profiling import list_profiles, profile, should_profile
+
+
+def busy_wait(seconds: float) -> None:
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+class TestProfiling:
+    """Тесты выбора целей, сэмплера и ротации профилей"""
+
+    def test_should_profile(self, monkeypatch):
+        """Тест: задачи совпадают по полному и короткому имени, ручки — по шаблону"""
+        monkeypatch.setattr(settings, "profiling_tasks", ["parse_habr_articles"])
+        monkeypatch.setattr(settings, "profiling_routes", ["/api/database/statistics"])
+        monkeypatch.setattr(settings, "profiling_sample_rate", 1.0)
+
+        assert should_profile("task", "celery_app.tasks.parse_habr_articles")
+        assert not should_profile("task", "celery_app.tasks.send_digests_to_users")
+        assert should_profile("route", "/api/database/statistics")
+        assert not should_profile("route", "/api/database/logs")
+
+        monkeypatch.setattr(settings, "profiling_sample_rate", 0.0)
+        assert not should_profile("task", "celery_app.tasks.parse_habr_articles")
+
+    def test_sampling_profile_rotated_and_listed(self, tmp_path, monkeypatch):
+        """Тест: сэмплер пишет свёрнутые стеки, лишние файлы удаляются"""
+        monkeypatch.setattr(settings, "profiling_dir", str(tmp_path))
+        monkeypatch.setattr(settings, "profiling_engine", "sampling")
+        monkeypatch.setattr(settings, "profiling_interval_ms", 1.0)
+        monkeypatch.setattr(settings, "profiling_max_files", 2)
+
+        for _ in range(3):
+            with profile("task", "celery_app.tasks.parse_habr_articles"):
+                busy_wait(0.05)
+
+        profiles = list_profiles()
+        assert len(profiles) == 2
+        assert "busy_wait" in (tmp_path / profiles[0].name).read_text(encoding="utf-8")
+
+        monkeypatch.setattr(settings, "admin_api_token", "secret")
+        app = FastAPI()
+        app.include_router(admin_router)
+        client = TestClient(app, headers={"X-Admin-Token": "secret"})
+        listed = client.get("/api/admin/profiles").json()
+        assert [item["name"] for item in listed["profiles"]] == [p.name for p in profiles]
+        assert client.get(f"/api/admin/profiles/{profiles[0].name}").status_code == 200
+        assert client.get("/api/admin/profiles/..%2Fsecret.prof").status_code == 404
+
+    def test_admin_routes_require_token(self, tmp_path, monkeypatch):
+        """Тест: без ADMIN_API_TOKEN ручки закрыты, с неверным токеном — 401"""
+        monkeypatch.setattr(settings, "profiling_dir", str(tmp_path))
+        app = FastAPI()
+        app.include_router(admin_router)
+        client = TestClient(app)
+
+        monkeypatch.setattr(settings, "admin_api_token", "")
+        assert client.get("/api/admin/profiles").status_code == 403
+        assert client.get("/api/admin/locks", headers={"X-Admin-Token": ""}).status_code == 403
+
+        monkeypatch.setattr(settings, "admin_api_token", "secret")
+        assert client.get("/api/admin/profiles").status_code == 401
+        assert client.get("/api/admin/locks", headers={"X-Admin-Token": "wrong"}).status_code == 401
+        assert (
+            client.get("/api/admin/profiles", headers={"X-Admin-Token": "secret"}).status_code
+            == 200
+        )
+
+    def test_overlapping_cprofile_profiles_skipped(self, tmp_path, monkeypatch):
+        """Тест: профиль cProfile, начатый во время другого, пропускается без ошибки"""
+        monkeypatch.setattr(settings, "profiling_dir", str(tmp_path))
+        monkeypatch.setattr(settings, "profiling_engine", "cprofile")
+
+        with profile("route", "GET /first"), profile("route", "GET /second"):
+            busy_wait(0.01)
+        profiles = list_profiles()
+        assert len(profiles) == 1
+        assert "first" in profiles[0].name
+
+        with profile("route", "GET /third"):
+            busy_wait(0.01)
+        assert len(list_profiles()) == 2
@@ -0,0 +1,77 @@
+"""
+Тесты промптов в пределах бюджета токенов
+"""
+
+from app.services.prompting import (
+    SUMMARY,
+    TokenEstimator,
+    build_prompt,
+    select_sentences,
+    split_sentences,
+)
+
+CONTENT = (
+    "Мы перевели сервис поиска с Elasticsearch на PostgreSQL. "
+    "Полнотекстовый индекс PostgreSQL оказался достаточно быстрым для нашего объёма. "
+    "Подписывайтесь на наш Telegram-канал, там больше новостей. "
+    "Вчера была хорошая погода, и мы долго гуляли в парке. "
+    "Главный выигрыш от перехода на PostgreSQL — один источник данных вместо двух. "
+    "Поиск по индексу PostgreSQL укладывается в десять миллисекунд. "
+    "Подробности смотрите на https://example.com/blog."
+)
+
+
+class TestSentenceSelection:
+    """Тесты отбора предложений"""
+
+    def test_sentences_kept_whole_and_in_order(self):
+        """Тест: вступление сохраняется, служебные фразы отброшены, порядок исходный"""
+        estimator = TokenEstimator()
+        sentences, total = select_sentences(
+            CONTENT, "Поиск на PostgreSQL", budget=70, estimator=estimator, lead=1
+        )
+
+        assert total == 7
+        assert sentences[0] == split_sentences(CONTENT)[0]
+        assert all(sentence in split_sentences(CONTENT) for sentence in sentences)
+        assert sentences == sorted(sentences, key=CONTENT.index)
+        assert not any("Telegram" in sentence or "https" in sentence for sentence in sentences)
+        assert "Вчера была хорошая погода, и мы долго гуляли в парке." not in sentences
+        assert sum(estimator.estimate(sentence) + 1 for sentence in sentences) <= 70
+
+    def test_long_sentence_cut_at_word(self):
+        """Тест: если не помещается даже одно предложение, оно обрезается по слову"""
+        (sentence,), _ = select_sentences(
+            "слово " * 100, "", budget=10, estimator=TokenEstimator(), lead=1
+        )
+
+        assert sentence.endswith("слово…")
+        assert len(sentence) <= 41
+
+
+class TestPromptBuilding:
+    """Тесты сборки промпта и оценки токенов"""
+
+    def test_budget_per_model(self, monkeypatch):
+        """Тест: для модели с меньшим бюджетом в промпт входит меньше текста"""
+        from app.core.config import settings
+
+        monkeypatch.setattr(settings, "yandex_prompt_budgets", {"small": 40, "large": 1000})
+        content = " ".join(f"Предложение номер {i} про PostgreSQL и индексы." for i in range(50))
+
+        small = build_prompt(SUMMARY, "PostgreSQL", content, "small", TokenEstimator())
+        large = build_prompt(SUMMARY, "PostgreSQL", content, "large", TokenEstimator())
+
+        assert small.sentences_used < large.sentences_used <= large.sentences_total == 50
+        assert small.estimated_tokens < large.estimated_tokens
+        assert small.max_tokens == SUMMARY.max_tokens
+
+    def test_estimator_calibration(self):
+        """Тест: поправка сходится к фактическому расходу и ограничена"""
+        estimator = TokenEstimator(alpha=0.5)
+        for _ in range(20):
+            estimator.observe(estimator.estimate("x" * 400), 150)
+
+        assert 140 <= estimator.estimate("x" * 400) <= 160
+        estimator.observe(100, 10_000)
+        assert estimator.ratio <= 2.0
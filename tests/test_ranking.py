@@ -0,0 +1,89 @@
+"""
+Тесты ранжирования статей для дайджестов
+"""
+
+from collections import Counter
+from datetime import UTC, datetime, timedelta
+
+from app.database.models import Article
+from app.services.parser_service import HabrParser
+from app.services.ranking import ArticleRanker, RankingRow
+
+NOW = datetime(2026, 1, 10, tzinfo=UTC)
+
+
+def article(article_id: int, topics: list[str], hours: float = 1, **fields) -> Article:
+    return Article(
+        id=article_id,
+        habr_id=str(article_id),
+        title="t",
+        url="u",
+        topics=topics,
+        created_at=NOW - timedelta(hours=hours),
+        **fields,
+    )
+
+
+class TestArticleRanker:
+    """Тесты векторного ранжирования"""
+
+    def setup_method(self):
+        self.ranker = ArticleRanker(
+            half_life_hours=24,
+            weight_match=1.0,
+            weight_history=0.5,
+            weight_quality=0.5,
+            batch_rows=2,
+        )
+
+    def test_fresh_and_rated_articles_first(self):
+        """Тест: свежая статья выше старой, рейтинговая выше нерейтинговой"""
+        articles = [
+            article(1, ["Python"], hours=72),
+            article(2, ["Python"], hours=1),
+            article(3, ["Python"], hours=1, rating=80, views=50_000),
+            article(4, ["DevOps"], hours=1),
+        ]
+
+        (ranked,) = self.ranker.rank(
+            [RankingRow(1, "Python")], articles, {1: {"Python"}}, {}, top_k=10, now=NOW
+        )
+
+        assert ranked == [3, 2, 1]
+
+    def test_rows_ranked_in_batches(self):
+        """Тест: у каждой строки свои темы и история, top_k соблюдается"""
+        articles = [
+            article(1, ["Python", "Machine Learning"]),
+            article(2, ["Python"]),
+            article(3, ["Python", "DevOps"]),
+            article(4, ["DevOps"]),
+        ]
+        rows = [RankingRow(1, "Python"), RankingRow(2, "Python"), RankingRow(3, "DevOps")]
+        user_topics = {1: {"Python"}, 2: {"Python", "DevOps"}, 3: {"DevOps"}}
+        history = {1: Counter({"Machine Learning": 3})}
+
+        first, second, third = self.ranker.rank(
+            rows, articles, user_topics, history, top_k=2, now=NOW
+        )
+
+        assert first == [1, 2]
+        assert second[0] == 3
+        assert len(second) == 2
+        assert third == [4, 3]
+
+    def test_empty_candidates(self):
+        """Тест: без статей каждой строке достаётся пустой список"""
+        assert self.ranker.rank([RankingRow(1, "Python")], [], {}, {}, top_k=3) == [[]]
+
+
+class TestCounterParsing:
+    """Тесты разбора счётчиков карточки статьи"""
+
+    def test_parse_counter(self):
+        """Тест: рейтинг со знаком и сокращённые просмотры"""
+        assert HabrParser._parse_counter("+42") == 42
+        assert HabrParser._parse_counter("-3") == -3
+        assert HabrParser._parse_counter("1.2K") == 1200
+        assert HabrParser._parse_counter("3,5М") == 3_500_000
+        assert HabrParser._parse_counter("—") is None
@@ -0,0 +1,158 @@
+"""
+Тесты семантического индекса пользовательских тем
+"""
+
+import pytest
+
+from app.core.config import settings
+from app.database.models import Article, Topic
+from app.services import parser_service
+from app.services.database_service import DatabaseService
+from app.services.semantic import SemanticIndex, article_text
+
+CORPUS = [
+    (
+        "Биткоин и блокчейн: как устроены криптовалютные биржи",
+        "Разбираем стакан заявок, холодные кошельки и почему курс криптовалюты так волатилен",
+    ),
+    (
+        "Майнинг криптовалют на видеокартах: окупаемость и налоги",
+        "Считаем расходы на электричество и сравниваем доходность майнинга биткоина и эфира",
+    ),
+    (
+        "Как мы ускорили PostgreSQL: индексы и планировщик",
+        "Статистика по колонкам, селективность условий и выбор индексного сканирования",
+    ),
+    (
+        "Асинхронный Python: event loop, корутины и задачи asyncio",
+        "Как работает цикл событий и почему блокирующий вызов останавливает все корутины",
+    ),
+    (
+        "Kubernetes для начинающих: поды, деплойменты и сервисы",
+        "Разворачиваем приложение в кластере и настраиваем автомасштабирование подов",
+    ),
+    (
+        "React hooks без боли: useEffect и useMemo",
+        "Оптимизация рендеринга компонентов и типичные ошибки с зависимостями хуков",
+    ),
+    (
+        "Docker-образы меньше в десять раз",
+        "Многоэтапная сборка, distroless-образы и кеширование слоёв при сборке контейнеров",
+    ),
+    (
+        "Смарт-контракты на Solidity: аудит безопасности",
+        "Повторный вход, переполнения и другие уязвимости контрактов в сети эфира",
+    ),
+]
+
+
+def corpus_articles(copies: int = 1) -> list[Article]:
+    return [
+        Article(id=i, habr_id=str(i), title=title, url="u", content=content)
+        for i, (title, content) in enumerate(CORPUS * copies, 1)
+    ]
+
+
+def article_data(habr_id: str, title: str, content: str) -> dict:
+    return {
+        "habr_id": habr_id,
+        "title": title,
+        "url": f"https://habr.com/ru/articles/{habr_id}/",
+        "author": None,
+        "published_at": None,
+        "content": content,
+        "topics": ["Хаб"],
+        "simhash": None,
+    }
+
+
+class TestSemanticIndex:
+    """Тесты векторов и приближённого поиска"""
+
+    def test_topic_finds_related_articles(self):
+        """Тест: тема находит статьи по словам с другими окончаниями"""
+        index = SemanticIndex(dimensions=512)
+        index.add(corpus_articles())
+
+        found = [
+            article_id
+            for article_id, _ in index.search(
+                index.embed("Криптовалюты"), k=3, min_similarity=settings.semantic_min_similarity
+            )
+        ]
+
+        assert set(found[:2]) == {1, 2}
+        assert 3 not in found and 4 not in found
+
+    def test_clustered_search_matches_exact(self, monkeypatch):
+        """Тест: поиск по спискам k-means находит те же статьи, что и полный перебор"""
+        monkeypatch.setattr(settings, "semantic_min_train_rows", 16)
+        articles = corpus_articles(copies=8)
+        clustered = SemanticIndex(dimensions=512, probes=2)
+        clustered.add(articles)
+        exact = SemanticIndex(dimensions=512)
+        monkeypatch.setattr(settings, "semantic_min_train_rows", 10_000)
+        exact.add(articles)
+
+        assert clustered.centroids is not None
+        assert exact.centroids is None
+        for query in ("Криптовалюты", "PostgreSQL", "Kubernetes"):
+            assert {
+                article_id for article_id, _ in clustered.search(clustered.embed(query), 8, 0.2)
+            } == {article_id for article_id, _ in exact.search(exact.embed(query), 8, 0.2)}
+
+    def test_sync_loads_every_new_article(self, db_session, monkeypatch):
+        """Тест: догрузка не пропускает статьи, если новых больше SEMANTIC_MAX_ARTICLES"""
+        monkeypatch.setattr(settings, "semantic_max_articles", 3)
+        articles = corpus_articles(copies=2)
+        db_session.add_all(articles[:2])
+        db_session.commit()
+        index = SemanticIndex(dimensions=512)
+        db_service = DatabaseService(db_session)
+
+        index.sync(db_service)
+        assert index.article_ids == [1, 2]
+
+        db_session.add_all(articles[2:])
+        db_session.commit()
+        index.sync(db_service)
+
+        assert index.article_ids == list(range(1, len(articles) + 1))
+        assert index.last_article_id == len(articles)
+
+
+class TestCustomTopicTagging:
+    """Тесты подбора пользовательских тем при сохранении статей"""
+
+    @pytest.mark.asyncio
+    async def test_new_article_gets_custom_topic(self, db_session, monkeypatch):
+        """Тест: новая статья о криптовалюте получает пользовательскую тему, другая — нет"""
+        monkeypatch.setattr(parser_service, "semantic_index", SemanticIndex(dimensions=512))
+        db_session.add(Topic(name="Криптовалюты", slug="kriptovaliuty", is_custom=True))
+        db_session.add_all(corpus_articles())
+        db_session.commit()
+        service = parser_service.ArticleService(db_session)
+
+        crypto = await service.save_article(
+            article_data(
+                "101",
+                "Криптовалютный кошелёк своими руками",
+                "Как хранить биткоин и эфир: ключи, сид-фразы и аппаратные кошельки",
+            )
+        )
+        database = await service.save_article(
+            article_data(
+                "102",
+                "Индексы в PostgreSQL на практике",
+                "Когда планировщик выбирает индексное сканирование и как это проверить",
+            )
+        )
+
+        assert crypto.topics == ["Хаб", "Криптовалюты"]
+        assert database.topics == ["Хаб"]
+        assert len(parser_service.semantic_index) == len(CORPUS) + 2
+
+    def test_article_text_weights_title(self):
+        """Тест: заголовок входит в текст дважды"""
+        article = Article(title="Заголовок", content="текст")
+        assert article_text(article) == "Заголовок Заголовок текст"
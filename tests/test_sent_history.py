@@ -0,0 +1,172 @@
+"""
+Тесты истории отправленных статей
+"""
+
+import redis
+from redis.commands.core import BitFieldOperation
+from sqlalchemy.orm import Session
+
+from app.database.models import Article, User
+from app.services.database_service import DatabaseService
+from app.services.sent_history import KEY_PREFIX, SentHistory, bloom_parameters
+
+
+class FakeRedis:
+    """Заглушка Redis: BITFIELD с GET и SET над u1, EXISTS, DELETE, EXPIRE и конвейер"""
+
+    def __init__(self):
+        self.bits: dict[str, set[int]] = {}
+        self.expires: dict[str, int] = {}
+
+    def bitfield(self, key: str) -> BitFieldOperation:
+        return BitFieldOperation(self, key)
+
+    def execute_command(self, command: str, *args):
+        assert command == "BITFIELD"
+        key, *ops = args
+        bits = self.bits.setdefault(key, set())
+        replies = []
+        while ops:
+            op, encoding, offset, *rest = ops
+            assert encoding == "u1"
+            replies.append(int(offset in bits))
+            if op == "SET":
+                (value,), ops = rest[:1], rest[1:]
+                if value:
+                    bits.add(offset)
+                else:
+                    bits.discard(offset)
+            else:
+                assert op == "GET"
+                ops = rest
+        return replies
+
+    def expire(self, key: str, seconds: int) -> bool:
+        self.expires[key] = seconds
+        return True
+
+    def exists(self, *keys: str) -> int:
+        return sum(1 for key in keys if self.bits.get(key))
+
+    def delete(self, *keys: str) -> int:
+        return sum(1 for key in keys if self.bits.pop(key, None) is not None)
+
+    def pipeline(self, transaction: bool = True) -> "FakePipeline":
+        return FakePipeline(self)
+
+
+class FakePipeline:
+    """Конвейер заглушки: команды выполняются по execute"""
+
+    def __init__(self, client: FakeRedis):
+        self.client = client
+        self.calls: list = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def execute_command(self, *args):
+        self.calls.append(lambda: self.client.execute_command(*args))
+
+    def expire(self, key: str, seconds: int):
+        self.calls.append(lambda: self.client.expire(key, seconds))
+
+    def execute(self) -> list:
+        return [call() for call in self.calls]
+
+
+def make_db(session: Session, count: int) -> tuple[DatabaseService, User, list[Article]]:
+    user = User(telegram_id=1)
+    articles = [Article(habr_id=str(i), title="t", url="u") for i in range(count)]
+    session.add_all([user, *articles])
+    session.commit()
+    return DatabaseService(session), user, articles
+
+
+class TestSentHistory:
+    """Тесты Bloom-фильтра и проверки через базу"""
+
+    def test_bloom_parameters(self):
+        """Тест размера фильтра: около 9.6 бита и 7 хешей на элемент при 1% ошибок"""
+        bits, hashes = bloom_parameters(2000, 0.01)
+
+        assert 19000 < bits < 19300
+        assert hashes == 7
+        positions = SentHistory(capacity=2000, error_rate=0.01).positions(42)
+        assert len(positions) == 7
+        assert all(0 <= position < bits for position in positions)
+
+    def test_database_fallback_without_redis(self, db_session):
+        """Тест: без Redis отправленные статьи отсеиваются по базе"""
+        db_service, user, articles = make_db(db_session, 5)
+        db_service.mark_articles_sent(user.id, [articles[1].id, articles[3].id])
+
+        history = SentHistory(lambda: redis.Redis(port=1, socket_connect_timeout=0.1))
+        unsent = history.filter_unsent(db_service, user.id, [article.id for article in articles])
+
+        assert unsent == [articles[0].id, articles[2].id, articles[4].id]
+
+
+class TestSentHistoryFilter:
+    """Тесты фильтра в Redis: запись битов, разбор ответов, поколения и прогрев"""
+
+    def test_recorded_articles_dropped(self, db_session):
+        """Тест: после record_sent отправленные статьи отсеиваются, остальные остаются"""
+        db_service, user, articles = make_db(db_session, 6)
+        ids = [article.id for article in articles]
+        client = FakeRedis()
+        history = SentHistory(lambda: client, capacity=100, error_rate=0.01)
+
+        assert history.filter_unsent(db_service, user.id, ids) == ids
+
+        db_service.mark_articles_sent(user.id, ids[1:3])
+        history.record_sent(user.id, ids[1:3])
+
+        assert history.filter_unsent(db_service, user.id, ids) == [ids[0], *ids[3:]]
+        assert history._might_contain(user.id, ids) >= set(ids[1:3])
+
+    def test_false_positive_checked_in_database(self, db_session):
+        """Тест: статья, которую фильтр считает отправленной, но в базе её нет, остаётся"""
+        db_service, user, articles = make_db(db_session, 3)
+        ids = [article.id for article in articles]
+        client = FakeRedis()
+        history = SentHistory(lambda: client, capacity=100, error_rate=0.01)
+
+        # Биты записаны, а отметки в базе нет — как при ложном срабатывании
+        history.record_sent(user.id, [ids[0]])
+
+        assert history.filter_unsent(db_service, user.id, ids) == ids
+
+    def test_generation_rotation(self):
+        """Тест: отправка видна в следующем поколении и исчезает через одно"""
+        now = [1_000_000_000.0]
+        client = FakeRedis()
+        history = SentHistory(lambda: client, capacity=100, error_rate=0.01, clock=lambda: now[0])
+        history.record_sent(7, [42])
+        current, _ = history._keys(7)
+        assert current.startswith(f"{KEY_PREFIX}7:")
+        assert client.expires[current] == 2 * history.window_seconds
+
+        now[0] += history.window_seconds
+        assert history._keys(7)[1] == current
+        assert history._might_contain(7, [42, 43]) == {42}
+
+        now[0] += history.window_seconds
+        assert history._might_contain(7, [42]) == set()
+
+    def test_warm_up_from_database(self, db_session):
+        """Тест: пустой фильтр заполняется из sent_articles при первой проверке"""
+        db_service, user, articles = make_db(db_session, 4)
+        ids = [article.id for article in articles]
+        db_service.mark_articles_sent(user.id, [ids[0], ids[2]])
+        client = FakeRedis()
+        history = SentHistory(lambda: client, capacity=100, error_rate=0.01)
+
+        assert history.filter_unsent(db_service, user.id, ids) == [ids[1], ids[3]]
+
+        current, _ = history._keys(user.id)
+        assert history.bits in client.bits[current]
+        assert history._might_contain(user.id, [ids[0], ids[2]]) == {ids[0], ids[2]}
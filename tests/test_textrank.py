@@ -0,0 +1,45 @@
+"""
+Тесты локальной выжимки TextRank
+"""
+
+from app.services.textrank import rank_sentences, summarize
+
+ARTICLE = (
+    "Мы перевели полнотекстовый поиск с Elasticsearch на PostgreSQL. "
+    "Индексы GIN в PostgreSQL ускорили полнотекстовый поиск в несколько раз. "
+    "Вчера в офисе отмечали день рождения коллеги. "
+    "Полнотекстовый поиск в PostgreSQL использует словари русского языка. "
+    "Подписывайтесь на наш Telegram-канал. "
+    "На обед у нас была пицца с грибами. "
+    "Поддерживать один PostgreSQL проще, чем отдельный кластер Elasticsearch для поиска."
+)
+
+
+class TestTextRank:
+    """Тесты ранжирования предложений и выжимки"""
+
+    def test_central_sentences_selected(self):
+        """Тест: в выжимку идут предложения о главной теме, в исходном порядке"""
+        summary = summarize(ARTICLE, "Поиск на PostgreSQL", max_sentences=3)
+
+        assert summary.startswith("Мы перевели полнотекстовый поиск")
+        assert summary.count(".") == 3
+        assert "пицца" not in summary and "день рождения" not in summary
+        assert "Telegram" not in summary
+
+    def test_scores_form_distribution(self):
+        """Тест: оценки — распределение, несвязанное предложение ниже связанных"""
+        sentences = [
+            "Кэш ускоряет ответы сервиса.",
+            "Сервис отвечает быстрее с кэшем.",
+            "Кот спит на подоконнике.",
+        ]
+        scores = rank_sentences(sentences)
+
+        assert abs(scores.sum() - 1) < 1e-4
+        assert scores[2] < min(scores[0], scores[1])
+
+    def test_short_text_returned_whole(self):
+        """Тест: текст не длиннее выжимки возвращается целиком, пустой — заголовком"""
+        assert summarize("Одно предложение.", "Заголовок", max_sentences=3) == "Одно предложение."
+        assert summarize("", "Заголовок") == "Заголовок"
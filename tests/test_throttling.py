@@ -0,0 +1,75 @@
+"""
+Тесты лимитера и кэша диагностических команд
+"""
+
+import asyncio
+
+import pytest
+
+from app.bot.throttling import RateLimiter
+from app.core.cache import ResultCache
+
+
+class FakeClock:
+    """Управляемые часы для тестов"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestRateLimiter:
+    """Тесты корзины токенов"""
+
+    def test_burst_then_reject(self):
+        """После исчерпания корзины вызовы отклоняются до пополнения"""
+        clock = FakeClock()
+        limiter = RateLimiter(capacity=2, refill_seconds=10, clock=clock)
+
+        assert limiter.check(1, "test_ai") == 0
+        assert limiter.check(1, "test_ai") == 0
+        assert limiter.check(1, "test_ai") == pytest.approx(10)
+
+        clock.now = 10
+        assert limiter.check(1, "test_ai") == 0
+
+        snapshot = limiter.snapshot()
+        assert snapshot["allowed"]["test_ai"] == 3
+        assert snapshot["rejected"]["test_ai"] == 1
+
+    def test_users_and_commands_are_independent(self):
+        """Лимит считается отдельно для каждой пары пользователь-команда"""
+        limiter = RateLimiter(capacity=1, refill_seconds=60, clock=FakeClock())
+
+        assert limiter.check(1, "test_ai") == 0
+        assert limiter.check(2, "test_ai") == 0
+        assert limiter.check(1, "test_parsing") == 0
+        assert limiter.check(1, "test_ai") > 0
+
+
+class TestResultCache:
+    """Тесты кэша результатов"""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_misses_share_one_fetch(self):
+        """Одновременные запросы получают результат одного обращения"""
+        clock = FakeClock()
+        cache = ResultCache(ttl_seconds=60, clock=clock)
+        calls = 0
+
+        async def fetch():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return ["article"]
+
+        results = await asyncio.gather(*(cache.get_or_fetch("latest", fetch) for _ in range(5)))
+
+        assert results == [["article"]] * 5
+        assert calls == 1
+
+        clock.now = 61
+        await cache.get_or_fetch("latest", fetch)
+        assert calls == 2
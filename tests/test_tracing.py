@@ -0,0 +1,60 @@
+"""
+Тесты трассировки этапов
+"""
+
+import asyncio
+import json
+
+import pytest
+
+from app.core.config import settings
+from app.core.tracing import span
+
+
+class TestTracing:
+    """Тесты спанов и сумм по этапам"""
+
+    def test_stage_seconds_aggregated_in_root(self):
+        """Тест: время спанов с этапом суммируется в корневом спане"""
+
+        async def crawl():
+            with span("crawl.topic", topic="python"):
+                with span("habr.fetch", stage="fetch"):
+                    await asyncio.sleep(0.02)
+                with span("habr.parse", stage="parse"):
+                    pass
+                for _ in range(2):
+                    with span("db.save_article", stage="db"):
+                        await asyncio.sleep(0.01)
+
+        with span("parse_habr_articles") as trace:
+            asyncio.run(crawl())
+
+        stages = trace.stage_seconds()
+        assert stages["fetch"] >= 0.02
+        assert stages["db"] >= 0.02
+        assert stages["summarize"] == 0
+        assert len(trace.finished) == 6
+        assert {item.trace_id for item in trace.finished} == {trace.trace_id}
+
+    def test_export_otlp_json(self, tmp_path, monkeypatch):
+        """Тест: трасса выгружается одной строкой OTLP/JSON и продолжает traceparent"""
+        trace_file = tmp_path / "traces.jsonl"
+        monkeypatch.setattr(settings, "tracing_file", str(trace_file))
+        traceparent = "00-" + "a" * 32 + "-" + "b" * 16 + "-01"
+
+        with (
+            pytest.raises(ValueError),
+            span("crawl_topics", traceparent=traceparent, parsing_log_id=7),
+            span("habr.fetch", stage="fetch"),
+        ):
+            raise ValueError("boom")
+
+        (line,) = trace_file.read_text(encoding="utf-8").splitlines()
+        spans = json.loads(line)["resourceSpans"][0]["scopeSpans"][0]["spans"]
+        fetch, root = spans
+        assert root["traceId"] == "a" * 32
+        assert root["parentSpanId"] == "b" * 16
+        assert fetch["parentSpanId"] == root["spanId"]
+        assert fetch["status"] == {"code": 2, "message": "ValueError: boom"}
+        assert {"key": "parsing_log_id", "value": {"intValue": "7"}} in root["attributes"]
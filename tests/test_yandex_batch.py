@@ -0,0 +1,118 @@
+"""
+Тесты пакетной генерации резюме через отложенный режим YandexGPT
+"""
+
+import itertools
+
+import pytest
+import pytest_asyncio
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from app.core.config import settings
+from app.services.yandex_service import YandexGPTService, YandexHTTPError, YandexOperationError
+
+ARTICLES = [
+    (1, "PostgreSQL", "Индексы в PostgreSQL ускоряют выборки."),
+    (2, "Kubernetes", "Поды в Kubernetes перезапускаются сами."),
+    (3, "Сломанная", "Эта статья ломает модель."),
+    (4, "Отклонённая", "Эту статью API не принимает."),
+]
+
+
+class FakeOperationsServer:
+    """Заглушка completionAsync и operations: операция готова после нескольких опросов"""
+
+    def __init__(self, polls_until_done: int = 2):
+        self.polls_until_done = polls_until_done
+        self.ids = itertools.count(1)
+        self.operations: dict[str, dict] = {}
+        self.polls: dict[str, int] = {}
+        self.flaky_polls = 1
+
+        app = web.Application()
+        app.router.add_post("/completionAsync", self.submit)
+        app.router.add_get("/operations/{operation_id}", self.operation)
+        self.server = TestServer(app)
+
+    async def submit(self, request):
+        text = (await request.json())["messages"][0]["text"]
+        if "Отклонённая" in text:
+            return web.json_response({"message": "bad request"}, status=400)
+        operation_id = f"op{next(self.ids)}"
+        self.operations[operation_id] = {"text": text}
+        self.polls[operation_id] = 0
+        return web.json_response({"id": operation_id, "done": False})
+
+    async def operation(self, request):
+        operation_id = request.match_info["operation_id"]
+        if self.flaky_polls:
+            # Временный сбой опроса не должен терять операцию
+            self.flaky_polls -= 1
+            return web.json_response({"message": "unavailable"}, status=503)
+        self.polls[operation_id] += 1
+        if self.polls[operation_id] < self.polls_until_done:
+            return web.json_response({"id": operation_id, "done": False})
+        text = self.operations[operation_id]["text"]
+        if "Сломанная" in text:
+            return web.json_response(
+                {"id": operation_id, "done": True, "error": {"code": 13, "message": "internal"}}
+            )
+        title = text.split("Заголовок: ", 1)[1].split("\n", 1)[0]
+        return web.json_response(
+            {
+                "id": operation_id,
+                "done": True,
+                "response": {
+                    "alternatives": [
+                        {"message": {"role": "assistant", "text": f" Резюме: {title} "}}
+                    ],
+                    "usage": {"inputTextTokens": "80", "completionTokens": "20"},
+                },
+            }
+        )
+
+
+@pytest_asyncio.fixture
+async def fake_server():
+    fake = FakeOperationsServer()
+    await fake.server.start_server()
+    yield fake
+    await fake.server.close()
+
+
+def service_for(fake: FakeOperationsServer) -> YandexGPTService:
+    service = YandexGPTService()
+    service.async_url = str(fake.server.make_url("/completionAsync"))
+    service.operations_url = str(fake.server.make_url("/operations"))
+    return service
+
+
+class TestBatchSummaries:
+    """Тесты отправки операций, опроса и сбора результатов"""
+
+    @pytest.mark.asyncio
+    async def test_results_written_only_for_finished_operations(self, fake_server, monkeypatch):
+        """Тест: готовые операции дают резюме, ошибочные и отклонённые — типизированные ошибки"""
+        monkeypatch.setattr(settings, "yandex_batch_poll_seconds", 0.01)
+
+        summaries, errors = await service_for(fake_server).generate_summaries_batch(ARTICLES)
+
+        assert summaries == {1: "Резюме: PostgreSQL", 2: "Резюме: Kubernetes"}
+        assert isinstance(errors[3], YandexOperationError)
+        assert isinstance(errors[4], YandexHTTPError) and errors[4].status == 400
+        assert len(fake_server.operations) == 3
+        assert all(polls == fake_server.polls_until_done for polls in fake_server.polls.values())
+
+    @pytest.mark.asyncio
+    async def test_unfinished_operations_dropped_after_timeout(self, fake_server, monkeypatch):
+        """Тест: операции, не завершившиеся за отведённое время, в результат не попадают"""
+        monkeypatch.setattr(settings, "yandex_batch_poll_seconds", 0.01)
+        monkeypatch.setattr(settings, "yandex_batch_timeout_seconds", 0.05)
+        fake_server.polls_until_done = 10_000
+
+        summaries, errors = await service_for(fake_server).generate_summaries_batch(ARTICLES[:2])
+
+        assert summaries == {}
+        assert set(errors) == {1, 2}
+        assert all(polls > 0 for polls in fake_server.polls.values())
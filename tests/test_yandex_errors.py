@@ -0,0 +1,168 @@
+"""
+Тесты обработки ошибок YandexGPT и очереди повторов резюме
+"""
+
+import asyncio
+from datetime import UTC, datetime, timedelta
+
+import httpx
+import pytest
+
+from app.core.circuit import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+from app.core.config import settings
+from app.database.models import Article
+from app.services.database_service import DatabaseService
+from app.services.yandex_service import (
+    YandexCircuitOpenError,
+    YandexGPTService,
+    YandexHTTPError,
+)
+
+COMPLETION = {
+    "result": {
+        "alternatives": [{"message": {"text": " Резюме статьи "}}],
+        "usage": {"inputTextTokens": "100", "completionTokens": "20"},
+    }
+}
+
+
+def service_with(statuses: list[int]) -> tuple[YandexGPTService, list[int]]:
+    """Сервис, которому API отвечает статусами по очереди, и список сделанных запросов"""
+    calls: list[int] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        status = statuses[min(len(calls), len(statuses) - 1)]
+        calls.append(status)
+        if status == 200:
+            return httpx.Response(200, json=COMPLETION)
+        return httpx.Response(status, json={"error": "fail"}, headers={"Retry-After": "0"})
+
+    service = YandexGPTService()
+    service._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return service, calls
+
+
+class TestTypedErrors:
+    """Тесты повторов и размыкателя при вызове API"""
+
+    @pytest.mark.asyncio
+    async def test_transient_errors_retried(self, monkeypatch):
+        """Тест: 429 и 503 повторяются, после успеха возвращается текст ответа"""
+        monkeypatch.setattr(settings, "yandex_retry_base_seconds", 0)
+        service, calls = service_with([429, 503, 200])
+
+        assert await service.generate_summary("Текст статьи.", "Заголовок") == "Резюме статьи"
+        assert calls == [429, 503, 200]
+
+    @pytest.mark.asyncio
+    async def test_client_error_raised_without_retry(self):
+        """Тест: 400 не повторяется и не превращается в текст резюме"""
+        service, calls = service_with([400, 200])
+
+        with pytest.raises(YandexHTTPError) as error:
+            await service.generate_summary("Текст статьи.", "Заголовок")
+
+        assert error.value.status == 400
+        assert not error.value.retryable
+        assert calls == [400]
+
+    @pytest.mark.asyncio
+    async def test_open_circuit_skips_requests(self, monkeypatch):
+        """Тест: после серии сбоев вызовы отклоняются без запроса к API"""
+        monkeypatch.setattr(settings, "yandex_max_retries", 0)
+        service, calls = service_with([500])
+        service.breaker = CircuitBreaker("test", failure_threshold=2, reset_seconds=60)
+
+        for _ in range(2):
+            with pytest.raises(YandexHTTPError):
+                await service.generate_summary("Текст статьи.", "Заголовок")
+        with pytest.raises(YandexCircuitOpenError):
+            await service.generate_summary("Текст статьи.", "Заголовок")
+
+        assert len(calls) == 2
+
+    def test_breaker_probe_after_pause(self):
+        """Тест: после паузы проходит один пробный вызов, успех закрывает цепь"""
+        now = [0.0]
+        breaker = CircuitBreaker(
+            "test", failure_threshold=1, reset_seconds=10, clock=lambda: now[0]
+        )
+        breaker.record_failure()
+        assert breaker.state == OPEN and not breaker.allow()
+
+        now[0] = 10.0
+        assert breaker.allow() and breaker.state == HALF_OPEN
+        assert not breaker.allow()
+        breaker.record_success()
+        assert breaker.state == CLOSED and breaker.allow()
+
+    @pytest.mark.asyncio
+    async def test_cancelled_probe_reopens_circuit(self):
+        """Тест: отменённый пробный вызов не оставляет цепь в ожидании пробы навсегда"""
+        now = [0.0]
+        started = asyncio.Event()
+
+        async def hang(request: httpx.Request) -> httpx.Response:
+            started.set()
+            await asyncio.Event().wait()
+
+        service = YandexGPTService()
+        service._client = httpx.AsyncClient(transport=httpx.MockTransport(hang))
+        service.breaker = CircuitBreaker(
+            "test", failure_threshold=1, reset_seconds=10, clock=lambda: now[0]
+        )
+        service.breaker.record_failure()
+        now[0] = 10.0
+
+        probe = asyncio.create_task(service.generate_summary("Текст статьи.", "Заголовок"))
+        await started.wait()
+        assert service.breaker.state == HALF_OPEN
+        probe.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await probe
+
+        assert service.breaker.state == OPEN and not service.breaker.allow()
+        now[0] = 20.0
+        assert service.breaker.allow()
+
+
+class TestSummaryRetryQueue:
+    """Тесты очереди повторов генерации резюме"""
+
+    def test_failed_article_postponed_then_dropped(self, db_session, monkeypatch):
+        """Тест: после сбоя статья откладывается, после лимита попыток не выбирается"""
+        monkeypatch.setattr(settings, "summary_max_attempts", 2)
+        article = Article(habr_id="1", title="Статья", url="u", content="Текст", status="fetched")
+        db_session.add(article)
+        db_session.commit()
+        db_service = DatabaseService(db_session)
+
+        db_service.record_summary_failure(article, "HTTP 429")
+        assert article.summary is None
+        assert article.summary_error == "HTTP 429"
+        assert db_service.get_unprocessed_articles() == []
+
+        article.summary_next_attempt_at = datetime.now(UTC) - timedelta(minutes=1)
+        db_session.commit()
+        assert db_service.get_unprocessed_articles() == [article]
+
+        db_service.record_summary_failure(article, "HTTP 503")
+        article.summary_next_attempt_at = None
+        db_session.commit()
+        assert article.summary_attempts == 2
+        assert db_service.get_unprocessed_articles() == []
+
+    def test_success_clears_error(self, db_session):
+        """Тест: удачное резюме записывается и снимает статью с очереди"""
+        article = Article(habr_id="1", title="Статья", url="u", content="Текст")
+        db_session.add(article)
+        db_session.commit()
+        db_service = DatabaseService(db_session)
+
+        db_service.record_summary_failure(article, "HTTP 503")
+        db_service.save_summary(article, "Резюме")
+
+        assert article.is_processed
+        assert article.summary == "Резюме"
+        assert article.summary_error is None
+        assert article.summary_next_attempt_at is None